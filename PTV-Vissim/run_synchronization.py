@@ -16,7 +16,6 @@ Script to co-simulate CARLA and PTV-Vissim.
 import argparse
 import json
 import logging
-import time
 
 # ==================================================================================================
 # -- find carla module -----------------------------------------------------------------------------
@@ -34,6 +33,8 @@ try:
 except IndexError:
     pass
 
+import carla  # pylint: disable=import-error, wrong-import-position
+
 # ==================================================================================================
 # -- vissim integration imports --------------------------------------------------------------------
 # ==================================================================================================
@@ -42,6 +43,7 @@ from vissim_integration.bridge_helper import BridgeHelper
 from vissim_integration.carla_simulation import CarlaSimulation
 from vissim_integration.vissim_simulation import PTVVissimSimulation
 from vissim_integration.constants import INVALID_ACTOR_ID
+from vissim_integration.scheduler import CATCH_UP_POLICIES, TickScheduler
 
 # ==================================================================================================
 # -- synchronization_loop --------------------------------------------------------------------------
@@ -101,16 +103,37 @@ class SimulationSynchronization(object):
             if vissim_actor_id in self.vissim2carla_ids:
                 self.vissim.destroy_actor(self.vissim2carla_ids.pop(vissim_actor_id))
 
-        # Updating vissim controlled vehicles in carla.
+        # Updating vissim controlled vehicles in carla. The vissim to carla transforms and
+        # velocities of all the vehicles are computed at once.
+        carla_actor_ids = []
+        locations, rotations, extents, velocities = [], [], [], []
         for vissim_actor_id in self.vissim2carla_ids:
             carla_actor_id = self.vissim2carla_ids[vissim_actor_id]
 
             vissim_actor = self.vissim.get_actor(vissim_actor_id)
             carla_actor = self.carla.get_actor(carla_actor_id)
 
-            carla_transform = BridgeHelper.get_carla_transform(vissim_actor.get_transform(),
-                                                               carla_actor.bounding_box.extent)
-            carla_velocity = BridgeHelper.get_carla_velocity(vissim_actor.get_velocity())
+            vissim_transform = vissim_actor.get_transform()
+            location, rotation = vissim_transform.location, vissim_transform.rotation
+            extent = carla_actor.bounding_box.extent
+            velocity = vissim_actor.get_velocity()
+
+            carla_actor_ids.append(carla_actor_id)
+            locations.append((location.x, location.y, location.z))
+            rotations.append((rotation.pitch, rotation.yaw, rotation.roll))
+            extents.append((extent.x, extent.y, extent.z))
+            velocities.append((velocity.x, velocity.y, velocity.z))
+
+        locations, rotations = BridgeHelper.get_carla_transforms(locations, rotations, extents)
+        velocities = BridgeHelper.get_carla_velocities(velocities)
+        for carla_actor_id, location, rotation, velocity in zip(carla_actor_ids,
+                                                                locations.tolist(),
+                                                                rotations.tolist(),
+                                                                velocities.tolist()):
+            carla_transform = carla.Transform(carla.Location(*location), carla.Rotation(*rotation))
+            carla_velocity = carla.Vector3D(*velocity)
+
+            # Queued, sent to carla in a single batch when ticking.
             self.carla.synchronize_vehicle(carla_actor_id, carla_transform, carla_velocity)
 
         # -------------------
@@ -138,16 +161,36 @@ class SimulationSynchronization(object):
             if carla_actor_id in self.carla2vissim_ids:
                 self.vissim.destroy_actor(self.carla2vissim_ids.pop(carla_actor_id))
 
-        # Updating carla controlled vehicles in vissim.
+        # Updating carla controlled vehicles in vissim. The carla to vissim transforms and
+        # velocities of all the vehicles are computed at once.
+        vissim_actor_ids = []
+        locations, rotations, extents, velocities = [], [], [], []
         for carla_actor_id in self.carla2vissim_ids:
             vissim_actor_id = self.carla2vissim_ids[carla_actor_id]
             if vissim_actor_id != INVALID_ACTOR_ID:
                 carla_actor = self.carla.get_actor(carla_actor_id)
 
-                vissim_transform = BridgeHelper.get_vissim_transform(
-                    carla_actor.get_transform(), carla_actor.bounding_box.extent)
-                vissim_velocity = BridgeHelper.get_vissim_velocity(carla_actor.get_velocity())
-                self.vissim.synchronize_vehicle(vissim_actor_id, vissim_transform, vissim_velocity)
+                carla_transform = carla_actor.get_transform()
+                location, rotation = carla_transform.location, carla_transform.rotation
+                extent = carla_actor.bounding_box.extent
+                velocity = carla_actor.get_velocity()
+
+                vissim_actor_ids.append(vissim_actor_id)
+                locations.append((location.x, location.y, location.z))
+                rotations.append((rotation.pitch, rotation.yaw, rotation.roll))
+                extents.append((extent.x, extent.y, extent.z))
+                velocities.append((velocity.x, velocity.y, velocity.z))
+
+        locations, rotations = BridgeHelper.get_vissim_transforms(locations, rotations, extents)
+        velocities = BridgeHelper.get_vissim_velocities(velocities)
+        for vissim_actor_id, location, rotation, velocity in zip(vissim_actor_ids,
+                                                                 locations.tolist(),
+                                                                 rotations.tolist(),
+                                                                 velocities.tolist()):
+            vissim_transform = carla.Transform(carla.Location(*location),
+                                               carla.Rotation(*rotation))
+            vissim_velocity = carla.Vector3D(*velocity)
+            self.vissim.synchronize_vehicle(vissim_actor_id, vissim_transform, vissim_velocity)
 
     def close(self):
         """
@@ -174,23 +217,19 @@ def synchronization_loop(args):
     carla_simulation = CarlaSimulation(args)
     vissim_simulation = PTVVissimSimulation(args)
 
+    scheduler = TickScheduler(args.step_length, args.catch_up, args.max_speed)
     try:
         synchronization = SimulationSynchronization(vissim_simulation, carla_simulation, args)
 
         while True:
-            start = time.time()
-
             synchronization.tick()
-
-            end = time.time()
-            elapsed = end - start
-            if elapsed < args.step_length:
-                time.sleep(args.step_length - elapsed)
+            scheduler.wait()
 
     except KeyboardInterrupt:
         logging.info('Cancelled by user.')
 
     finally:
+        logging.info('Tick statistics:\n%s', scheduler.summary())
         logging.info('Cleaning synchronization')
         synchronization.close()
 
@@ -219,6 +258,16 @@ if __name__ == '__main__':
                            default=0.05,
                            type=float,
                            help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--catch-up',
+                           choices=CATCH_UP_POLICIES,
+                           default='skip',
+                           help='what to do when a tick overruns its step: drop the lost time (skip) '
+                           'or run the next ticks without sleeping until the schedule is caught up '
+                           '(burst) (default: skip)')
+    argparser.add_argument('--max-speed',
+                           action='store_true',
+                           help='run the ticks without sleeping, e.g., for offline batch runs '
+                           '(default: False)')
     argparser.add_argument('--simulator-vehicles',
                            default=1,
                            type=int,
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Tests of the vissim <-> carla bridge helper. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import numpy as np
+import pytest
+
+carla = pytest.importorskip('carla')
+
+from vissim_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- fixtures --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+@pytest.fixture(params=range(20))
+def actors(request):
+    """
+    Returns random (locations, rotations, extents, velocities) of a fleet, N x 3 arrays. Includes
+    the corner cases of the angles (0, +-90, +-180, 360). The values are float32, as in the carla
+    transforms.
+    """
+    rng = np.random.default_rng(request.param)
+
+    size = 50
+    locations = rng.uniform(-1e4, 1e4, (size, 3))
+    rotations = rng.uniform(-360.0, 360.0, (size, 3))
+    rotations[:10, 1] = [0.0, 90.0, -90.0, 180.0, -180.0, 360.0, 270.0, 45.0, -45.0, 1e-9]
+    extents = rng.uniform(0.0, 10.0, (size, 3))
+    extents[0] = 0.0
+    velocities = rng.uniform(-50.0, 50.0, (size, 3))
+    return _float32(locations), _float32(rotations), _float32(extents), _float32(velocities)
+
+
+def _float32(array):
+    return np.asarray(array, dtype=np.float32).astype(np.float64)
+
+
+def _assert_float32_close(actual, expected):
+    # The scalar results are stored in float32 carla transforms: a few float32 ulps apart at most.
+    np.testing.assert_allclose(_float32(actual), expected, rtol=1e-6, atol=1e-4)
+
+
+def _transform(location, rotation):
+    return carla.Transform(carla.Location(*location), carla.Rotation(*rotation))
+
+
+def _as_arrays(transforms):
+    locations = [(t.location.x, t.location.y, t.location.z) for t in transforms]
+    rotations = [(t.rotation.pitch, t.rotation.yaw, t.rotation.roll) for t in transforms]
+    return np.array(locations), np.array(rotations)
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+@pytest.mark.parametrize('with_extents', [True, False])
+@pytest.mark.parametrize('to_carla', [True, False])
+def test_transforms_match_scalar(actors, with_extents, to_carla):
+    locations, rotations, extents, _ = actors
+    if to_carla:
+        get_transform, get_transforms = BridgeHelper.get_carla_transform, \
+            BridgeHelper.get_carla_transforms
+    else:
+        get_transform, get_transforms = BridgeHelper.get_vissim_transform, \
+            BridgeHelper.get_vissim_transforms
+
+    expected = _as_arrays([
+        get_transform(_transform(l, r), carla.Vector3D(*e) if with_extents else None)
+        for l, r, e in zip(locations.tolist(), rotations.tolist(), extents.tolist())
+    ])
+
+    out_locations, out_rotations = get_transforms(locations, rotations,
+                                                  extents if with_extents else None)
+    assert out_locations.dtype == np.float64 and out_locations.shape == locations.shape
+    _assert_float32_close(out_locations, expected[0])
+    _assert_float32_close(out_rotations, expected[1])
+
+
+@pytest.mark.parametrize('to_carla', [True, False])
+def test_velocities_match_scalar(actors, to_carla):
+    velocities = actors[3]
+    if to_carla:
+        get_velocity, get_velocities = BridgeHelper.get_carla_velocity, \
+            BridgeHelper.get_carla_velocities
+    else:
+        get_velocity, get_velocities = BridgeHelper.get_vissim_velocity, \
+            BridgeHelper.get_vissim_velocities
+
+    expected = [(v.x, v.y, v.z) for v in
+                [get_velocity(carla.Vector3D(*velocity)) for velocity in velocities.tolist()]]
+    _assert_float32_close(get_velocities(velocities), np.array(expected))
+
+
+def test_transforms_do_not_modify_inputs(actors):
+    inputs = [array.copy() for array in actors]
+    BridgeHelper.get_carla_transforms(*actors[:3])
+    BridgeHelper.get_vissim_transforms(*actors[:3])
+    BridgeHelper.get_carla_velocities(actors[3])
+    BridgeHelper.get_vissim_velocities(actors[3])
+    for array, copy in zip(actors, inputs):
+        np.testing.assert_array_equal(array, copy)
+
+
+def test_empty_fleet():
+    for get_transforms in (BridgeHelper.get_carla_transforms, BridgeHelper.get_vissim_transforms):
+        locations, rotations = get_transforms([], [], [])
+        assert locations.shape == (0, 3) and rotations.shape == (0, 3)
+    for get_velocities in (BridgeHelper.get_carla_velocities, BridgeHelper.get_vissim_velocities):
+        assert get_velocities([]).shape == (0, 3)
@@ -16,6 +16,7 @@ import math
 import random
 
 import carla  # pylint: disable=import-error
+import numpy as np  # pylint: disable=import-error
 
 # ==================================================================================================
 # -- Bridge helper (VISSIM <=> CARLA) --------------------------------------------------------------
@@ -80,6 +81,68 @@ class BridgeHelper(object):
 
         return out_transform
 
+    @staticmethod
+    def get_carla_transforms(locations, rotations, extents=None):
+        """
+        Returns carla transforms based on vissim transforms, for N actors at once (vectorized
+        version of `get_carla_transform`).
+
+            :param locations: vissim locations, N x 3 array (x, y, z).
+            :param rotations: vissim rotations, N x 3 array (pitch, yaw, roll).
+            :param extents: actor extents, N x 3 array (x, y, z).
+            :return: carla (locations, rotations) as N x 3 float64 arrays.
+        """
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+
+        # From front-center-bumper to center (vissim reference system).
+        out_locations = locations.copy()
+        if extents is not None:
+            length = np.asarray(extents, dtype=np.float64).reshape(-1, 3)[:, 0]
+            yaw = np.radians(rotations[:, 1])
+            pitch = np.radians(rotations[:, 0])
+            out_locations[:, 0] -= np.cos(yaw) * length
+            out_locations[:, 1] -= np.sin(yaw) * length
+            out_locations[:, 2] -= np.sin(pitch) * length
+
+        # Transform to carla reference system (left-handed system).
+        out_locations[:, 1] *= -1
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] *= -1
+
+        return out_locations, out_rotations
+
+    @staticmethod
+    def get_vissim_transforms(locations, rotations, extents=None):
+        """
+        Returns vissim transforms based on carla transforms, for N actors at once (vectorized
+        version of `get_vissim_transform`).
+
+            :param locations: carla locations, N x 3 array (x, y, z).
+            :param rotations: carla rotations, N x 3 array (pitch, yaw, roll).
+            :param extents: actor extents, N x 3 array (x, y, z).
+            :return: vissim (locations, rotations) as N x 3 float64 arrays.
+        """
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+
+        # From center to front-center-bumper (carla reference system).
+        out_locations = locations.copy()
+        if extents is not None:
+            length = np.asarray(extents, dtype=np.float64).reshape(-1, 3)[:, 0]
+            yaw = np.radians(-1 * rotations[:, 1])
+            pitch = np.radians(rotations[:, 0])
+            out_locations[:, 0] += np.cos(yaw) * length
+            out_locations[:, 1] -= np.sin(yaw) * length
+            out_locations[:, 2] -= np.sin(pitch) * length
+
+        # Transform to vissim reference system (right-handed system).
+        out_locations[:, 1] *= -1
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] *= -1
+
+        return out_locations, out_rotations
+
     @staticmethod
     def _flip_y(in_vector):
         """
@@ -101,6 +164,22 @@ class BridgeHelper(object):
         """
         return BridgeHelper._flip_y(in_carla_velocity)
 
+    @staticmethod
+    def get_carla_velocities(velocities):
+        """
+        Returns carla velocities based on vissim velocities, N x 3 arrays (vectorized version of
+        `get_carla_velocity`).
+        """
+        return np.asarray(velocities, dtype=np.float64).reshape(-1, 3) * (1, -1, 1)
+
+    @staticmethod
+    def get_vissim_velocities(velocities):
+        """
+        Returns vissim velocities based on carla velocities, N x 3 arrays (vectorized version of
+        `get_vissim_velocity`).
+        """
+        return np.asarray(velocities, dtype=np.float64).reshape(-1, 3) * (1, -1, 1)
+
     @staticmethod
     def _get_recommended_carla_blueprint(vissim_actor):
         """
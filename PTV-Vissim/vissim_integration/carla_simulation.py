@@ -15,6 +15,7 @@ import logging
 
 import carla  # pylint: disable=import-error
 
+from .actor_cache import ActorCache
 from .constants import INVALID_ACTOR_ID, CARLA_SPAWN_OFFSET_Z
 
 # ==================================================================================================
@@ -42,11 +43,24 @@ class CarlaSimulation(object):
         self.spawned_actors = set()
         self.destroyed_actors = set()
 
+        # Vehicle updates of the current frame. They are sent to carla in a single batch right
+        # before ticking, instead of one request per vehicle.
+        self._vehicle_commands = []
+
+        # Number of requests sent to the carla server.
+        self.rpc_count = 0
+
+        # Actor handles, invalidated when the actors are destroyed.
+        self.actor_cache = ActorCache(self.world)
+
     def get_actor(self, actor_id):
         """
         Accessor for carla actor.
         """
-        return self.world.get_actor(actor_id)
+        misses = self.actor_cache.misses
+        actor = self.actor_cache.get(actor_id)
+        self.rpc_count += self.actor_cache.misses - misses
+        return actor
 
     def spawn_actor(self, blueprint, transform):
         """
@@ -64,6 +78,7 @@ class CarlaSimulation(object):
                 carla.command.SetSimulatePhysics(carla.command.FutureActor, False))
         ]
         response = self.client.apply_batch_sync(batch, False)[0]
+        self.rpc_count += 1
         if response.error:
             logging.error('Spawn carla actor failed. %s', response.error)
             return INVALID_ACTOR_ID
@@ -74,41 +89,64 @@ class CarlaSimulation(object):
         """
         Destroys the given actor.
         """
-        actor = self.world.get_actor(actor_id)
+        actor = self.get_actor(actor_id)
         if actor is not None:
+            self.rpc_count += 1
+            self.actor_cache.invalidate(actor_id)
             return actor.destroy()
         return False
 
     def synchronize_vehicle(self, vehicle_id, transform, velocity, lights=None):
         """
-        Updates vehicle state.
+        Updates vehicle state. The update is queued and sent to carla with the rest of the updates
+        of the current frame in the next tick (see `apply_vehicle_updates`).
 
             :param vehicle_id: id of the actor to be updated.
             :param transform: new vehicle transform (i.e., position and rotation).
+            :param velocity: new vehicle velocity.
             :param lights: new vehicle light state.
-            :return: True if successfully updated. Otherwise, False.
+            :return: True if the update is queued.
         """
-        vehicle = self.world.get_actor(vehicle_id)
-        if vehicle is None:
-            return False
-
-        vehicle.set_transform(transform)
+        commands = self._vehicle_commands
+        commands.append(carla.command.ApplyTransform(vehicle_id, transform))
         if velocity is not None:
-            vehicle.set_target_velocity(velocity)
+            commands.append(carla.command.ApplyTargetVelocity(vehicle_id, velocity))
 
         if lights is not None:
-            vehicle.set_light_state(carla.VehicleLightState(lights))
+            commands.append(
+                carla.command.SetVehicleLightState(vehicle_id, carla.VehicleLightState(lights)))
         return True
 
+    def apply_vehicle_updates(self):
+        """
+        Sends the queued vehicle updates to carla in a single batch.
+
+            :return: number of updates that failed (e.g., the actor no longer exists).
+        """
+        if not self._vehicle_commands:
+            return 0
+
+        responses = self.client.apply_batch_sync(self._vehicle_commands, False)
+        self.rpc_count += 1
+        self._vehicle_commands = []
+
+        errors = [response.error for response in responses if response.error]
+        if errors:
+            logging.debug('%d vehicle updates failed in carla. %s', len(errors), errors[0])
+        return len(errors)
+
     def tick(self):
         """
         Tick to carla simulation.
         """
+        self.apply_vehicle_updates()
         self.world.tick()
 
         # Update data structures for the current frame.
         current_actors = set(
             [vehicle.id for vehicle in self.world.get_actors().filter('vehicle.*')])
+        self.rpc_count += 2
         self.spawned_actors = current_actors.difference(self._active_actors)
         self.destroyed_actors = self._active_actors.difference(current_actors)
         self._active_actors = current_actors
+        self.actor_cache.invalidate_all(self.destroyed_actors)
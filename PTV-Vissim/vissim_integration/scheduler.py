@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the scheduler pacing the synchronization loops. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import bisect
+import time
+
+# ==================================================================================================
+# -- tick scheduler --------------------------------------------------------------------------------
+# ==================================================================================================
+
+CATCH_UP_POLICIES = ('skip', 'burst')
+
+# Upper bounds of the tick duration histogram buckets, in step lengths.
+_HISTOGRAM_BOUNDS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0)
+
+
+class TickScheduler(object):
+    """
+    TickScheduler paces a loop to one tick per step length.
+
+    Ticks are scheduled at absolute deadlines (start + n * step_length) of a monotonic clock, so the
+    sleep granularity and the time spent between ticks do not accumulate as drift. When a tick
+    overruns its step (i.e., the next deadline has already passed), the catch up policy decides what
+    to do with the lost time:
+
+        * skip: the lost time is dropped and the schedule restarts from the end of the late tick.
+        * burst: the following ticks run without sleeping until the schedule is caught up. If the
+          loop falls more than `max_lag` steps behind, the schedule restarts anyway.
+
+    With `max_speed` the loop never sleeps (e.g., offline batch runs), only the statistics are kept.
+
+    Usage:
+
+        scheduler = TickScheduler(step_length)
+        while True:
+            tick()
+            scheduler.wait()
+    """
+    def __init__(self, step_length, catch_up='skip', max_speed=False, max_lag=10):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError('Unknown catch up policy {} (available: {})'.format(
+                catch_up, ', '.join(CATCH_UP_POLICIES)))
+
+        self.step_length = step_length
+        self.catch_up = catch_up
+        self.max_speed = max_speed
+        self.max_lag = max_lag
+
+        self._deadline = None  # Start of the next tick.
+        self._tick_start = None
+
+        # Statistics.
+        self.ticks = 0
+        self.overruns = 0  # Ticks longer than the step length.
+        self.dropped_time = 0.0  # Time dropped from the schedule, in seconds.
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.histogram = [0] * (len(_HISTOGRAM_BOUNDS) + 1)
+
+    def start(self):
+        """
+        (Re)starts the schedule, the first tick starts now. Called by the first wait if needed.
+        """
+        self._deadline = time.perf_counter()
+        self._tick_start = self._deadline
+
+    def _record(self, duration):
+        self.ticks += 1
+        self.total_duration += duration
+        if duration > self.step_length:
+            self.overruns += 1
+        self.max_duration = max(self.max_duration, duration)
+        self.histogram[bisect.bisect_left(_HISTOGRAM_BOUNDS, duration / self.step_length)] += 1
+
+    def advance(self):
+        """
+        Records the duration of the tick that just finished and schedules the next one. The caller
+        waits the returned time before the next tick (e.g., with asyncio.sleep).
+
+            :return: time until the next deadline, in seconds (0 if the next tick is due).
+        """
+        now = time.perf_counter()
+        if self._deadline is None:
+            # The duration of the first tick is unknown.
+            self._deadline = self._tick_start = now
+        else:
+            self._record(now - self._tick_start)
+
+        self._deadline += self.step_length
+        lag = now - self._deadline
+        if self.max_speed:
+            self._deadline = self._tick_start = now
+            return 0.0
+
+        if lag > 0:
+            if self.catch_up == 'skip' or lag > self.max_lag * self.step_length:
+                self.dropped_time += lag
+                self._deadline = now
+            self._tick_start = now
+            return 0.0
+
+        self._tick_start = self._deadline
+        return -lag
+
+    def wait(self):
+        """
+        Records the duration of the tick that just finished and sleeps until the next deadline.
+
+            :return: time slept, in seconds.
+        """
+        delay = self.advance()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    @property
+    def mean_duration(self):
+        return self.total_duration / self.ticks if self.ticks else 0.0
+
+    def summary(self):
+        """
+        Returns a printable summary of the tick statistics.
+        """
+        lines = [
+            'ticks: {}, mean: {:.2f}ms, max: {:.2f}ms, overruns: {} ({:.1f}%), dropped: {:.3f}s'.
+            format(self.ticks, self.mean_duration * 1e3, self.max_duration * 1e3, self.overruns,
+                   100.0 * self.overruns / self.ticks if self.ticks else 0.0, self.dropped_time)
+        ]
+
+        lower = 0.0
+        for upper, count in zip(_HISTOGRAM_BOUNDS + (float('inf'), ), self.histogram):
+            label = '>= {:.2f}'.format(lower) if upper == float('inf') else \
+                '{:.2f} - {:.2f}'.format(lower, upper)
+            lines.append('  {:>13} steps: {:>8} ({:5.1f}%)'.format(
+                label, count, 100.0 * count / self.ticks if self.ticks else 0.0))
+            lower = upper
+        return '\n'.join(lines)
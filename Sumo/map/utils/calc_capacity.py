@@ -1,14 +1,18 @@
 # -*- coding: utf-8 -*-
 import os
+import sys
 from collections import defaultdict
 
 import numpy as np
 import pandas as pd
-import sumolib
 
 from utils.xml_io import load_lane_data_to_df, load_lane_capacity_df
 
-net = sumolib.net.readNet('sumo_map/mcity.net.xml', withPrograms=True)
+# The net cache of the sumo integration is shared with these scripts.
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..'))
+from sumo_integration.net_cache import read_net  # pylint: disable=wrong-import-position
+
+net = read_net('sumo_map/mcity.net.xml', withPrograms=True)
 default_capacity = 1800  # veh/hour/lane
 stop_sign_capacity = 720  # veh/hour/lane
 
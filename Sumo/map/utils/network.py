@@ -1,6 +1,12 @@
-import sumolib
+import os
+import sys
+
 from shapely.geometry import Point, Polygon, LineString
 
+# The net cache of the sumo integration is shared with these scripts.
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..'))
+from sumo_integration.net_cache import read_net  # pylint: disable=wrong-import-position
+
 
 class SumoNetwork(object):
     def __init__(self, network_file):
@@ -28,7 +34,7 @@ class SumoNetwork(object):
         return path
 
     def load_network(self):
-        self.sumo_net = sumolib.net.readNet("sumo_map/mcity.net.xml")
+        self.sumo_net = read_net(self.network_file)
         # fixme: we need to also build the networkx to enable different network functions
         # self.networkx, self._sumo_to_nx_link_dict, self._nx_link_to_sumo_dict =\
         #     build_net_from_sumo_map(self.sumo_net, layer)
@@ -14,11 +14,14 @@ Script to integrate CARLA and SUMO simulations
 # ==================================================================================================
 
 import argparse
+import asyncio
 import logging
+import signal
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
 import redis
-import json
 
 # ==================================================================================================
 # -- find carla module -----------------------------------------------------------------------------
@@ -43,23 +46,40 @@ except IndexError:
 # ==================================================================================================
 
 from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+from sumo_integration.actor_pool import ActorPool  # pylint: disable=wrong-import-position
+from sumo_integration.async_transport import ASYNC_TRANSPORTS, close_async_client, create_async_transport  # pylint: disable=wrong-import-position
 from sumo_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
 from sumo_integration.constants import INVALID_ACTOR_ID  # pylint: disable=wrong-import-position
+from sumo_integration.ego_vehicle import EGO_VEHICLE_KEY, encode_ego_vehicle_frame  # pylint: disable=wrong-import-position
+from sumo_integration.interest_manager import InterestManager  # pylint: disable=wrong-import-position
+from sumo_integration.scheduler import CATCH_UP_POLICIES, TickScheduler  # pylint: disable=wrong-import-position
+from sumo_integration.snapshot_delta import RESYNC_REQUEST_KEY, SnapshotDeltaDecoder, SnapshotResyncError  # pylint: disable=wrong-import-position
+from sumo_integration.transport import FrameTracker, create_transport  # pylint: disable=wrong-import-position
 
 # ==================================================================================================
 # -- synchronization_loop --------------------------------------------------------------------------
 # ==================================================================================================
 
+TERASIM_VEHICLE_KEY = 'cosim_terasim_vehicle_info'
+
 
 class SimulationSynchronization(object):
     """
     SimulationSynchronization class is responsible for the synchronization of sumo and carla
     simulations.
+
+    With an interest manager, only the sumo vehicles near the ego vehicle (see
+    get_ego_vehicle_frame) are spawned in carla.
     """
     def __init__(self,
                  carla_simulation,
                  sync_vehicle_color=False,
-                 sync_vehicle_lights=False):
+                 sync_vehicle_lights=False,
+                 transport='get',
+                 transport_timeout=1.0,
+                 stream_maxlen=100,
+                 ego_role_name='hero',
+                 interest_manager=None):
 
         self.carla = carla_simulation
 
@@ -79,69 +99,202 @@ class SimulationSynchronization(object):
         # redis server for communication
         self.redis = redis.Redis(host='localhost', port=6379, db=0)
 
+        # Push based transports (stream, pubsub, shm) block until a new frame arrives.
+        transport_kwargs = {'maxlen': stream_maxlen} if transport == 'stream' else {}
+        self.transport = create_transport(transport, self.redis, TERASIM_VEHICLE_KEY,
+                                          **transport_kwargs)
+        self.transport_timeout = transport_timeout
+
+        # Decodes the sumo context (full snapshots or delta encoded frames).
+        self.snapshot_decoder = SnapshotDeltaDecoder()
+        self.frame_tracker = FrameTracker()
+
         # Mapped actor ids.
         self.sumo2carla_ids = {}  # Contains only actors controlled by sumo.
 
+        # Carla vehicle at the center of the area of interest, whose state can be published to the
+        # sumo side (see get_ego_vehicle_frame).
+        self.ego_role_name = ego_role_name
+        self._ego_vehicle = None
+        self._ego_lookup_frame = 0
+        self._ego_frame_id = 0
+
+        # Vehicles of interest, disabled by default.
+        self.interest_manager = interest_manager
+
     def tick(self):
         """
         Tick to simulation synchronization
         """
 
         # reads sumo context from redis.
-        cosim_terasim_vehicle_info_json = self.redis.get('cosim_terasim_vehicle_info')
-        if cosim_terasim_vehicle_info_json is not None:
-            cosim_terasim_vehicle_info_dict = json.loads(cosim_terasim_vehicle_info_json)
-        else:
-            # Destroying synchronized actors.
-            for carla_actor_id in self.sumo2carla_ids.values():
-                self.carla.destroy_actor(carla_actor_id)
-            print("No data found for cosim_terasim_vehicle_info, destroying all actors.")
+        payloads = self.transport.receive(self.transport_timeout)
+        if not payloads:
+            if not self.transport.polling:
+                logging.debug('No new frame received in %s s', self.transport_timeout)
+                return
+
+            self.clear()
             time.sleep(2)
             return
 
+        self.apply(payloads)
+
+    def clear(self):
+        """
+        Destroys the synchronized actors, when there is no sumo context.
+        """
+        for carla_actor_id in self.sumo2carla_ids.values():
+            self.carla.request_destroy(carla_actor_id)
+        self.carla.apply_actor_requests()
+        self.sumo2carla_ids.clear()
+        print("No data found for cosim_terasim_vehicle_info, destroying all actors.")
+
+    def apply(self, payloads):
+        """
+        Applies the received frames (oldest first) in carla and ticks carla. With no new frame,
+        carla is ticked keeping the last state.
+        """
+        # All the received frames are decoded (delta frames depend on the previous ones), but only
+        # the latest new one is applied.
+        snapshot = None
+        resync = False
+        for payload in payloads:
+            try:
+                decoded_snapshot = self.snapshot_decoder.decode(payload)
+            except SnapshotResyncError as error:
+                logging.warning('%s. Requesting keyframe.', error)
+                resync = True
+                continue
+
+            resync = False
+            if self.frame_tracker.update(decoded_snapshot.frame_id, decoded_snapshot.sim_time):
+                snapshot = decoded_snapshot
+
+        if resync:
+            # Keeps the last state until the producer sends a new keyframe. The producer clears the
+            # request (see poll_resync_request).
+            self.redis.set(RESYNC_REQUEST_KEY, 1)
+
+        if snapshot is None:
+            # Nothing new to apply (i.e., repeated frame or waiting for a keyframe).
+            self.carla.tick()
+            return
+
+        self.frame_tracker.applied += 1
+        if self.frame_tracker.applied % 1000 == 0:
+            logging.debug('Frame statistics: %s', self.frame_tracker)
+
+        # Sumo to carla transforms of the whole fleet at once.
+        locations, rotations = BridgeHelper.get_carla_transforms(snapshot.locations,
+                                                                 snapshot.rotations,
+                                                                 snapshot.extents)
+
+        # Vehicles out of the area of interest are not spawned in carla.
+        interest = None
+        if self.interest_manager is not None:
+            _, ego_snapshot = self._get_ego_snapshot()
+            centers = []
+            if ego_snapshot is not None:
+                ego_location = ego_snapshot.get_transform().location
+                centers.append((ego_location.x, ego_location.y))
+            interest = self.interest_manager.update(snapshot.ids, locations, centers)
+
+        locations = locations.tolist()
+        rotations = rotations.tolist()
+
         # iterates over sumo actors and updates them in carla.
-        for sumo_actor_id, sumo_actor_value in cosim_terasim_vehicle_info_dict.items():
-            sumo_actor_type_id = sumo_actor_value['type_id']
-            sumo_actor_vclass_value = sumo_actor_value['vclass']
-            sumo_actor_color_list = sumo_actor_value['color']
-            sumo_actor_color_tuple = tuple(sumo_actor_color_list)
-
-            sumo_actor_transform = carla.Transform()
-            sumo_actor_transform.location.x = sumo_actor_value['location']['x']
-            sumo_actor_transform.location.y = sumo_actor_value['location']['y']
-            sumo_actor_transform.location.z = sumo_actor_value['location']['z']
-            sumo_actor_transform.rotation.pitch = sumo_actor_value['rotation']['x']
-            sumo_actor_transform.rotation.yaw = sumo_actor_value['rotation']['y']
-            sumo_actor_transform.rotation.roll = sumo_actor_value['rotation']['z']
-
-            sumo_actor_extent = carla.Vector3D()
-            sumo_actor_extent.x = sumo_actor_value['extent']['x']
-            sumo_actor_extent.y = sumo_actor_value['extent']['y']
-            sumo_actor_extent.z = sumo_actor_value['extent']['z']
-
-            carla_transform = BridgeHelper.get_carla_transform(sumo_actor_transform, sumo_actor_extent)
-                
+        for i, sumo_actor_id in enumerate(snapshot.ids):
+            if interest is not None and sumo_actor_id not in interest:
+                continue
+
+            location, rotation = locations[i], rotations[i]
+            carla_transform = carla.Transform(
+                carla.Location(location[0], location[1], location[2]),
+                carla.Rotation(rotation[0], rotation[1], rotation[2]))
+
             # Creating new carla actor or updating existing one.
             if sumo_actor_id not in self.sumo2carla_ids:
+                sumo_actor_type_id = snapshot.strings[snapshot.type_index[i]]
+                sumo_actor_vclass_value = snapshot.strings[snapshot.vclass_index[i]]
+                sumo_actor_color_tuple = tuple(snapshot.colors[i].tolist())
+
                 carla_blueprint = BridgeHelper.get_carla_blueprint_from_sumo_redis(
                     sumo_actor_type_id, sumo_actor_color_tuple, sumo_actor_vclass_value)
 
                 if carla_blueprint is not None:
-                    carla_actor_id = self.carla.spawn_actor(carla_blueprint, carla_transform)
-                    if carla_actor_id != INVALID_ACTOR_ID:
-                        self.sumo2carla_ids[sumo_actor_id] = carla_actor_id
+                    self.carla.request_spawn(sumo_actor_id, carla_blueprint, carla_transform)
             else:
+                # Queued, sent to carla in a single batch when ticking.
                 carla_actor_id = self.sumo2carla_ids[sumo_actor_id]
                 self.carla.synchronize_vehicle(carla_actor_id, carla_transform, lights=None)
 
         # Iterate over sumo2carla_ids dictionary and destroy actors that are not in sumo_actor_ids.
+        sumo_actor_ids = set(snapshot.ids)
         for sumo_actor_id in list(self.sumo2carla_ids.keys()):
-            if sumo_actor_id not in cosim_terasim_vehicle_info_dict:
+            if sumo_actor_id not in sumo_actor_ids:
                 print("Destroy actor: ", sumo_actor_id)
-                self.carla.destroy_actor(self.sumo2carla_ids.pop(sumo_actor_id))
-                
+                self.carla.request_destroy(self.sumo2carla_ids.pop(sumo_actor_id))
+            elif interest is not None and sumo_actor_id not in interest:
+                # Left the area of interest, parked if the actor pool is enabled.
+                self.carla.request_destroy(self.sumo2carla_ids.pop(sumo_actor_id))
+
+        # Spawning and destroying actors in a single batch. Actors that could not be spawned are
+        # requested again in the next frame.
+        spawned_actors = self.carla.apply_actor_requests()
+        self.sumo2carla_ids.update({
+            sumo_actor_id: carla_actor_id
+            for sumo_actor_id, carla_actor_id in spawned_actors.items()
+            if carla_actor_id != INVALID_ACTOR_ID
+        })
+
         self.carla.tick()
 
+    def _get_ego_snapshot(self):
+        """
+        Returns the world snapshot of the current carla step and the snapshot of the ego vehicle in
+        it (the carla vehicle with the `role_name` attribute set to `ego_role_name`), None if there
+        is no ego vehicle.
+        """
+        world_snapshot = self.carla.world.get_snapshot()
+        if self.ego_role_name is None:
+            return world_snapshot, None
+
+        ego_snapshot = None
+        if self._ego_vehicle is not None:
+            ego_snapshot = world_snapshot.find(self._ego_vehicle.id)
+            if ego_snapshot is None:
+                logging.info('Ego vehicle %s not found', self._ego_vehicle.id)
+                self._ego_vehicle = None
+
+        # Listing the actors is an RPC, the ego vehicle is looked up once per simulation second.
+        if self._ego_vehicle is None and world_snapshot.frame >= self._ego_lookup_frame:
+            self._ego_lookup_frame = world_snapshot.frame + max(
+                1, int(round(1.0 / self.carla.step_length)))
+            for actor in self.carla.world.get_actors().filter('vehicle.*'):
+                if actor.attributes.get('role_name') == self.ego_role_name:
+                    logging.info('Publishing the state of the ego vehicle %s', actor.id)
+                    self._ego_vehicle = actor
+                    ego_snapshot = world_snapshot.find(actor.id)
+                    break
+
+        return world_snapshot, ego_snapshot
+
+    def get_ego_vehicle_frame(self):
+        """
+        Returns the frame with the state of the ego vehicle in the current carla step, or None if
+        there is no ego vehicle. The state is read from the world snapshot (no RPC).
+        """
+        world_snapshot, ego_snapshot = self._get_ego_snapshot()
+        if ego_snapshot is None:
+            return None
+
+        frame = encode_ego_vehicle_frame(ego_snapshot.get_transform(),
+                                         self._ego_vehicle.bounding_box.extent, self._ego_frame_id,
+                                         world_snapshot.timestamp.elapsed_seconds)
+        self._ego_frame_id += 1
+        return frame
+
     def close(self):
         """
         Cleans synchronization.
@@ -154,36 +307,224 @@ class SimulationSynchronization(object):
 
         # Destroying synchronized actors.
         for carla_actor_id in self.sumo2carla_ids.values():
-            self.carla.destroy_actor(carla_actor_id)
+            self.carla.request_destroy(carla_actor_id)
+        self.carla.apply_actor_requests()
+
+        logging.info('Frame statistics: %s', self.frame_tracker)
+        if self.interest_manager is not None:
+            logging.info('Interest statistics: %s', self.interest_manager)
 
         # Closing carla client.
+        self.transport.close()
         self.carla.close()
 
 
-def synchronization_loop(args):
+# ==================================================================================================
+# -- asyncio runtime -------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class FrameMailbox(object):
     """
-    Entry point for sumo-carla co-simulation.
+    FrameMailbox holds the frames fetched and not applied yet. All of them are handed over (delta
+    encoded frames depend on the previous ones).
+    """
+    def __init__(self):
+        self.payloads = []
+        self.fetch_time = None  # Time (perf_counter) when the latest frame was fetched.
+        self.missing = False  # The sumo context does not exist (polling transports).
+        self._event = asyncio.Event()
+
+    def put(self, payloads):
+        self.payloads.extend(payloads)
+        self.fetch_time = time.perf_counter()
+        self.missing = False
+        self._event.set()
+
+    def set_missing(self):
+        self.missing = True
+        self._event.set()
+
+    async def take(self, timeout):
+        """
+        Returns the pending frames and the time the latest one was fetched. Waits up to `timeout`
+        seconds for new frames.
+        """
+        if not self.payloads and not self.missing and timeout > 0:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._event.clear()
+
+        payloads, fetch_time = self.payloads, self.fetch_time
+        self.payloads, self.fetch_time = [], None
+        return payloads, fetch_time
+
+
+async def fetch_frames(transport, mailbox, timeout, poll_interval):
+    """
+    Fetches the frames of the sumo context into the mailbox until cancelled. Polling transports
+    only hand over the frames that changed.
     """
-    carla_simulation = CarlaSimulation(args.carla_host, args.carla_port, args.step_length)
+    last_payload = None
+    while True:
+        payloads = await transport.receive(timeout)
+        if transport.polling:
+            if not payloads:
+                mailbox.set_missing()
+                last_payload = None
+            elif payloads[-1] != last_payload:
+                last_payload = payloads[-1]
+                mailbox.put(payloads)
+            await asyncio.sleep(poll_interval)
+        elif payloads:
+            mailbox.put(payloads)
+
+
+async def run_async_synchronization(synchronization, args):
+    """
+    Asyncio runtime of the synchronization: the next frames are fetched with redis.asyncio while
+    the current one is applied in carla. The blocking carla calls run in a worker thread, one at a
+    time. Frames are applied as soon as they are fetched, and carla is ticked anyway if there is no
+    new frame in a step (polling transports). Runs until cancelled (SIGINT/SIGTERM).
+    """
+    # Only imported by the asyncio runtime (redis.asyncio is not available in old redis-py).
+    import redis.asyncio  # pylint: disable=import-outside-toplevel
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, task.cancel)
+        except NotImplementedError:
+            pass  # Not available on windows, KeyboardInterrupt is raised instead.
+
+    client = redis.asyncio.Redis(host='localhost', port=6379, db=0)
+    transport_kwargs = {'maxlen': args.stream_maxlen} if args.transport == 'stream' else {}
+    transport = create_async_transport(args.transport, client, TERASIM_VEHICLE_KEY,
+                                       **transport_kwargs)
+    ego_transport = None
+    if args.publish_ego:
+        ego_transport = create_async_transport(args.ego_transport, client, EGO_VEHICLE_KEY)
+
+    # Polling transports tick carla at least once per step, push based ones wait for the producer.
+    if transport.polling:
+        timeout = 0.0 if args.max_speed else args.step_length
+    else:
+        timeout = args.transport_timeout
+
+    mailbox = FrameMailbox()
+    fetcher = asyncio.create_task(
+        fetch_frames(transport, mailbox, args.transport_timeout, args.poll_interval))
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    # Only used for the statistics, ticks are paced by the frames.
+    scheduler = TickScheduler(args.step_length, max_speed=True)
+    latencies = []  # From fetching a frame to the end of the carla tick applying it, in seconds.
 
-    synchronization = SimulationSynchronization(carla_simulation, args.sync_vehicle_color, args.sync_vehicle_lights)
-    
     try:
         while True:
-            start = time.time()
+            payloads, fetch_time = await mailbox.take(timeout)
+            if fetcher.done():
+                fetcher.result()  # Raises the error of the fetcher.
+
+            if not payloads:
+                if mailbox.missing:
+                    await loop.run_in_executor(executor, synchronization.clear)
+                    await asyncio.sleep(2)
+                    continue
+                if not transport.polling:
+                    logging.debug('No new frame received in %s s', timeout)
+                    continue
+
+            await loop.run_in_executor(executor, synchronization.apply, payloads)
+            if fetch_time is not None:
+                latencies.append(time.perf_counter() - fetch_time)
+
+            if ego_transport is not None:
+                frame = await loop.run_in_executor(executor,
+                                                   synchronization.get_ego_vehicle_frame)
+                if frame is not None:
+                    await ego_transport.publish(frame)
+
+            scheduler.advance()
+
+    finally:
+        fetcher.cancel()
+        await asyncio.gather(fetcher, return_exceptions=True)
+
+        # Waits for the carla call in progress, if any.
+        await loop.run_in_executor(None, executor.shutdown)
 
+        await transport.close()
+        if ego_transport is not None:
+            await ego_transport.close()
+        await close_async_client(client)
+
+        logging.info('Tick statistics:\n%s', scheduler.summary())
+        if latencies:
+            logging.info('Fetch to tick latency: mean %.2fms, max %.2fms',
+                         1e3 * sum(latencies) / len(latencies), 1e3 * max(latencies))
+
+
+def synchronization_loop(args):
+    """
+    Entry point for sumo-carla co-simulation.
+    """
+    # Vehicles entering and leaving the scenario are recycled instead of spawned and destroyed.
+    actor_pool = ActorPool(max_parked=args.actor_pool_size) if args.actor_pool else None
+    carla_simulation = CarlaSimulation(args.carla_host, args.carla_port, args.step_length,
+                                       actor_pool, args.reconcile_interval)
+
+    interest_manager = None
+    if args.interest_radius is not None:
+        interest_manager = InterestManager(args.interest_radius, args.interest_hysteresis)
+
+    synchronization = SimulationSynchronization(carla_simulation, args.sync_vehicle_color,
+                                                args.sync_vehicle_lights, args.transport,
+                                                args.transport_timeout, args.stream_maxlen,
+                                                args.ego_role_name, interest_manager)
+
+    if args.runtime == 'asyncio':
+        try:
+            asyncio.run(run_async_synchronization(synchronization, args))
+
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            logging.info('Cancelled by user.')
+
+        finally:
+            logging.info('Cleaning synchronization')
+            synchronization.close()
+        return
+
+    ego_transport = None
+    if args.publish_ego:
+        ego_transport = create_transport(args.ego_transport, synchronization.redis,
+                                         EGO_VEHICLE_KEY)
+
+    # Push based transports are paced by the producer.
+    scheduler = TickScheduler(args.step_length, args.catch_up,
+                              args.max_speed or not synchronization.transport.polling)
+    try:
+        while True:
             synchronization.tick()
 
-            end = time.time()
-            elapsed = end - start
-            if elapsed < args.step_length:
-                time.sleep(args.step_length - elapsed)
+            if ego_transport is not None:
+                frame = synchronization.get_ego_vehicle_frame()
+                if frame is not None:
+                    ego_transport.publish(frame)
+
+            scheduler.wait()
 
     except KeyboardInterrupt:
         logging.info('Cancelled by user.')
 
     finally:
+        logging.info('Tick statistics:\n%s', scheduler.summary())
         logging.info('Cleaning synchronization')
+        if ego_transport is not None:
+            ego_transport.close()
         synchronization.close()
 
 
@@ -206,13 +547,102 @@ if __name__ == '__main__':
                            default=0.05,
                            type=float,
                            help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--catch-up',
+                           choices=CATCH_UP_POLICIES,
+                           default='skip',
+                           help='what to do when a tick overruns its step: drop the lost time (skip) '
+                           'or run the next ticks without sleeping until the schedule is caught up '
+                           '(burst) (default: skip)')
+    argparser.add_argument('--max-speed',
+                           action='store_true',
+                           help='run the ticks without sleeping, e.g., for offline batch runs '
+                           '(default: False)')
     argparser.add_argument('--sync-vehicle-lights',
                            action='store_true',
                            help='synchronize vehicle lights state (default: False)')
     argparser.add_argument('--sync-vehicle-color',
                            action='store_true',
                            help='synchronize vehicle color (default: False)')
+    argparser.add_argument('--actor-pool',
+                           action='store_true',
+                           help='recycle carla vehicles parked out of view instead of spawning and '
+                           'destroying them (default: False)')
+    argparser.add_argument('--actor-pool-size',
+                           default=200,
+                           type=int,
+                           help='max number of parked vehicles in the actor pool (default: 200)')
+    argparser.add_argument('--reconcile-interval',
+                           default=0,
+                           type=int,
+                           help='track the spawned and destroyed carla vehicles incrementally and '
+                           'only list all the world actors every N ticks, 0 to list them every tick '
+                           '(default: 0)')
+    argparser.add_argument('--transport',
+                           type=str,
+                           choices=['get', 'stream', 'pubsub', 'shm'],
+                           default='get',
+                           help='how the terasim frames are received: polling the redis key (get), '
+                           'blocking on a redis stream (stream) or on a pub/sub channel (pubsub), '
+                           'or through shared memory when terasim runs in the same host (shm) '
+                           '(default: get)')
+    argparser.add_argument('--transport-timeout',
+                           default=1.0,
+                           type=float,
+                           help='max time to wait for a new frame with push based transports '
+                           '(default: 1.0s)')
+    argparser.add_argument('--stream-maxlen',
+                           default=100,
+                           type=int,
+                           help='approximate max number of frames kept in the redis stream '
+                           '(default: 100)')
+    argparser.add_argument('--runtime',
+                           choices=['sync', 'asyncio'],
+                           default='sync',
+                           help='receive and apply the frames one after the other (sync), or fetch '
+                           'the next frames with redis.asyncio while the current one is applied '
+                           '(asyncio), not available with the shm transport (default: sync)')
+    argparser.add_argument('--poll-interval',
+                           default=0.002,
+                           type=float,
+                           help='time between reads of the redis key with the get transport in the '
+                           'asyncio runtime (default: 0.002s)')
+    argparser.add_argument('--ego-role-name',
+                           metavar='NAME',
+                           default='hero',
+                           help='role name of the carla ego vehicle, the center of the area of '
+                           'interest (default: hero)')
+    argparser.add_argument('--publish-ego',
+                           action='store_true',
+                           help='publish the state of the ego vehicle to the sumo side after each '
+                           'tick, not to be used with run_synchronization_ego.py, which publishes '
+                           'it too (default: False)')
+    argparser.add_argument('--ego-transport',
+                           choices=['get', 'stream', 'pubsub', 'shm'],
+                           default='get',
+                           help='how the ego vehicle is published, as in the transport option '
+                           '(default: get)')
+    argparser.add_argument('--interest-radius',
+                           metavar='R',
+                           default=None,
+                           type=float,
+                           help='only spawn in carla the vehicles within R meters of the ego '
+                           'vehicle, None to spawn all of them (default: None)')
+    argparser.add_argument('--interest-hysteresis',
+                           metavar='M',
+                           default=10.0,
+                           type=float,
+                           help='vehicles are destroyed (or parked) in carla when they get M '
+                           'meters farther than the interest radius (default: 10.0)')
  
     arguments = argparser.parse_args()
-    
+
+    if arguments.runtime == 'asyncio':
+        transports = [arguments.transport]
+        if arguments.publish_ego:
+            transports.append(arguments.ego_transport)
+        for transport in transports:
+            if transport not in ASYNC_TRANSPORTS:
+                argparser.error('the {} transport is not available in the asyncio runtime'.format(
+                    transport))
+
     synchronization_loop(arguments)
\ No newline at end of file
@@ -78,13 +78,13 @@ except IndexError:
 # -- imports -------------------------------------------------------------------
 # ==============================================================================
 
-import json
 import redis
 import carla
 
 from carla import ColorConverter as cc
 
-from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+from sumo_integration.ego_vehicle import EGO_VEHICLE_KEY, encode_ego_vehicle_frame  # pylint: disable=wrong-import-position
+from sumo_integration.transport import create_transport  # pylint: disable=wrong-import-position
 
 import argparse
 import collections
@@ -1095,6 +1095,7 @@ def game_loop(args):
     original_settings = None
 
     redis_server = redis.Redis(host='localhost', port=6379, db=0)
+    transport = create_transport(args.transport, redis_server, EGO_VEHICLE_KEY)
 
     try:
         client = carla.Client(args.host, args.port)
@@ -1124,6 +1125,10 @@ def game_loop(args):
         else:
             sim_world.wait_for_tick()
 
+        # Published frames are stamped with a monotonically increasing id and the
+        # simulation time, so the readers can tell new frames from repeated ones.
+        frame_id = 0
+
         clock = pygame.time.Clock()
         while True:
             if args.sync:
@@ -1135,24 +1140,11 @@ def game_loop(args):
             world.render(display)
             pygame.display.flip()
 
-            sumo_transform = BridgeHelper.get_sumo_transform(world.player.get_transform(),
-                                        world.player.bounding_box.extent)
-
-            vehicle = {
-                "location": {
-                    'x': sumo_transform.location.x + 2.2, 
-                    'y': sumo_transform.location.y + 159.0, 
-                    'z': sumo_transform.location.z
-                },
-                "rotation": {
-                    'x': sumo_transform.rotation.roll, 
-                    'y': sumo_transform.rotation.pitch, 
-                    'z': sumo_transform.rotation.yaw
-                },
-            }
-
-            cosim_thirdpartysim_vehicle_info = {"CARLA_EGO": vehicle}
-            redis_server.set('cosim_thirdpartysim_vehicle_info', json.dumps(cosim_thirdpartysim_vehicle_info))
+            transport.publish(
+                encode_ego_vehicle_frame(world.player.get_transform(),
+                                         world.player.bounding_box.extent, frame_id,
+                                         sim_world.get_snapshot().timestamp.elapsed_seconds))
+            frame_id += 1
 
     finally:
 
@@ -1165,6 +1157,8 @@ def game_loop(args):
         if world is not None:
             world.destroy()
 
+        transport.close()
+
         pygame.quit()
 
 
@@ -1225,6 +1219,12 @@ def main():
         '--sync',
         action='store_true',
         help='Activate synchronous mode execution')
+    argparser.add_argument(
+        '--transport',
+        choices=['get', 'stream', 'pubsub', 'shm'],
+        default='get',
+        help='how the ego vehicle is published: redis key (get), redis stream (stream), redis '
+        'pub/sub channel (pubsub) or shared memory in the same host (shm) (default: get)')
     args = argparser.parse_args()
 
     args.width, args.height = [int(x) for x in args.res.split('x')]
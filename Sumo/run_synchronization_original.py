@@ -14,8 +14,10 @@ Script to integrate CARLA and SUMO simulations
 # ==================================================================================================
 
 import argparse
+import collections
 import logging
-import time
+
+from concurrent.futures import ThreadPoolExecutor
 
 # ==================================================================================================
 # -- find carla module -----------------------------------------------------------------------------
@@ -33,6 +35,8 @@ try:
 except IndexError:
     pass
 
+import carla  # pylint: disable=import-error, wrong-import-position
+
 # ==================================================================================================
 # -- find traci module -----------------------------------------------------------------------------
 # ==================================================================================================
@@ -42,6 +46,11 @@ except IndexError:
 # else:
 #     sys.exit("please declare environment variable 'SUMO_HOME'")
 
+# The sumo backend (traci or libsumo) is selected before traci is imported.
+from sumo_integration.sumo_backend import SUMO_BACKENDS, parse_sumo_backend, select_sumo_backend  # pylint: disable=wrong-import-position
+
+select_sumo_backend(parse_sumo_backend())
+
 # ==================================================================================================
 # -- sumo integration imports ----------------------------------------------------------------------
 # ==================================================================================================
@@ -49,40 +58,117 @@ except IndexError:
 from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
 from sumo_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
 from sumo_integration.constants import INVALID_ACTOR_ID  # pylint: disable=wrong-import-position
+from sumo_integration.interest_manager import InterestManager  # pylint: disable=wrong-import-position
+from sumo_integration.profiler import TickProfiler  # pylint: disable=wrong-import-position
+from sumo_integration.scheduler import CATCH_UP_POLICIES, TickScheduler  # pylint: disable=wrong-import-position
 from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
 
 # ==================================================================================================
 # -- synchronization_loop --------------------------------------------------------------------------
 # ==================================================================================================
 
+SYNC_MODES = ('lockstep', 'pipelined')
+
+# State of the sumo simulation after a sumo step, handed to the carla side.
+SumoFrame = collections.namedtuple(
+    'SumoFrame',
+    [
+        'step',  # Sumo step.
+        'carla_step',  # Carla step of the commands applied before this sumo step (0 if none).
+        'spawned_actors',  # [(sumo_actor_id, SumoActor)], to be spawned in carla.
+        'destroyed_actors',  # {sumo_actor_id}
+        'fleet',  # SumoFleetState of the subscribed actors.
+        'tl_states',  # {landmark_id: sumo_tl_state}, landmarks changed in this step.
+        'rejected_actors'  # {carla_actor_id}, carla actors that could not be spawned in sumo.
+    ])
+
+# Changes of the carla simulation after a carla step, to be applied in sumo.
+CarlaCommands = collections.namedtuple(
+    'CarlaCommands',
+    [
+        'step',  # Carla step.
+        'spawned_actors',  # [(carla_actor_id, carla_actor)], to be spawned in sumo.
+        'destroyed_actors',  # [carla_actor_id]
+        'vehicles',  # [(carla_actor_id, sumo_transform, carla_lights)]
+        'tl_states',  # {landmark_id: sumo_tl_state}, landmarks changed in this step.
+        'rejected_actors'  # [sumo_actor_id], sumo actors that could not be spawned in carla.
+    ])
+
 
 class SimulationSynchronization(object):
     """
     SimulationSynchronization class is responsible for the synchronization of sumo and carla
     simulations.
+
+    Each tick is split in a sumo stage (applies the carla commands of the previous carla step, ticks
+    sumo and reads the resulting SumoFrame) and a carla stage (applies the frame in carla, ticks
+    carla and collects the CarlaCommands). Only the sumo stage uses TraCI and only the carla stage
+    uses the carla client.
+
+        * lockstep (default): the stages run one after the other, sumo sees the carla actors of the
+          previous carla step.
+        * pipelined: the sumo stage of the step N+1 runs in a worker thread while the carla stage
+          renders the step N, so sumo sees the carla actors with one more step of lag (i.e.,
+          frame.step - frame.carla_step is at most 2).
+
+    With an interest manager, only the sumo vehicles near the ego vehicle (the carla vehicle with
+    the `role_name` attribute set to `ego_role_name`) are spawned in carla. The rest are still
+    simulated in sumo and spawned when they get close.
     """
     def __init__(self,
                  sumo_simulation,
                  carla_simulation,
                  tls_manager='none',
                  sync_vehicle_color=False,
-                 sync_vehicle_lights=False):
+                 sync_vehicle_lights=False,
+                 profiler=None,
+                 sync_mode='lockstep',
+                 interest_manager=None,
+                 ego_role_name='hero'):
+
+        if sync_mode not in SYNC_MODES:
+            raise ValueError('Unknown synchronization mode {} (available: {})'.format(
+                sync_mode, ', '.join(SYNC_MODES)))
 
         self.sumo = sumo_simulation
         self.carla = carla_simulation
 
+        # Profiler of the tick phases, disabled by default.
+        self.profiler = profiler if profiler is not None else TickProfiler(enabled=False)
+
         self.tls_manager = tls_manager
         self.sync_vehicle_color = sync_vehicle_color
         self.sync_vehicle_lights = sync_vehicle_lights
+        self.sync_mode = sync_mode
 
         if tls_manager == 'carla':
             self.sumo.switch_off_traffic_lights()
         elif tls_manager == 'sumo':
             self.carla.switch_off_traffic_lights()
 
+        # Landmarks with a traffic light in both simulations (for any sumo program).
+        self.common_landmarks = self.sumo.traffic_light_ids & self.carla.traffic_light_ids
+
         # Mapped actor ids.
-        self.sumo2carla_ids = {}  # Contains only actors controlled by sumo.
-        self.carla2sumo_ids = {}  # Contains only actors controlled by carla.
+        self.sumo2carla_ids = {}  # Contains only actors controlled by sumo. Carla stage.
+        self.carla2sumo_ids = {}  # Contains only actors controlled by carla. Sumo stage.
+
+        # Carla actors (not controlled by sumo) synchronized in sumo. Carla stage.
+        self._carla_actors = set()
+
+        # Vehicles of interest, disabled by default. Carla stage.
+        self.interest_manager = interest_manager
+        self.ego_role_name = ego_role_name
+        self._ego_location = None  # (x, y) of the ego vehicle in the last carla step.
+        self._sumo_actors = {}  # {sumo_actor_id: SumoActor}, sumo actors whether in carla or not.
+
+        self._sumo_step = 0
+        self._carla_step = 0
+        self._commands = None  # Carla commands not applied in sumo yet.
+
+        # Sumo stage of the next step, running in the worker thread (pipelined mode).
+        self._executor = ThreadPoolExecutor(max_workers=1) if sync_mode == 'pipelined' else None
+        self._next_frame = None
 
         BridgeHelper.blueprint_library = self.carla.world.get_blueprint_library()
         BridgeHelper.offset = self.sumo.get_net_offset()
@@ -100,125 +186,344 @@ class SimulationSynchronization(object):
         """
         Tick to simulation synchronization
         """
+        self.profiler.begin_tick()
+
+        if self._executor is None:
+            frame = self._tick_sumo(self._commands)
+        else:
+            frame = self._next_frame.result() if self._next_frame is not None else \
+                self._tick_sumo(self._commands)
+            self._next_frame = self._executor.submit(self._tick_sumo, self._commands)
+
+        self._commands = self._tick_carla(frame)
+
+        self.profiler.end_tick(len(self.sumo2carla_ids) + len(self._carla_actors))
+
+    def _tick_sumo(self, commands):
+        """
+        Sumo stage: applies the carla commands, ticks sumo and reads the sumo changes.
+
+            :param commands: CarlaCommands of the last carla step (None if there are none).
+            :return: SumoFrame.
+        """
+        profiler = self.profiler
+
         # -----------------
-        # sumo-->carla sync
+        # carla-->sumo sync
         # -----------------
-        self.sumo.tick()
+        rejected_actors = set()
+        if commands is not None:
+            # Spawning new carla actors (not controlled by sumo)
+            with profiler.span('reverse_spawn') as span:
+                for carla_actor_id, carla_actor in commands.spawned_actors:
+                    # Only the local attributes of the carla actor are used (no carla RPC).
+                    type_id = BridgeHelper.get_sumo_vtype(carla_actor)
+                    if self.sync_vehicle_color:
+                        color = carla_actor.attributes.get('color', None)
+                    else:
+                        color = None
+
+                    sumo_actor_id = INVALID_ACTOR_ID
+                    if type_id is not None:
+                        sumo_actor_id = self.sumo.spawn_actor(type_id, color)
+                    if sumo_actor_id != INVALID_ACTOR_ID:
+                        self.carla2sumo_ids[carla_actor_id] = sumo_actor_id
+                        self.sumo.subscribe(sumo_actor_id)
+                    else:
+                        rejected_actors.add(carla_actor_id)
+                span.actors = len(commands.spawned_actors)
+
+            # Destroying required carla actors in sumo.
+            with profiler.span('reverse_destroy') as span:
+                for carla_actor_id in commands.destroyed_actors:
+                    if carla_actor_id in self.carla2sumo_ids:
+                        self.sumo.destroy_actor(self.carla2sumo_ids.pop(carla_actor_id))
+                span.actors = len(commands.destroyed_actors)
+
+            # Updating carla actors in sumo.
+            with profiler.span('reverse_update') as span:
+                for carla_actor_id, sumo_transform, carla_lights in commands.vehicles:
+                    sumo_actor_id = self.carla2sumo_ids.get(carla_actor_id)
+                    if sumo_actor_id is None:
+                        continue
+
+                    if carla_lights is not None:
+                        sumo_actor = self.sumo.get_actor(sumo_actor_id)
+                        sumo_lights = BridgeHelper.get_sumo_lights_state(sumo_actor.signals,
+                                                                         carla_lights)
+                    else:
+                        sumo_lights = None
+
+                    self.sumo.synchronize_vehicle(sumo_actor_id, sumo_transform, sumo_lights)
+                span.actors = len(commands.vehicles)
+
+            # Updates traffic lights in sumo based on carla information.
+            if self.tls_manager == 'carla':
+                with profiler.span('reverse_tls') as span:
+                    for landmark_id, sumo_tl_state in commands.tl_states.items():
+                        # Updates all the sumo links related to this landmark.
+                        self.sumo.synchronize_traffic_light(landmark_id, sumo_tl_state)
+                    span.actors = len(commands.tl_states)
+
+            for sumo_actor_id in commands.rejected_actors:
+                self.sumo.unsubscribe(sumo_actor_id)
 
-        # Spawning new sumo actors in carla (i.e, not controlled by carla).
-        sumo_spawned_actors = self.sumo.spawned_actors - set(self.carla2sumo_ids.values())
-        for sumo_actor_id in sumo_spawned_actors:
-            self.sumo.subscribe(sumo_actor_id)
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
-
-            carla_blueprint = BridgeHelper.get_carla_blueprint(sumo_actor, self.sync_vehicle_color)
-            if carla_blueprint is not None:
-                carla_transform = BridgeHelper.get_carla_transform(sumo_actor.transform,
-                                                                   sumo_actor.extent)
-
-                print("carla_blueprint", carla_blueprint)
-                print("carla_transform", carla_transform)
-                carla_actor_id = self.carla.spawn_actor(carla_blueprint, carla_transform)
-                if carla_actor_id != INVALID_ACTOR_ID:
-                    self.sumo2carla_ids[sumo_actor_id] = carla_actor_id
+        # -----------------
+        # sumo-->carla sync
+        # -----------------
+        with profiler.span('sumo_step'):
+            self.sumo.tick()
+        self._sumo_step += 1
+
+        with profiler.span('sumo_read') as span:
+            # New sumo actors (i.e, not controlled by carla).
+            spawned_actors = []
+            for sumo_actor_id in self.sumo.spawned_actors - set(self.carla2sumo_ids.values()):
+                self.sumo.subscribe(sumo_actor_id)
+                spawned_actors.append((sumo_actor_id, self.sumo.get_actor(sumo_actor_id)))
+
+            # The state of all the subscribed actors is read at once.
+            fleet = self.sumo.get_fleet_state()
+
+            # Only the landmarks whose state changed are updated.
+            if self.tls_manager == 'sumo':
+                tl_states = self.sumo.get_changed_traffic_light_states()
             else:
-                self.sumo.unsubscribe(sumo_actor_id)
+                tl_states = {}
+            span.actors = len(fleet.ids)
 
-        # Destroying sumo arrived actors in carla.
-        for sumo_actor_id in self.sumo.destroyed_actors:
-            if sumo_actor_id in self.sumo2carla_ids:
-                self.carla.destroy_actor(self.sumo2carla_ids.pop(sumo_actor_id))
+        return SumoFrame(self._sumo_step, commands.step if commands is not None else 0,
+                         spawned_actors, self.sumo.destroyed_actors, fleet, tl_states,
+                         rejected_actors)
 
-        # Updating sumo actors in carla.
-        for sumo_actor_id in self.sumo2carla_ids:
-            carla_actor_id = self.sumo2carla_ids[sumo_actor_id]
+    def _tick_carla(self, frame):
+        """
+        Carla stage: applies the sumo frame, ticks carla and collects the carla changes.
 
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
-            carla_actor = self.carla.get_actor(carla_actor_id)
+            :param frame: SumoFrame of the last sumo step.
+            :return: CarlaCommands.
+        """
+        profiler = self.profiler
 
+        # -----------------
+        # sumo-->carla sync
+        # -----------------
+        # Spawning new sumo actors in carla (i.e, not controlled by carla).
+        rejected_actors = []
+        with profiler.span('spawn') as span:
+            for sumo_actor_id, sumo_actor in frame.spawned_actors:
+                if self.interest_manager is not None:
+                    # Spawned when entering the area of interest (see _update_interest).
+                    self._sumo_actors[sumo_actor_id] = sumo_actor
+                    continue
+
+                carla_blueprint = BridgeHelper.get_carla_blueprint(sumo_actor,
+                                                                   self.sync_vehicle_color)
+                if carla_blueprint is not None:
+                    carla_transform = BridgeHelper.get_carla_transform(sumo_actor.transform,
+                                                                       sumo_actor.extent)
+
+                    print("carla_blueprint", carla_blueprint)
+                    print("carla_transform", carla_transform)
+                    self.carla.request_spawn(sumo_actor_id, carla_blueprint, carla_transform)
+                else:
+                    rejected_actors.append(sumo_actor_id)
+            span.actors = len(frame.spawned_actors)
+
+        # Destroying sumo arrived actors in carla.
+        with profiler.span('destroy') as span:
+            for sumo_actor_id in frame.destroyed_actors:
+                self._sumo_actors.pop(sumo_actor_id, None)
+                if sumo_actor_id in self.sumo2carla_ids:
+                    self.carla.request_destroy(self.sumo2carla_ids.pop(sumo_actor_id))
+            span.actors = len(frame.destroyed_actors)
+
+        # Sumo to carla transforms of the whole fleet at once.
+        fleet = frame.fleet
+        with profiler.span('transforms') as span:
             # apply offset (may not be accurate)
-            sumo_actor.transform.location.z -= 34.5
-            sumo_actor.transform.location.x += 97.0
-            sumo_actor.transform.location.y += 122.0
-
-            carla_transform = BridgeHelper.get_carla_transform(sumo_actor.transform,
-                                                               sumo_actor.extent)
-            if self.sync_vehicle_lights:
-                carla_lights = BridgeHelper.get_carla_lights_state(carla_actor.get_light_state(),
-                                                                   sumo_actor.signals)
-            else:
-                carla_lights = None
+            locations, rotations = BridgeHelper.get_carla_transforms(
+                fleet.locations + (97.0, 122.0, -34.5), fleet.rotations, fleet.extents)
+            span.actors = len(fleet.ids)
+
+        # Spawning the vehicles entering the area of interest and destroying the ones leaving it.
+        if self.interest_manager is not None:
+            with profiler.span('interest') as span:
+                rejected_actors.extend(self._update_interest(fleet.ids, locations, rotations))
+                span.actors = len(self._sumo_actors)
+
+        # Spawning and destroying actors in carla in a single batch.
+        with profiler.span('actor_requests') as span:
+            spawned_actors = self.carla.apply_actor_requests()
+            self.sumo2carla_ids.update({
+                sumo_actor_id: carla_actor_id
+                for sumo_actor_id, carla_actor_id in spawned_actors.items()
+                if carla_actor_id != INVALID_ACTOR_ID
+            })
+            span.actors = len(spawned_actors)
+
+        # Updating sumo actors in carla.
+        with profiler.span('update') as span:
+            locations = locations.tolist()
+            rotations = rotations.tolist()
+            signals = fleet.signals.tolist()
+
+            for i, sumo_actor_id in enumerate(fleet.ids):
+                carla_actor_id = self.sumo2carla_ids.get(sumo_actor_id)
+                if carla_actor_id is None:
+                    continue
+
+                location, rotation = locations[i], rotations[i]
+                carla_transform = carla.Transform(
+                    carla.Location(location[0], location[1], location[2]),
+                    carla.Rotation(rotation[0], rotation[1], rotation[2]))
+                if self.sync_vehicle_lights:
+                    carla_actor = self.carla.get_actor(carla_actor_id)
+                    carla_lights = BridgeHelper.get_carla_lights_state(
+                        carla_actor.get_light_state(), signals[i])
+                else:
+                    carla_lights = None
 
-            self.carla.synchronize_vehicle(carla_actor_id, carla_transform, carla_lights)
+                # Queued, sent to carla in a single batch when ticking.
+                self.carla.synchronize_vehicle(carla_actor_id, carla_transform, carla_lights)
+            span.actors = len(fleet.ids)
 
         # Updates traffic lights in carla based on sumo information.
         if self.tls_manager == 'sumo':
-            common_landmarks = self.sumo.traffic_light_ids & self.carla.traffic_light_ids
-            for landmark_id in common_landmarks:
-                sumo_tl_state = self.sumo.get_traffic_light_state(landmark_id)
-                carla_tl_state = BridgeHelper.get_carla_traffic_light_state(sumo_tl_state)
+            with profiler.span('tls') as span:
+                for landmark_id, sumo_tl_state in frame.tl_states.items():
+                    if landmark_id not in self.common_landmarks:
+                        continue
+                    carla_tl_state = BridgeHelper.get_carla_traffic_light_state(sumo_tl_state)
 
-                self.carla.synchronize_traffic_light(landmark_id, carla_tl_state)
+                    self.carla.synchronize_traffic_light(landmark_id, carla_tl_state)
+                span.actors = len(frame.tl_states)
 
         # -----------------
         # carla-->sumo sync
         # -----------------
-        self.carla.tick()
-
-        # Spawning new carla actors (not controlled by sumo)
-        carla_spawned_actors = self.carla.spawned_actors - set(self.sumo2carla_ids.values())
-        for carla_actor_id in carla_spawned_actors:
-            carla_actor = self.carla.get_actor(carla_actor_id)
-
-            type_id = BridgeHelper.get_sumo_vtype(carla_actor)
-            color = carla_actor.attributes.get('color', None) if self.sync_vehicle_color else None
-            if type_id is not None:
-                sumo_actor_id = self.sumo.spawn_actor(type_id, color)
-                if sumo_actor_id != INVALID_ACTOR_ID:
-                    self.carla2sumo_ids[carla_actor_id] = sumo_actor_id
-                    self.sumo.subscribe(sumo_actor_id)
-
-        # Destroying required carla actors in sumo.
-        for carla_actor_id in self.carla.destroyed_actors:
-            if carla_actor_id in self.carla2sumo_ids:
-                self.sumo.destroy_actor(self.carla2sumo_ids.pop(carla_actor_id))
-
-        # Updating carla actors in sumo.
-        for carla_actor_id in self.carla2sumo_ids:
-            sumo_actor_id = self.carla2sumo_ids[carla_actor_id]
-
-            carla_actor = self.carla.get_actor(carla_actor_id)
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
-
-            sumo_transform = BridgeHelper.get_sumo_transform(carla_actor.get_transform(),
-                                                             carla_actor.bounding_box.extent)
-            
-            if self.sync_vehicle_lights:
-                carla_lights = self.carla.get_actor_light_state(carla_actor_id)
-                if carla_lights is not None:
-                    sumo_lights = BridgeHelper.get_sumo_lights_state(sumo_actor.signals,
-                                                                     carla_lights)
+        with profiler.span('carla_tick'):
+            self.carla.tick()
+        self._carla_step += 1
+
+        self._carla_actors -= frame.rejected_actors
+
+        with profiler.span('carla_read') as span:
+            # New carla actors (not controlled by sumo).
+            # The sumo vtype is resolved in the sumo stage, as it may create it.
+            spawned = []
+            for carla_actor_id in self.carla.spawned_actors - set(self.sumo2carla_ids.values()):
+                spawned.append((carla_actor_id, self.carla.get_actor(carla_actor_id)))
+                self._carla_actors.add(carla_actor_id)
+
+            destroyed = [
+                carla_actor_id for carla_actor_id in self.carla.destroyed_actors
+                if carla_actor_id in self._carla_actors
+            ]
+            self._carla_actors.difference_update(destroyed)
+
+            carla_actor_ids = list(self._carla_actors)
+            locations, rotations, extents = [], [], []
+            ego_location = None
+            for carla_actor_id in carla_actor_ids:
+                carla_actor = self.carla.get_actor(carla_actor_id)
+                carla_transform = carla_actor.get_transform()
+                location, rotation = carla_transform.location, carla_transform.rotation
+                extent = carla_actor.bounding_box.extent
+                locations.append((location.x, location.y, location.z))
+                rotations.append((rotation.pitch, rotation.yaw, rotation.roll))
+                extents.append((extent.x, extent.y, extent.z))
+
+                if self.interest_manager is not None and \
+                        carla_actor.attributes.get('role_name') == self.ego_role_name:
+                    ego_location = (location.x, location.y)
+
+            # Carla to sumo transforms of the carla actors at once.
+            locations, rotations = BridgeHelper.get_sumo_transforms(locations, rotations, extents)
+
+            vehicles = []
+            for carla_actor_id, location, rotation in zip(carla_actor_ids, locations.tolist(),
+                                                          rotations.tolist()):
+                sumo_transform = carla.Transform(
+                    carla.Location(location[0], location[1], location[2]),
+                    carla.Rotation(rotation[0], rotation[1], rotation[2]))
+
+                if self.sync_vehicle_lights:
+                    carla_lights = self.carla.get_actor_light_state(carla_actor_id)
                 else:
-                    sumo_lights = None
+                    carla_lights = None
+                vehicles.append((carla_actor_id, sumo_transform, carla_lights))
+
+            # Only the landmarks whose state changed are updated.
+            tl_states = {}
+            if self.tls_manager == 'carla':
+                changed_states = self.carla.get_changed_traffic_light_states()
+                for landmark_id, carla_tl_state in changed_states.items():
+                    if landmark_id in self.common_landmarks:
+                        tl_states[landmark_id] = BridgeHelper.get_sumo_traffic_light_state(
+                            carla_tl_state)
+            span.actors = len(self._carla_actors)
+
+        if (ego_location is None) != (self._ego_location is None):
+            if ego_location is None:
+                logging.info('Ego vehicle not found, spawning all the sumo vehicles in carla')
             else:
-                sumo_lights = None
+                logging.info('Spawning in carla the sumo vehicles near the ego vehicle')
+        self._ego_location = ego_location
 
-            self.sumo.synchronize_vehicle(sumo_actor_id, sumo_transform, sumo_lights)
+        return CarlaCommands(self._carla_step, spawned, destroyed, vehicles, tl_states,
+                             rejected_actors)
 
-        # Updates traffic lights in sumo based on carla information.
-        if self.tls_manager == 'carla':
-            common_landmarks = self.sumo.traffic_light_ids & self.carla.traffic_light_ids
-            for landmark_id in common_landmarks:
-                carla_tl_state = self.carla.get_traffic_light_state(landmark_id)
-                sumo_tl_state = BridgeHelper.get_sumo_traffic_light_state(carla_tl_state)
+    def _update_interest(self, sumo_actor_ids, locations, rotations):
+        """
+        Spawns in carla the sumo vehicles entering the area of interest and destroys the ones
+        leaving it (the requests are sent with the rest of the frame in `apply_actor_requests`).
 
-                # Updates all the sumo links related to this landmark.
-                self.sumo.synchronize_traffic_light(landmark_id, sumo_tl_state)
+            :param sumo_actor_ids: ids of the sumo fleet.
+            :param locations: numpy array (N, 3) with the carla location of each vehicle.
+            :param rotations: numpy array (N, 3) with the carla rotation of each vehicle.
+            :return: [sumo_actor_id], sumo actors that could not be spawned in carla.
+        """
+        # Carla actors synchronized in sumo are also part of the fleet.
+        indices = [i for i, sumo_actor_id in enumerate(sumo_actor_ids)
+                   if sumo_actor_id in self._sumo_actors]
+        centers = [self._ego_location] if self._ego_location is not None else []
+        interest = self.interest_manager.update([sumo_actor_ids[i] for i in indices],
+                                                locations[indices], centers)
+
+        for sumo_actor_id in [i for i in self.sumo2carla_ids if i not in interest]:
+            self.carla.request_destroy(self.sumo2carla_ids.pop(sumo_actor_id))
+
+        rejected_actors = []
+        for i in indices:
+            sumo_actor_id = sumo_actor_ids[i]
+            if sumo_actor_id not in interest or sumo_actor_id in self.sumo2carla_ids:
+                continue
+
+            sumo_actor = self._sumo_actors[sumo_actor_id]
+            carla_blueprint = BridgeHelper.get_carla_blueprint(sumo_actor,
+                                                               self.sync_vehicle_color)
+            if carla_blueprint is None:
+                del self._sumo_actors[sumo_actor_id]
+                rejected_actors.append(sumo_actor_id)
+                continue
+
+            location, rotation = locations[i].tolist(), rotations[i].tolist()
+            carla_transform = carla.Transform(
+                carla.Location(location[0], location[1], location[2]),
+                carla.Rotation(rotation[0], rotation[1], rotation[2]))
+            self.carla.request_spawn(sumo_actor_id, carla_blueprint, carla_transform)
+
+        return rejected_actors
 
     def close(self):
         """
         Cleans synchronization.
         """
+        # Waits for the sumo stage running in the worker thread, if any.
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
         # Configuring carla simulation in async mode.
         settings = self.carla.world.get_settings()
         settings.synchronous_mode = False
@@ -227,11 +532,15 @@ class SimulationSynchronization(object):
 
         # Destroying synchronized actors.
         for carla_actor_id in self.sumo2carla_ids.values():
-            self.carla.destroy_actor(carla_actor_id)
+            self.carla.request_destroy(carla_actor_id)
+        self.carla.apply_actor_requests()
 
         for sumo_actor_id in self.carla2sumo_ids.values():
             self.sumo.destroy_actor(sumo_actor_id)
 
+        if self.interest_manager is not None:
+            logging.info('Interest statistics: %s', self.interest_manager)
+
         # Closing sumo and carla client.
         self.carla.close()
         self.sumo.close()
@@ -242,26 +551,39 @@ def synchronization_loop(args):
     Entry point for sumo-carla co-simulation.
     """
     sumo_simulation = SumoSimulation(args.sumo_cfg_file, args.step_length, args.sumo_host,
-                                     args.sumo_port, args.sumo_gui, args.client_order)
+                                     args.sumo_port, args.sumo_gui, args.client_order,
+                                     args.sumo_backend)
     carla_simulation = CarlaSimulation(args.carla_host, args.carla_port, args.step_length)
 
+    # RPCs issued to both simulators. In pipelined mode the RPCs of the sumo and carla stages running
+    # at the same time are counted in both.
+    profiler = TickProfiler(
+        args.profile or args.profile_output is not None,
+        rpc_counter=lambda: carla_simulation.rpc_count + sumo_simulation.traci_calls,
+        log_interval=args.profile_log_interval)
+
+    interest_manager = None
+    if args.interest_radius is not None:
+        interest_manager = InterestManager(args.interest_radius, args.interest_hysteresis)
+
     synchronization = SimulationSynchronization(sumo_simulation, carla_simulation, args.tls_manager,
-                                                args.sync_vehicle_color, args.sync_vehicle_lights)
+                                                args.sync_vehicle_color, args.sync_vehicle_lights,
+                                                profiler, args.sync_mode, interest_manager,
+                                                args.ego_role_name)
+    scheduler = TickScheduler(args.step_length, args.catch_up, args.max_speed)
     try:
         while True:
-            start = time.time()
-
             synchronization.tick()
-
-            end = time.time()
-            elapsed = end - start
-            if elapsed < args.step_length:
-                time.sleep(args.step_length - elapsed)
+            scheduler.wait()
 
     except KeyboardInterrupt:
         logging.info('Cancelled by user.')
 
     finally:
+        logging.info('Tick statistics:\n%s', scheduler.summary())
+        if args.profile_output is not None and profiler.ticks > 0:
+            profiler.dump(args.profile_output)
+            logging.info('Tick profile written to %s', args.profile_output)
         logging.info('Cleaning synchronization')
 
         synchronization.close()
@@ -295,10 +617,25 @@ if __name__ == '__main__':
                            default=True,
                            type=bool,
                            help='run the gui version of sumo')
+    argparser.add_argument('--sumo-backend',
+                           choices=SUMO_BACKENDS,
+                           default='traci',
+                           help='library used to communicate with sumo, libsumo runs sumo in this '
+                           'process without gui (default: traci)')
     argparser.add_argument('--step-length',
                            default=0.05,
                            type=float,
                            help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--catch-up',
+                           choices=CATCH_UP_POLICIES,
+                           default='skip',
+                           help='what to do when a tick overruns its step: drop the lost time (skip) '
+                           'or run the next ticks without sleeping until the schedule is caught up '
+                           '(burst) (default: skip)')
+    argparser.add_argument('--max-speed',
+                           action='store_true',
+                           help='run the ticks without sleeping, e.g., for offline batch runs '
+                           '(default: False)')
     argparser.add_argument('--client-order',
                            metavar='TRACI_CLIENT_ORDER',
                            default=1,
@@ -313,11 +650,50 @@ if __name__ == '__main__':
     argparser.add_argument('--sync-vehicle-all',
                            action='store_true',
                            help='synchronize all vehicle properties (default: False)')
+    argparser.add_argument('--sync-mode',
+                           choices=SYNC_MODES,
+                           default='lockstep',
+                           help='run the sumo and carla steps one after the other (lockstep), or '
+                           'the next sumo step in a worker thread while carla runs the current one '
+                           '(pipelined), sumo then sees the carla actors one step later '
+                           '(default: lockstep)')
+    argparser.add_argument('--interest-radius',
+                           metavar='R',
+                           default=None,
+                           type=float,
+                           help='only spawn in carla the sumo vehicles within R meters of the ego '
+                           'vehicle, None to spawn all of them (default: None)')
+    argparser.add_argument('--interest-hysteresis',
+                           metavar='M',
+                           default=10.0,
+                           type=float,
+                           help='vehicles are destroyed in carla when they get M meters farther '
+                           'than the interest radius (default: 10.0)')
+    argparser.add_argument('--ego-role-name',
+                           metavar='NAME',
+                           default='hero',
+                           help='role name of the carla vehicle at the center of the area of '
+                           'interest (default: hero)')
     argparser.add_argument('--tls-manager',
                            type=str,
                            choices=['none', 'sumo', 'carla'],
                            help="select traffic light manager (default: none)",
                            default='sumo')
+    argparser.add_argument('--profile',
+                           action='store_true',
+                           help='profile the phases of the synchronization tick (default: False)')
+    argparser.add_argument('--profile-log-interval',
+                           metavar='N',
+                           default=0,
+                           type=int,
+                           help='log the p50/p95/p99 duration of each tick phase every N ticks, 0 '
+                           'to disable (default: 0)')
+    argparser.add_argument('--profile-output',
+                           metavar='FILE',
+                           default=None,
+                           help='write the statistics of each tick phase to a csv file (json if '
+                           'the file name ends with .json) when the synchronization stops, '
+                           'enables the profiling (default: None)')
     argparser.add_argument('--debug', action='store_true', help='enable debug messages')
     arguments = argparser.parse_args()
 
@@ -18,7 +18,6 @@ import random
 import re
 import shutil
 import tempfile
-import time
 
 import lxml.etree as ET  # pylint: disable=wrong-import-position
 
@@ -47,17 +46,23 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("please declare environment variable 'SUMO_HOME'")
 
+# The sumo backend (traci or libsumo) is selected before traci is imported.
+from sumo_integration.sumo_backend import SUMO_BACKENDS, parse_sumo_backend, select_sumo_backend  # pylint: disable=wrong-import-position
+
+select_sumo_backend(parse_sumo_backend())
+
 # ==================================================================================================
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
-import sumolib  # pylint: disable=wrong-import-position
 import traci  # pylint: disable=wrong-import-position
 
 from sumo_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
+from sumo_integration.rerouter import SumoRerouter  # pylint: disable=wrong-import-position
+from sumo_integration.scheduler import CATCH_UP_POLICIES, TickScheduler  # pylint: disable=wrong-import-position
 from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
 
-from run_synchronization import SimulationSynchronization  # pylint: disable=wrong-import-position
+from run_synchronization_original import SimulationSynchronization  # pylint: disable=wrong-import-position
 
 from util.netconvert_carla import netconvert_carla
 
@@ -113,19 +118,20 @@ def main(args):
     viewsettings_file = os.path.join(basedir, 'examples', 'viewsettings.xml')
     write_sumocfg_xml(cfg_file, net_file, vtypes_file, viewsettings_file, args.additional_traci_clients)
 
-    sumo_net = sumolib.net.readNet(net_file)
     sumo_simulation = SumoSimulation(cfg_file,
                                      args.step_length,
                                      host=args.sumo_host,
                                      port=args.sumo_port,
                                      sumo_gui=args.sumo_gui,
-                                     client_order=args.client_order)
+                                     client_order=args.client_order,
+                                     backend=args.sumo_backend)
 
     # ---------------
     # synchronization
     # ---------------
     synchronization = SimulationSynchronization(sumo_simulation, carla_simulation, args.tls_manager,
                                                 args.sync_vehicle_color, args.sync_vehicle_lights)
+    scheduler = None
 
     try:
         # ----------
@@ -161,52 +167,38 @@ def main(args):
         # Spawn vehicles
         # --------------
         # Spawns sumo NPC vehicles.
-        sumo_edges = sumo_net.getEdges()
-
+        rerouter = SumoRerouter(sumo_simulation)
         for i in range(args.number_of_vehicles):
             type_id = random.choice(blueprints)
             vclass = vtypes[type_id]['vClass']
 
-            allowed_edges = [e for e in sumo_edges if e.allows(vclass)]
+            allowed_edges = sumo_simulation.get_allowed_edges(vclass)
             if allowed_edges:
-                edge = random.choice(allowed_edges)
+                edge_id = random.choice(allowed_edges)
 
-                traci.route.add('route_{}'.format(i), [edge.getID()])
+                traci.route.add('route_{}'.format(i), [edge_id])
                 traci.vehicle.add('sumo_{}'.format(i), 'route_{}'.format(i), typeID=type_id)
+                rerouter.add('sumo_{}'.format(i), vclass, [edge_id])
             else:
                 logging.error(
                     'Could not found a route for %s. No vehicle will be spawned in sumo',
                     type_id)
 
+        scheduler = TickScheduler(args.step_length, args.catch_up, args.max_speed)
         while True:
-            start = time.time()
-
             synchronization.tick()
 
             # Updates vehicle routes
-            for vehicle_id in traci.vehicle.getIDList():
-                route = traci.vehicle.getRoute(vehicle_id)
-                index = traci.vehicle.getRouteIndex(vehicle_id)
-                vclass = traci.vehicle.getVehicleClass(vehicle_id)
+            rerouter.tick()
 
-                if index == (len(route) - 1):
-                    current_edge = sumo_net.getEdge(route[index])
-                    available_edges = list(current_edge.getAllowedOutgoing(vclass).keys())
-                    if available_edges:
-                        next_edge = random.choice(available_edges)
-
-                        new_route = [current_edge.getID(), next_edge.getID()]
-                        traci.vehicle.setRoute(vehicle_id, new_route)
-
-            end = time.time()
-            elapsed = end - start
-            if elapsed < args.step_length:
-                time.sleep(args.step_length - elapsed)
+            scheduler.wait()
 
     except KeyboardInterrupt:
         logging.info('Cancelled by user.')
 
     finally:
+        if scheduler is not None:
+            logging.info('Tick statistics:\n%s', scheduler.summary())
         synchronization.close()
 
         if os.path.exists(tmpdir):
@@ -257,10 +249,25 @@ if __name__ == '__main__':
                            default='walker.pedestrian.*',
                            help='pedestrians filter (default: "walker.pedestrian.*")')
     argparser.add_argument('--sumo-gui', action='store_true', help='run the gui version of sumo')
+    argparser.add_argument('--sumo-backend',
+                           choices=SUMO_BACKENDS,
+                           default='traci',
+                           help='library used to communicate with sumo, libsumo runs sumo in this '
+                           'process without gui (default: traci)')
     argparser.add_argument('--step-length',
                            default=0.05,
                            type=float,
                            help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--catch-up',
+                           choices=CATCH_UP_POLICIES,
+                           default='skip',
+                           help='what to do when a tick overruns its step: drop the lost time (skip) '
+                           'or run the next ticks without sleeping until the schedule is caught up '
+                           '(burst) (default: skip)')
+    argparser.add_argument('--max-speed',
+                           action='store_true',
+                           help='run the ticks without sleeping, e.g., for offline batch runs '
+                           '(default: False)')
     argparser.add_argument('--additional-traci-clients',
                            metavar='TRACI_CLIENTS',
                            default=0,
@@ -288,6 +295,9 @@ if __name__ == '__main__':
     argparser.add_argument('--debug', action='store_true', help='enable debug messages')
     args = argparser.parse_args()
 
+    if args.sumo_backend == 'libsumo' and args.additional_traci_clients > 0:
+        argparser.error('additional TraCI clients are not supported with the libsumo backend')
+
     if args.sync_vehicle_all is True:
         args.sync_vehicle_lights = True
         args.sync_vehicle_color = True
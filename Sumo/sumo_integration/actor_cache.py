@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a cache of carla actor handles. """
+
+# ==================================================================================================
+# -- actor cache -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class ActorCache(object):
+    """
+    ActorCache keeps the carla actor handles already resolved through `world.get_actor`, so they
+    are only requested once. The handles of destroyed actors must be invalidated.
+    """
+    def __init__(self, world):
+        self.world = world
+
+        self._actors = {}  # {actor_id: actor}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._actors)
+
+    def get(self, actor_id):
+        """
+        Returns the actor with the given id, or None if it does not exist.
+        """
+        actor = self._actors.get(actor_id)
+        if actor is not None:
+            self.hits += 1
+            return actor
+
+        self.misses += 1
+        actor = self.world.get_actor(actor_id)
+        if actor is not None:
+            self._actors[actor_id] = actor
+        return actor
+
+    def invalidate(self, actor_id):
+        """
+        Removes the handle of the given actor (e.g., destroyed).
+        """
+        self._actors.pop(actor_id, None)
+
+    def invalidate_all(self, actor_ids):
+        """
+        Removes the handles of the given actors.
+        """
+        for actor_id in actor_ids:
+            self._actors.pop(actor_id, None)
+
+    def clear(self):
+        """
+        Removes all the handles.
+        """
+        self._actors.clear()
+
+    def counters(self):
+        """
+        Returns the current value of the counters.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'cached': len(self._actors)}
+
+    def __str__(self):
+        return ', '.join('{}: {}'.format(name, value) for name, value in self.counters().items())
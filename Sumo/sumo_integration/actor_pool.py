@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a pool of parked carla actors to be recycled instead of spawned. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+
+# ==================================================================================================
+# -- actor pool ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class ActorPool(object):
+    """
+    ActorPool keeps track of the carla vehicles parked out of view, keyed by blueprint id, so they
+    can be handed out instead of spawning new ones. The pool only manages ids, moving the actors in
+    and out of the parking is up to CarlaSimulation.
+
+    Parked vehicles keep the attributes they were spawned with (e.g., color), so the pool should not
+    be used when those attributes are synchronized.
+
+    Every `resize_interval` frames the pool is resized based on the hit rate of that period: if the
+    hit rate is below `target_hit_rate` the missing vehicles are pre-spawned, and half of the
+    vehicles that were parked during the whole period are destroyed.
+    """
+    def __init__(self, target_hit_rate=0.9, resize_interval=100, max_parked=200):
+        self.target_hit_rate = target_hit_rate
+        self.resize_interval = resize_interval
+        self.max_parked = max_parked
+
+        self._parked = collections.defaultdict(list)  # {blueprint_id: [actor_id]}
+        self._parked_ids = set()
+        self._blueprint_ids = {}  # {actor_id: blueprint_id}, actors that can be parked.
+        self._blueprints = {}  # {blueprint_id: blueprint}, used to pre-spawn actors.
+
+        # Statistics of the current resize period.
+        self._frames = 0
+        self._requests = collections.Counter()  # {blueprint_id: requests}
+        self._hits = collections.Counter()  # {blueprint_id: hits}
+        self._min_parked = {}  # {blueprint_id: min parked actors}
+
+        # Overall statistics.
+        self.hits = 0
+        self.misses = 0
+        self.prespawned = 0
+        self.shrunk = 0
+
+    @property
+    def parked_ids(self):
+        return self._parked_ids
+
+    @property
+    def num_parked(self):
+        return len(self._parked_ids)
+
+    @property
+    def hit_rate(self):
+        requests = self.hits + self.misses
+        if requests == 0:
+            return None
+        return self.hits / requests
+
+    def acquire(self, blueprint):
+        """
+        Hands out a parked actor with the given blueprint.
+
+            :return: actor id if there is a parked actor available. Otherwise, None.
+        """
+        blueprint_id = blueprint.id
+        self._blueprints[blueprint_id] = blueprint
+        self._requests[blueprint_id] += 1
+
+        parked = self._parked[blueprint_id]
+        if not parked:
+            self.misses += 1
+            self._min_parked[blueprint_id] = 0
+            return None
+
+        actor_id = parked.pop()
+        self._parked_ids.discard(actor_id)
+        self._min_parked[blueprint_id] = min(self._min_parked.get(blueprint_id, len(parked)),
+                                             len(parked))
+        self._hits[blueprint_id] += 1
+        self.hits += 1
+        return actor_id
+
+    def register(self, actor_id, blueprint_id):
+        """
+        Registers a spawned actor so that it can be parked when released.
+        """
+        self._blueprint_ids[actor_id] = blueprint_id
+
+    def release(self, actor_id):
+        """
+        Takes back an actor that is no longer used.
+
+            :return: True if the actor has to be parked. False if it has to be destroyed (unknown
+                actor or pool full).
+        """
+        blueprint_id = self._blueprint_ids.get(actor_id)
+        if blueprint_id is None or self.num_parked >= self.max_parked:
+            self.forget(actor_id)
+            return False
+
+        self._parked[blueprint_id].append(actor_id)
+        self._parked_ids.add(actor_id)
+        return True
+
+    def forget(self, actor_id):
+        """
+        Removes an actor from the pool (e.g., destroyed or failed to move).
+        """
+        blueprint_id = self._blueprint_ids.pop(actor_id, None)
+        if actor_id in self._parked_ids:
+            self._parked_ids.discard(actor_id)
+            self._parked[blueprint_id].remove(actor_id)
+
+    def step(self):
+        """
+        Advances one frame. At the end of every resize period, returns the blueprints to be
+        pre-spawned and the parked actors to be destroyed.
+
+            :return: ([blueprint], [actor_id])
+        """
+        self._frames += 1
+        if self._frames < self.resize_interval:
+            return [], []
+
+        grow, shrink = [], []
+        for blueprint_id in set(self._requests) | set(self._parked):
+            requests = self._requests[blueprint_id]
+            hits = self._hits[blueprint_id]
+            misses = requests - hits
+            if misses > 0 and hits < self.target_hit_rate * requests:
+                count = min(misses, self.max_parked - self.num_parked - len(grow))
+                grow.extend([self._blueprints[blueprint_id]] * max(count, 0))
+            else:
+                # Vehicles that have not been used during the whole period.
+                parked = self._parked[blueprint_id]
+                unused = min(self._min_parked.get(blueprint_id, 0), len(parked))
+                for _ in range((unused + 1) // 2):
+                    actor_id = parked.pop(0)
+                    self._parked_ids.discard(actor_id)
+                    self._blueprint_ids.pop(actor_id, None)
+                    shrink.append(actor_id)
+
+        self.prespawned += len(grow)
+        self.shrunk += len(shrink)
+
+        self._frames = 0
+        self._requests.clear()
+        self._hits.clear()
+        self._min_parked = {
+            blueprint_id: len(parked)
+            for blueprint_id, parked in self._parked.items() if parked
+        }
+        return grow, shrink
+
+    def drain(self):
+        """
+        Empties the pool.
+
+            :return: ids of the parked actors, to be destroyed.
+        """
+        actor_ids = list(self._parked_ids)
+        for actor_id in actor_ids:
+            self._blueprint_ids.pop(actor_id, None)
+        self._parked.clear()
+        self._parked_ids.clear()
+        return actor_ids
+
+    def counters(self):
+        """
+        Returns the current value of the counters.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'parked': self.num_parked,
+            'prespawned': self.prespawned,
+            'shrunk': self.shrunk,
+        }
+
+    def __str__(self):
+        return ', '.join('{}: {}'.format(name, value) for name, value in self.counters().items())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+This module provides asyncio versions of the redis transports (see transport.py), built on
+redis.asyncio. The frames are exchanged in the same way, so async and blocking readers and writers
+can be mixed.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+
+from .transport import RedisStreamTransport
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+async def close_async_client(client):
+    """
+    Closes a redis.asyncio client or pubsub. aclose() was added in redis-py 5.0.1, older versions
+    only have close().
+    """
+    aclose = getattr(client, 'aclose', None)
+    if aclose is not None:
+        await aclose()
+    else:
+        await client.close()
+
+
+# ==================================================================================================
+# -- async redis transports ------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class AsyncRedisGetTransport(object):
+    """
+    AsyncRedisGetTransport exchanges frames through a plain redis key (SET/GET). The reader always
+    gets the latest value of the key, whether it is new or not.
+    """
+    polling = True
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+
+    async def publish(self, payload):
+        """
+        Publishes a new frame.
+        """
+        await self.client.set(self.key, payload)
+
+    async def receive(self, timeout=None):  # pylint: disable=unused-argument
+        """
+        Returns the list of received frames (oldest first). In this transport, the list contains the
+        current value of the key, or nothing if the key does not exist.
+        """
+        payload = await self.client.get(self.key)
+        if payload is None:
+            return []
+        return [payload]
+
+    async def close(self):
+        """
+        Closes the transport.
+        """
+
+
+class AsyncRedisStreamTransport(object):
+    """
+    AsyncRedisStreamTransport exchanges frames through a redis stream (see RedisStreamTransport).
+    """
+    polling = False
+
+    _PAYLOAD_FIELD = RedisStreamTransport._PAYLOAD_FIELD  # pylint: disable=protected-access
+
+    def __init__(self, client, key, maxlen=100):
+        self.client = client
+        self.key = key
+        self.maxlen = maxlen
+
+        # Only the frames published after the reader starts are received.
+        self._last_id = None
+
+    async def publish(self, payload):
+        """
+        Publishes a new frame.
+        """
+        await self.client.xadd(self.key, {self._PAYLOAD_FIELD: payload},
+                               maxlen=self.maxlen,
+                               approximate=True)
+
+    async def receive(self, timeout=None):
+        """
+        Returns the list of frames received since the last call (oldest first). Waits up to
+        `timeout` seconds (forever if None) for the first one.
+        """
+        if self._last_id is None:
+            entries = await self.client.xrevrange(self.key, count=1)
+            self._last_id = entries[0][0] if entries else b'0-0'
+
+        block = 0 if timeout is None else max(1, int(timeout * 1000))
+        response = await self.client.xread({self.key: self._last_id}, block=block)
+        if not response:
+            return []
+
+        _, entries = response[0]
+        self._last_id = entries[-1][0]
+        return [fields[self._PAYLOAD_FIELD] for _, fields in entries]
+
+    async def close(self):
+        """
+        Closes the transport.
+        """
+
+
+class AsyncRedisPubSubTransport(object):
+    """
+    AsyncRedisPubSubTransport exchanges frames through a redis pub/sub channel. Frames published
+    while the reader is not subscribed are lost.
+    """
+    polling = False
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+
+        self._pubsub = None
+
+    async def publish(self, payload):
+        """
+        Publishes a new frame.
+        """
+        await self.client.publish(self.key, payload)
+
+    async def receive(self, timeout=None):
+        """
+        Returns the list of frames received since the last call (oldest first). Waits up to
+        `timeout` seconds (forever if None) for the first one.
+        """
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.key)
+
+        payloads = []
+        message = await self._pubsub.get_message(timeout=timeout)
+        while message is not None:
+            if message['type'] == 'message':
+                payloads.append(message['data'])
+
+            # Drains the frames already buffered.
+            message = await self._pubsub.get_message(timeout=0.0)
+        return payloads
+
+    async def close(self):
+        """
+        Closes the transport.
+        """
+        if self._pubsub is not None:
+            await close_async_client(self._pubsub)
+            self._pubsub = None
+
+
+ASYNC_TRANSPORTS = {
+    'get': AsyncRedisGetTransport,
+    'stream': AsyncRedisStreamTransport,
+    'pubsub': AsyncRedisPubSubTransport,
+}
+
+
+def create_async_transport(kind, client, key, **kwargs):
+    """
+    Returns an async transport of the given kind ('get', 'stream' or 'pubsub') for the given key.
+    The client is a redis.asyncio client.
+    """
+    if kind not in ASYNC_TRANSPORTS:
+        raise ValueError('Unknown async transport {} (available: {})'.format(
+            kind, ', '.join(ASYNC_TRANSPORTS)))
+
+    logging.debug('Using async %s transport for %s', kind, key)
+    return ASYNC_TRANSPORTS[kind](client, key, **kwargs)
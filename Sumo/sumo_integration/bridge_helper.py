@@ -11,6 +11,7 @@
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
+import collections
 import json
 import logging
 import math
@@ -18,6 +19,7 @@ import os
 import random
 
 import carla  # pylint: disable=import-error
+import numpy as np  # pylint: disable=import-error
 import traci  # pylint: disable=import-error
 
 from .sumo_simulation import SumoSignalState, SumoVehSignal
@@ -40,6 +42,41 @@ class BridgeHelper(object):
     with open(_vtypes_path) as f:
         _VTYPES = json.load(f)['carla_blueprints']
 
+    # (blueprint_library, {blueprint_id}, {vclass: [blueprint_id]})
+    _blueprint_index = None
+
+    @staticmethod
+    def _get_blueprint_index():
+        """
+        Returns the ids of the blueprint library, all of them and by vehicle class (see
+        data/vtypes.json). The index is built the first time it is needed after
+        `BridgeHelper.blueprint_library` is assigned.
+
+        Only ids are indexed: the blueprints handed out are modified (color, driver, role name), so
+        every caller gets its own copy (see _new_blueprint).
+        """
+        blueprint_library = BridgeHelper.blueprint_library
+        index = BridgeHelper._blueprint_index
+        if index is None or index[0] is not blueprint_library:
+            blueprint_ids = set()
+            blueprint_ids_by_vclass = collections.defaultdict(list)
+            for blueprint in blueprint_library:
+                blueprint_ids.add(blueprint.id)
+                if blueprint.id in BridgeHelper._VTYPES:
+                    vclass = BridgeHelper._VTYPES[blueprint.id]['vClass']
+                    blueprint_ids_by_vclass[vclass].append(blueprint.id)
+
+            index = (blueprint_library, blueprint_ids, dict(blueprint_ids_by_vclass))
+            BridgeHelper._blueprint_index = index
+        return index
+
+    @staticmethod
+    def _new_blueprint(blueprint_id):
+        """
+        Returns a new copy of the blueprint with the given id.
+        """
+        return BridgeHelper.blueprint_library.find(blueprint_id)
+
     @staticmethod
     def get_carla_transform(in_sumo_transform, extent):
         """
@@ -69,11 +106,13 @@ class BridgeHelper(object):
         return out_transform
 
     @staticmethod
-    def get_sumo_transform(in_carla_transform, extent):
+    def get_sumo_transform(in_carla_transform, extent, offset=None):
         """
-        Returns sumo transform based on carla transform.
+        Returns sumo transform based on carla transform. By default, the offset between the carla map
+        and the sumo net is `BridgeHelper.offset`.
         """
-        offset = BridgeHelper.offset
+        if offset is None:
+            offset = BridgeHelper.offset
         in_location = in_carla_transform.location
         in_rotation = in_carla_transform.rotation
 
@@ -95,6 +134,70 @@ class BridgeHelper(object):
 
         return out_transform
 
+    @staticmethod
+    def get_carla_transforms(locations, rotations, extents):
+        """
+        Returns carla transforms based on sumo transforms, for N actors at once (vectorized version
+        of `get_carla_transform`).
+
+            :param locations: sumo locations, N x 3 array (x, y, z).
+            :param rotations: sumo rotations, N x 3 array (pitch, yaw, roll).
+            :param extents: actor extents, N x 3 array (x, y, z).
+            :return: carla (locations, rotations) as N x 3 float64 arrays.
+        """
+        offset = BridgeHelper.offset
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+        length = np.asarray(extents, dtype=np.float64).reshape(-1, 3)[:, 0]
+
+        # From front-center-bumper to center (sumo reference system) and applying offset sumo-carla
+        # net.
+        yaw = np.radians(90 - rotations[:, 1])
+        pitch = np.radians(rotations[:, 0])
+        out_locations = np.empty_like(locations)
+        out_locations[:, 0] = (locations[:, 0] - np.cos(yaw) * length) - offset[0]
+        out_locations[:, 1] = (locations[:, 1] - np.sin(yaw) * length) - offset[1]
+        out_locations[:, 2] = locations[:, 2] - np.sin(pitch) * length
+
+        # Transform to carla reference system (left-handed system).
+        out_locations[:, 1] *= -1
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] -= 90
+
+        return out_locations, out_rotations
+
+    @staticmethod
+    def get_sumo_transforms(locations, rotations, extents):
+        """
+        Returns sumo transforms based on carla transforms, for N actors at once (vectorized version
+        of `get_sumo_transform`).
+
+            :param locations: carla locations, N x 3 array (x, y, z).
+            :param rotations: carla rotations, N x 3 array (pitch, yaw, roll).
+            :param extents: actor extents, N x 3 array (x, y, z).
+            :return: sumo (locations, rotations) as N x 3 float64 arrays.
+        """
+        offset = BridgeHelper.offset
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+        length = np.asarray(extents, dtype=np.float64).reshape(-1, 3)[:, 0]
+
+        # From center to front-center-bumper (carla reference system) and applying offset
+        # carla-sumo net.
+        yaw = np.radians(-1 * rotations[:, 1])
+        pitch = np.radians(rotations[:, 0])
+        out_locations = np.empty_like(locations)
+        out_locations[:, 0] = (locations[:, 0] + np.cos(yaw) * length) + offset[0]
+        out_locations[:, 1] = (locations[:, 1] - np.sin(yaw) * length) - offset[1]
+        out_locations[:, 2] = locations[:, 2] - np.sin(pitch) * length
+
+        # Transform to sumo reference system.
+        out_locations[:, 1] *= -1
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] += 90
+
+        return out_locations, out_rotations
+
     @staticmethod
     def _get_recommended_carla_blueprint_from_sumo_redis(sumo_actor_vclass_value):
         """
@@ -102,16 +205,12 @@ class BridgeHelper(object):
         """
         vclass = sumo_actor_vclass_value
 
-        blueprints = []
-        for blueprint in BridgeHelper.blueprint_library:
-            if blueprint.id in BridgeHelper._VTYPES and \
-               BridgeHelper._VTYPES[blueprint.id]['vClass'] == vclass:
-                blueprints.append(blueprint)
-
-        if not blueprints:
+        _, _, blueprint_ids_by_vclass = BridgeHelper._get_blueprint_index()
+        blueprint_ids = blueprint_ids_by_vclass.get(vclass)
+        if not blueprint_ids:
             return None
 
-        return random.choice(blueprints)
+        return BridgeHelper._new_blueprint(random.choice(blueprint_ids))
     
     @staticmethod
     def _get_recommended_carla_blueprint(sumo_actor):
@@ -120,27 +219,23 @@ class BridgeHelper(object):
         """
         vclass = sumo_actor.vclass.value
 
-        blueprints = []
-        for blueprint in BridgeHelper.blueprint_library:
-            if blueprint.id in BridgeHelper._VTYPES and \
-               BridgeHelper._VTYPES[blueprint.id]['vClass'] == vclass:
-                blueprints.append(blueprint)
-
-        if not blueprints:
+        _, _, blueprint_ids_by_vclass = BridgeHelper._get_blueprint_index()
+        blueprint_ids = blueprint_ids_by_vclass.get(vclass)
+        if not blueprint_ids:
             return None
 
-        return random.choice(blueprints)
+        return BridgeHelper._new_blueprint(random.choice(blueprint_ids))
 
     @staticmethod
     def get_carla_blueprint(sumo_actor, sync_color=False):
         """
         Returns an appropriate blueprint based on the received sumo actor.
         """
-        blueprint_library = BridgeHelper.blueprint_library
+        _, blueprint_ids, _ = BridgeHelper._get_blueprint_index()
         type_id = sumo_actor.type_id
 
-        if type_id in [bp.id for bp in blueprint_library]:
-            blueprint = blueprint_library.filter(type_id)[0]
+        if type_id in blueprint_ids:
+            blueprint = BridgeHelper._new_blueprint(type_id)
             logging.debug('[BridgeHelper] sumo vtype %s found in carla blueprints', type_id)
         else:
             blueprint = BridgeHelper._get_recommended_carla_blueprint(sumo_actor)
@@ -181,11 +276,11 @@ class BridgeHelper(object):
         """
         Returns an appropriate blueprint based on the received sumo actor.
         """
-        blueprint_library = BridgeHelper.blueprint_library
+        _, blueprint_ids, _ = BridgeHelper._get_blueprint_index()
         type_id = sumo_actor_type_id
 
-        if type_id in [bp.id for bp in blueprint_library]:
-            blueprint = blueprint_library.filter(type_id)[0]
+        if type_id in blueprint_ids:
+            blueprint = BridgeHelper._new_blueprint(type_id)
             logging.debug('[BridgeHelper] sumo vtype %s found in carla blueprints', type_id)
         else:
             blueprint = BridgeHelper._get_recommended_carla_blueprint_from_sumo_redis(sumo_actor_vclass_value)
@@ -289,9 +384,10 @@ class BridgeHelper(object):
         return BridgeHelper._create_sumo_vtype(carla_actor)
 
     @staticmethod
-    def get_carla_lights_state(current_carla_lights, sumo_lights):
+    def _compute_carla_lights_state(current_carla_lights, sumo_lights):
         """
-        Returns carla vehicle light state based on sumo signals.
+        Returns carla vehicle light state based on sumo signals, bit by bit. Only used to build the
+        lights lookup table.
         """
         current_lights = current_carla_lights
 
@@ -344,9 +440,10 @@ class BridgeHelper(object):
         return current_lights
 
     @staticmethod
-    def get_sumo_lights_state(current_sumo_lights, carla_lights):
+    def _compute_sumo_lights_state(current_sumo_lights, carla_lights):
         """
-        Returns sumo signals based on carla vehicle light state.
+        Returns sumo signals based on carla vehicle light state, bit by bit. Only used to build the
+        lights lookup table.
         """
         current_lights = current_sumo_lights
 
@@ -364,7 +461,7 @@ class BridgeHelper(object):
         if (all([
                 bool(carla_lights & carla.VehicleLightState.RightBlinker),
                 bool(carla_lights & carla.VehicleLightState.LeftBlinker)
-        ]) != (current_lights & SumoVehSignal.BLINKER_EMERGENCY)):
+        ]) != bool(current_lights & SumoVehSignal.BLINKER_EMERGENCY)):
             current_lights ^= SumoVehSignal.BLINKER_EMERGENCY
 
         # Break.
@@ -394,6 +491,50 @@ class BridgeHelper(object):
 
         return current_lights
 
+    @staticmethod
+    def _build_lights_table(compute_lights_state, num_bits):
+        """
+        Returns the lookup table of the given (bit by bit) lights conversion:
+
+            * mask: bits of the current lights state set by the conversion.
+            * table: value of those bits for every input lights state (of `num_bits` bits).
+        """
+        all_lights = (1 << 32) - 1
+        mask = all_lights ^ int(compute_lights_state(all_lights, 0))
+        table = [int(compute_lights_state(0, lights)) for lights in range(1 << num_bits)]
+        return ~mask, table, (1 << num_bits) - 1
+
+    # Lookup tables of the lights conversions (see _build_lights_table), built on first use:
+    # (bits kept from the current state, table, mask of the input lights state).
+    _carla_lights_table = None
+    _sumo_lights_table = None
+
+    @staticmethod
+    def get_carla_lights_state(current_carla_lights, sumo_lights):
+        """
+        Returns carla vehicle light state based on sumo signals.
+        """
+        if BridgeHelper._carla_lights_table is None:
+            # Sumo signals up to DOOR_OPEN_RIGHT (11 bits).
+            BridgeHelper._carla_lights_table = BridgeHelper._build_lights_table(
+                BridgeHelper._compute_carla_lights_state, 11)
+
+        keep, table, mask = BridgeHelper._carla_lights_table
+        return (int(current_carla_lights) & keep) | table[sumo_lights & mask]
+
+    @staticmethod
+    def get_sumo_lights_state(current_sumo_lights, carla_lights):
+        """
+        Returns sumo signals based on carla vehicle light state.
+        """
+        if BridgeHelper._sumo_lights_table is None:
+            # Carla light states up to Fog (8 bits).
+            BridgeHelper._sumo_lights_table = BridgeHelper._build_lights_table(
+                BridgeHelper._compute_sumo_lights_state, 8)
+
+        keep, table, mask = BridgeHelper._sumo_lights_table
+        return (current_sumo_lights & keep) | table[int(carla_lights) & mask]
+
     @staticmethod
     def get_carla_traffic_light_state(sumo_tl_state):
         """
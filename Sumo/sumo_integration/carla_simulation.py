@@ -15,7 +15,8 @@ import logging
 
 import carla  # pylint: disable=import-error
 
-from .constants import INVALID_ACTOR_ID, SPAWN_OFFSET_Z
+from .actor_cache import ActorCache
+from .constants import INVALID_ACTOR_ID, PARKING_OFFSET_Z, SPAWN_OFFSET_Z
 
 # ==================================================================================================
 # -- carla simulation ------------------------------------------------------------------------------
@@ -26,7 +27,7 @@ class CarlaSimulation(object):
     """
     CarlaSimulation is responsible for the management of the carla simulation.
     """
-    def __init__(self, host, port, step_length):
+    def __init__(self, host, port, step_length, actor_pool=None, reconcile_interval=None):
         self.client = carla.Client(host, port)
         self.client.set_timeout(2.0)
 
@@ -39,6 +40,39 @@ class CarlaSimulation(object):
         self.spawned_actors = set()
         self.destroyed_actors = set()
 
+        # If set, the spawned and destroyed actors are tracked from the requests of this client
+        # instead of listing all the world actors every tick. The world actors are only listed
+        # (reconciliation sweep) every `reconcile_interval` ticks, or as soon as the number of
+        # vehicles in the world snapshot does not match the expected one (e.g., vehicles spawned by
+        # other clients).
+        self.reconcile_interval = reconcile_interval
+        self._tracked_spawned = set()
+        self._tracked_destroyed = set()
+        self._expected_num_actors = None  # Vehicles in the world, parked ones included.
+        self._other_actor_ids = set()  # World actors that are not vehicles, in the last sweep.
+        self._ticks_since_sweep = 0
+        self.sweeps = 0
+
+        # Vehicle updates of the current frame. They are sent to carla in a single batch right
+        # before ticking, instead of one request per vehicle.
+        self._vehicle_commands = []
+
+        # Spawn and destroy requests of the current frame, sent to carla in a single batch.
+        self._spawn_requests = []  # [(key, blueprint, transform)]
+        self._destroy_requests = []  # [actor_id]
+
+        # Actors recycled instead of spawned and destroyed (see ActorPool).
+        self.actor_pool = actor_pool
+        self._park_requests = []  # [actor_id]
+        self._unpark_requests = []  # [(key, actor_id, transform)]
+        self._parking_spots = 0
+
+        # Number of requests sent to the carla server.
+        self.rpc_count = 0
+
+        # Actor handles, invalidated when the actors are destroyed.
+        self.actor_cache = ActorCache(self.world)
+
         # Set traffic lights.
         self._tls = {}  # {landmark_id: traffic_ligth_actor}
 
@@ -51,11 +85,17 @@ class CarlaSimulation(object):
                 else:
                     logging.warning('Landmark %s is not linked to any traffic light', landmark.id)
 
+        # Traffic light states last reported by get_changed_traffic_light_states.
+        self._tl_states = {}  # {landmark_id: state}
+
     def get_actor(self, actor_id):
         """
         Accessor for carla actor.
         """
-        return self.world.get_actor(actor_id)
+        misses = self.actor_cache.misses
+        actor = self.actor_cache.get(actor_id)
+        self.rpc_count += self.actor_cache.misses - misses
+        return actor
 
     # This is a workaround to fix synchronization issues when other carla clients remove an actor in
     # carla without waiting for tick (e.g., running sumo co-simulation and manual control at the
@@ -86,6 +126,21 @@ class CarlaSimulation(object):
             return None
         return self._tls[landmark_id].state
 
+    def get_changed_traffic_light_states(self):
+        """
+        Returns the traffic light state of the landmarks that changed since the last call (all the
+        landmarks in the first call).
+
+            :return: {landmark_id: state}
+        """
+        changed_states = {}
+        for landmark_id, traffic_light in self._tls.items():
+            state = traffic_light.state
+            if state != self._tl_states.get(landmark_id):
+                self._tl_states[landmark_id] = state
+                changed_states[landmark_id] = state
+        return changed_states
+
     def switch_off_traffic_lights(self):
         """
         Switch off all traffic lights.
@@ -113,39 +168,194 @@ class CarlaSimulation(object):
                 carla.command.SetSimulatePhysics(carla.command.FutureActor, False))
         ]
         response = self.client.apply_batch_sync(batch, False)[0]
+        self.rpc_count += 1
         if response.error:
             logging.error('Spawn carla actor failed. %s', response.error)
             return INVALID_ACTOR_ID
 
+        self._track_spawn(response.actor_id)
         return response.actor_id
 
+    def request_spawn(self, key, blueprint, transform):
+        """
+        Queues the spawn of a new actor. The actor is spawned with the rest of the spawn and destroy
+        requests of the current frame in `apply_actor_requests`. If the actor pool is enabled, a
+        parked actor with the same blueprint is used instead when available.
+
+            :param key: caller's id of the actor (e.g., sumo id), used to return the carla actor id.
+            :param blueprint: blueprint of the actor to be spawned.
+            :param transform: transform where the actor will be spawned.
+        """
+        if self.actor_pool is not None:
+            actor_id = self.actor_pool.acquire(blueprint)
+            if actor_id is not None:
+                self._unpark_requests.append((key, actor_id, transform))
+                return
+
+        self._spawn_requests.append((key, blueprint, transform))
+
+    def request_destroy(self, actor_id):
+        """
+        Queues the destruction of the given actor. The actor is destroyed with the rest of the spawn
+        and destroy requests of the current frame in `apply_actor_requests`. If the actor pool is
+        enabled, the actor is parked instead.
+        """
+        if self.actor_pool is not None and self.actor_pool.release(actor_id):
+            self._park_requests.append(actor_id)
+        else:
+            self._destroy_requests.append(actor_id)
+
+    def _get_parking_transform(self):
+        # Every parked actor gets its own spot, otherwise actors pre-spawned in the parking collide.
+        spot = self._parking_spots
+        self._parking_spots += 1
+        return carla.Transform(
+            carla.Location(10.0 * (spot % 1000), 10.0 * (spot // 1000 % 1000), PARKING_OFFSET_Z))
+
+    def apply_actor_requests(self):
+        """
+        Sends the queued spawn and destroy requests to carla in a single batch.
+
+            :return: dict {key: actor id} with the result of every spawn request. The actor id is
+                INVALID_ACTOR_ID if the actor could not be spawned.
+        """
+        if self.actor_pool is not None:
+            prespawn, shrink = self.actor_pool.step()
+            self._destroy_requests.extend(shrink)
+            for blueprint in prespawn:
+                self._spawn_requests.append((None, blueprint, None))
+
+        if not (self._spawn_requests or self._destroy_requests or self._park_requests or
+                self._unpark_requests):
+            return {}
+
+        # Each entry of the batch has its own handler for the response.
+        batch, handlers = [], []
+        for actor_id in self._destroy_requests:
+            batch.append(carla.command.DestroyActor(actor_id))
+            handlers.append(('destroy', None, actor_id))
+
+        for actor_id in self._park_requests:
+            batch.append(carla.command.ApplyTransform(actor_id, self._get_parking_transform()))
+            handlers.append(('park', None, actor_id))
+
+        for key, actor_id, transform in self._unpark_requests:
+            batch.append(carla.command.ApplyTransform(actor_id, transform))
+            handlers.append(('unpark', key, actor_id))
+
+        for key, blueprint, transform in self._spawn_requests:
+            if key is None:
+                # Pre-spawned actor, spawned directly in the parking.
+                transform = self._get_parking_transform()
+            else:
+                transform = carla.Transform(
+                    transform.location + carla.Location(0, 0, SPAWN_OFFSET_Z), transform.rotation)
+            batch.append(
+                carla.command.SpawnActor(blueprint, transform).then(
+                    carla.command.SetSimulatePhysics(carla.command.FutureActor, False)))
+            handlers.append(('spawn', key, blueprint.id))
+
+        responses = self.client.apply_batch_sync(batch, False)
+        self.rpc_count += 1
+
+        spawned = {}
+        surplus = []  # Pre-spawned actors that do not fit in the pool anymore.
+        for (kind, key, value), response in zip(handlers, responses):
+            if kind == 'destroy':
+                self.actor_cache.invalidate(value)
+                if response.error:
+                    logging.debug('Destroy carla actor %s failed. %s', value, response.error)
+                else:
+                    self._track_destroy(value)
+
+            elif kind == 'park':
+                if response.error:
+                    logging.debug('Park carla actor %s failed. %s', value, response.error)
+                    self.actor_pool.forget(value)
+                else:
+                    self._track_destroy(value, removed=False)
+
+            elif kind == 'unpark':
+                if response.error:
+                    logging.debug('Unpark carla actor %s failed. %s', value, response.error)
+                    self.actor_pool.forget(value)
+                    # Requested again in the next frame.
+                    spawned[key] = INVALID_ACTOR_ID
+                else:
+                    self._track_spawn(value, added=False)
+                    spawned[key] = value
+
+            elif response.error:
+                logging.error('Spawn carla actor failed. %s', response.error)
+                if key is not None:
+                    spawned[key] = INVALID_ACTOR_ID
+
+            else:
+                if self.actor_pool is not None:
+                    self.actor_pool.register(response.actor_id, value)
+                    if key is None and not self.actor_pool.release(response.actor_id):
+                        surplus.append(response.actor_id)
+                if key is not None:
+                    self._track_spawn(response.actor_id)
+                    spawned[key] = response.actor_id
+                elif self._expected_num_actors is not None:
+                    # Pre-spawned in the parking, not active.
+                    self._expected_num_actors += 1
+
+        self._spawn_requests = []
+        self._destroy_requests = surplus
+        self._park_requests = []
+        self._unpark_requests = []
+        return spawned
+
     def destroy_actor(self, actor_id):
         """
         Destroys the given actor.
         """
-        actor = self.world.get_actor(actor_id)
+        actor = self.get_actor(actor_id)
         if actor is not None:
-            return actor.destroy()
+            self.rpc_count += 1
+            self.actor_cache.invalidate(actor_id)
+            if actor.destroy():
+                self._track_destroy(actor_id)
+                return True
         return False
 
     def synchronize_vehicle(self, vehicle_id, transform, lights=None):
         """
-        Updates vehicle state.
+        Updates vehicle state. The update is queued and sent to carla with the rest of the updates
+        of the current frame in the next tick (see `apply_vehicle_updates`).
 
             :param vehicle_id: id of the actor to be updated.
             :param transform: new vehicle transform (i.e., position and rotation).
             :param lights: new vehicle light state.
-            :return: True if successfully updated. Otherwise, False.
+            :return: True if the update is queued.
         """
-        vehicle = self.world.get_actor(vehicle_id)
-        if vehicle is None:
-            return False
-
-        vehicle.set_transform(transform)
+        commands = self._vehicle_commands
+        commands.append(carla.command.ApplyTransform(vehicle_id, transform))
         if lights is not None:
-            vehicle.set_light_state(carla.VehicleLightState(lights))
+            commands.append(
+                carla.command.SetVehicleLightState(vehicle_id, carla.VehicleLightState(lights)))
         return True
 
+    def apply_vehicle_updates(self):
+        """
+        Sends the queued vehicle updates to carla in a single batch.
+
+            :return: number of updates that failed (e.g., the actor no longer exists).
+        """
+        if not self._vehicle_commands:
+            return 0
+
+        responses = self.client.apply_batch_sync(self._vehicle_commands, False)
+        self.rpc_count += 1
+        self._vehicle_commands = []
+
+        errors = [response.error for response in responses if response.error]
+        if errors:
+            logging.debug('%d vehicle updates failed in carla. %s', len(errors), errors[0])
+        return len(errors)
+
     def synchronize_traffic_light(self, landmark_id, state):
         """
         Updates traffic light state.
@@ -160,25 +370,113 @@ class CarlaSimulation(object):
 
         traffic_light = self._tls[landmark_id]
         traffic_light.set_state(state)
+        self.rpc_count += 1
         return True
 
+    def _track_spawn(self, actor_id, added=True):
+        """
+        Registers an actor spawned (or taken out of the parking) by this client.
+        """
+        if not self.reconcile_interval:
+            return
+
+        if actor_id in self._tracked_destroyed:
+            self._tracked_destroyed.discard(actor_id)
+        else:
+            self._tracked_spawned.add(actor_id)
+
+        if added and self._expected_num_actors is not None:
+            self._expected_num_actors += 1
+
+    def _track_destroy(self, actor_id, removed=True):
+        """
+        Registers an actor destroyed (or parked) by this client.
+        """
+        if not self.reconcile_interval:
+            return
+
+        if actor_id in self._tracked_spawned:
+            self._tracked_spawned.discard(actor_id)
+        else:
+            self._tracked_destroyed.add(actor_id)
+
+        if removed and self._expected_num_actors is not None:
+            self._expected_num_actors -= 1
+
+    def _sweep_actors(self):
+        """
+        Lists the vehicles in the world to update the active actors.
+        """
+        world_actors = self.world.get_actors()
+        self.rpc_count += 1
+        current_actors = set([vehicle.id for vehicle in world_actors.filter('vehicle.*')])
+        if self.reconcile_interval:
+            self._other_actor_ids = set([actor.id for actor in world_actors]) - current_actors
+        if self.actor_pool is not None:
+            current_actors.difference_update(self.actor_pool.parked_ids)
+        self.spawned_actors = current_actors.difference(self._active_actors)
+        self.destroyed_actors = self._active_actors.difference(current_actors)
+        self._active_actors = current_actors
+        self.actor_cache.invalidate_all(self.destroyed_actors)
+
+    def _count_snapshot_vehicles(self):
+        """
+        Returns the number of vehicles in the world snapshot, parked ones included. The world
+        snapshot is received with the tick, so this is not a request. Actors that are not vehicles
+        are told apart with the last sweep: an unknown one is counted as a vehicle until the next
+        sweep, which the count mismatch triggers.
+        """
+        world_snapshot = self.world.get_snapshot()
+        others = sum(1 for actor_id in self._other_actor_ids if world_snapshot.has_actor(actor_id))
+        return len(world_snapshot) - others
+
     def tick(self):
         """
         Tick to carla simulation.
         """
+        self.apply_vehicle_updates()
         self.world.tick()
+        self.rpc_count += 1
 
         # Update data structures for the current frame.
-        current_actors = set(
-            [vehicle.id for vehicle in self.world.get_actors().filter('vehicle.*')])
-        self.spawned_actors = current_actors.difference(self._active_actors)
-        self.destroyed_actors = self._active_actors.difference(current_actors)
-        self._active_actors = current_actors
+        if not self.reconcile_interval:
+            self._sweep_actors()
+            return
+
+        num_actors = self._count_snapshot_vehicles()
+        self._ticks_since_sweep += 1
+        if (self._ticks_since_sweep >= self.reconcile_interval or
+                num_actors != self._expected_num_actors):
+            if self._expected_num_actors is not None and num_actors != self._expected_num_actors:
+                logging.debug('Expected %s vehicles in carla, found %s. Listing world actors.',
+                              self._expected_num_actors, num_actors)
+            self._sweep_actors()
+            self.sweeps += 1
+            self._ticks_since_sweep = 0
+            self._expected_num_actors = self._count_snapshot_vehicles()
+        else:
+            self.spawned_actors = self._tracked_spawned
+            self.destroyed_actors = self._tracked_destroyed
+            self._active_actors.difference_update(self._tracked_destroyed)
+            self._active_actors.update(self._tracked_spawned)
+            self.actor_cache.invalidate_all(self.destroyed_actors)
+
+        self._tracked_spawned = set()
+        self._tracked_destroyed = set()
 
     def close(self):
         """
         Closes carla client.
         """
+        logging.info('Actor cache statistics: %s', self.actor_cache)
+
+        if self.actor_pool is not None:
+            logging.info('Actor pool statistics: %s', self.actor_pool)
+            self.apply_actor_requests()
+            self._destroy_requests.extend(self.actor_pool.drain())
+            self.actor_pool = None
+            self.apply_actor_requests()
+
         for actor in self.world.get_actors():
             if actor.type_id == 'traffic.traffic_light':
                 actor.freeze(False)
@@ -13,3 +13,4 @@
 
 INVALID_ACTOR_ID = -1
 SPAWN_OFFSET_Z = 25.0  # meters
+PARKING_OFFSET_Z = -500.0  # meters, actors parked in the actor pool
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the frames published with the state of the carla ego vehicle. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import json
+
+from .bridge_helper import BridgeHelper
+
+# ==================================================================================================
+# -- ego vehicle -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+EGO_VEHICLE_KEY = 'cosim_thirdpartysim_vehicle_info'
+EGO_VEHICLE_ID = 'CARLA_EGO'
+
+# Offset between the carla map and the sumo net of the ego vehicle consumers.
+EGO_VEHICLE_OFFSET = (2.2, 159.0)
+
+
+def encode_ego_vehicle_frame(carla_transform, extent, frame_id, sim_time):
+    """
+    Returns the frame (json) with the state of the ego vehicle in the sumo reference system.
+
+        :param carla_transform: carla transform of the ego vehicle.
+        :param extent: extent of the bounding box of the ego vehicle.
+        :param frame_id: id of the frame, monotonically increasing.
+        :param sim_time: carla simulation time, in seconds.
+    """
+    sumo_transform = BridgeHelper.get_sumo_transform(carla_transform, extent, EGO_VEHICLE_OFFSET)
+
+    vehicle = {
+        'location': {
+            'x': sumo_transform.location.x,
+            'y': sumo_transform.location.y,
+            'z': sumo_transform.location.z
+        },
+        'rotation': {
+            'x': sumo_transform.rotation.roll,
+            'y': sumo_transform.rotation.pitch,
+            'z': sumo_transform.rotation.yaw
+        },
+    }
+
+    frame = {'frame_id': frame_id, 'sim_time': sim_time, 'vehicles': {EGO_VEHICLE_ID: vehicle}}
+    return json.dumps(frame).encode('utf-8')
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+This module provides the interest management of the synchronization: only the vehicles near the
+ego vehicle are mirrored in carla.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import numpy as np  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- grid index ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class GridIndex(object):
+    """
+    GridIndex buckets 2d positions in square cells of `cell_size` meters, so the positions near a
+    point are found by only looking at the surrounding cells.
+
+    The positions are sorted by cell (row major), so each row of cells around a point is a
+    contiguous range of the sorted positions, found with a binary search.
+    """
+    # Cell keys: (cell_x << 32) + cell_y + _KEY_OFFSET, the cells in a row are contiguous.
+    _KEY_OFFSET = 1 << 31
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+
+        self._positions = np.empty((0, 2))
+        self._order = np.empty(0, dtype=np.int64)  # Indices of the positions, sorted by cell.
+        self._keys = np.empty(0, dtype=np.int64)  # Sorted cell keys.
+
+    def _get_keys(self, cells_x, cells_y):
+        return (cells_x << 32) + (cells_y + self._KEY_OFFSET)
+
+    def build(self, positions):
+        """
+        Indexes the given positions, replacing the previous ones.
+
+            :param positions: numpy array (N, 2) or (N, 3), only x and y are used.
+        """
+        self._positions = np.asarray(positions, dtype=np.float64)[:, :2]
+
+        cells = np.floor(self._positions / self.cell_size).astype(np.int64)
+        keys = self._get_keys(cells[:, 0], cells[:, 1])
+        self._order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._order]
+
+    def query(self, center, radius):
+        """
+        Returns the positions within `radius` meters of `center`.
+
+            :return: (indices, squared distances), numpy arrays.
+        """
+        center_x, center_y = center[0], center[1]
+        min_x = int(np.floor((center_x - radius) / self.cell_size))
+        max_x = int(np.floor((center_x + radius) / self.cell_size))
+        min_y = int(np.floor((center_y - radius) / self.cell_size))
+        max_y = int(np.floor((center_y + radius) / self.cell_size))
+
+        rows_x = np.arange(min_x, max_x + 1, dtype=np.int64)
+        starts = np.searchsorted(self._keys, self._get_keys(rows_x, min_y), side='left')
+        ends = np.searchsorted(self._keys, self._get_keys(rows_x, max_y), side='right')
+        candidates = [self._order[start:end] for start, end in zip(starts, ends) if end > start]
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        indices = np.concatenate(candidates)
+        deltas = self._positions[indices] - (center_x, center_y)
+        distances = np.einsum('ij,ij->i', deltas, deltas)
+        inside = distances <= radius * radius
+        return indices[inside], distances[inside]
+
+
+# ==================================================================================================
+# -- interest manager ------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class InterestManager(object):
+    """
+    InterestManager decides which vehicles are mirrored in carla (the vehicles of interest): a
+    vehicle enters when it gets within `radius` meters of an interest point (e.g., the ego vehicle)
+    and leaves when it gets farther than `radius + hysteresis`, so vehicles moving around the border
+    are not spawned and destroyed every tick.
+
+    If there is no interest point (e.g., the ego vehicle is not spawned yet), all the vehicles are
+    of interest. Mirroring the vehicles in and out of carla is up to the caller.
+    """
+    def __init__(self, radius, hysteresis=10.0, cell_size=None):
+        if radius <= 0 or hysteresis < 0:
+            raise ValueError('Invalid area of interest (radius: {}, hysteresis: {})'.format(
+                radius, hysteresis))
+
+        self.radius = radius
+        self.hysteresis = hysteresis
+
+        # With cells as large as the outer radius, a query looks at 3 rows of 3 cells at most.
+        self.index = GridIndex(cell_size if cell_size is not None else radius + hysteresis)
+
+        self._interest = set()  # Vehicles of interest in the last update.
+
+        # Statistics.
+        self.ticks = 0
+        self.saved = 0  # Vehicles not mirrored in the last update.
+        self.total_saved = 0
+        self.max_saved = 0
+        self.entered = 0
+        self.left = 0
+
+    @property
+    def interest(self):
+        return self._interest
+
+    def update(self, actor_ids, locations, centers):
+        """
+        Updates the vehicles of interest.
+
+            :param actor_ids: ids of the vehicles.
+            :param locations: numpy array (N, 2) or (N, 3) with the location of each vehicle.
+            :param centers: [(x, y)], interest points in the same coordinates as the locations.
+            :return: set with the ids of the vehicles of interest.
+        """
+        if not centers:
+            interest = set(actor_ids)
+        else:
+            self.index.build(locations)
+
+            inner_radius = self.radius * self.radius
+            interest = set()
+            for center in centers:
+                indices, distances = self.index.query(center, self.radius + self.hysteresis)
+                for i, distance in zip(indices.tolist(), distances.tolist()):
+                    actor_id = actor_ids[i]
+                    # Within the hysteresis band, vehicles keep their state.
+                    if distance <= inner_radius or actor_id in self._interest:
+                        interest.add(actor_id)
+
+        # Vehicles that are gone are neither counted as entered nor as left.
+        self.entered += len(interest - self._interest)
+        self.left += len(self._interest - interest) - len(self._interest - set(actor_ids))
+        self._interest = interest
+
+        self.ticks += 1
+        self.saved = len(actor_ids) - len(interest)
+        self.total_saved += self.saved
+        self.max_saved = max(self.max_saved, self.saved)
+        return interest
+
+    @property
+    def mean_saved(self):
+        return self.total_saved / self.ticks if self.ticks else 0.0
+
+    def counters(self):
+        """
+        Returns the current value of the counters.
+        """
+        return {
+            'ticks': self.ticks,
+            'saved': self.saved,
+            'mean_saved': round(self.mean_saved, 1),
+            'max_saved': self.max_saved,
+            'entered': self.entered,
+            'left': self.left,
+        }
+
+    def __str__(self):
+        return ', '.join('{}: {}'.format(name, value) for name, value in self.counters().items())
@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a cache of the parsed sumo nets, so the net files are only parsed once. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import gc
+import hashlib
+import json
+import logging
+import os
+import pickle
+import stat
+import sys
+import tempfile
+
+import sumolib  # pylint: disable=import-error
+from sumolib.net.lane import SUMO_VEHICLE_CLASSES  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- net data --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+NET_CACHE_VERSION = 2
+
+# The cache does not store the sumolib objects of the net but plain data (lists of tuples of strings
+# and numbers), the arguments of the calls to the sumolib net builder made when parsing the net
+# file. The net is rebuilt with the same calls, without parsing the xml file:
+#
+#   nodes         id, type, coordinates, incoming lanes, internal lanes, shape, fringe, foes, params
+#   edges         id, from node, to node, priority, function, name, type, routing type, shape,
+#                 lanes, traffic light, bidi edge, crossed edges, params
+#   lanes         speed, length, width, permissions, acceleration, shape, neighbour lane, params
+#   connections   from edge and lane, to edge and lane (indices), direction, traffic light, link
+#                 indices, permissions, state, via lane, params
+#   tls           id, controlled links, programs (with withPrograms or withLatestPrograms)
+#
+# The permissions of the lanes and connections are indices in a table of the allowed vehicle classes
+# (None for all of them), most of them share a few different values.
+
+
+def _get_net_data(net):
+    """
+    Returns the plain data the given net is rebuilt from.
+    """
+    # pylint: disable=protected-access
+    permissions = {}  # {allowed vehicle classes: index}
+
+    def get_permissions(allowed):
+        if allowed is SUMO_VEHICLE_CLASSES or allowed == SUMO_VEHICLE_CLASSES:
+            return permissions.setdefault(None, len(permissions))
+        return permissions.setdefault(' '.join(sorted(allowed)), len(permissions))
+
+    def get_id(obj):
+        return obj.getID() if obj is not None else None
+
+    nodes = []
+    for node in net.getNodes():
+        foes = [(index, node_foes, node._prohibits[index])
+                for index, node_foes in node._foes.items()]
+        nodes.append((node.getID(), node.getType(), node.getCoord3D(), node._incLanes,
+                      node.getInternal(), node.getShape3D(), node.getFringe(), foes,
+                      dict(node.getParams())))
+
+    edges = []
+    lane_indices = {}  # {lane: (edge index, lane index)}
+    for edge_index, edge in enumerate(net.getEdges()):
+        lanes = []
+        for lane_index, lane in enumerate(edge.getLanes()):
+            lane_indices[lane] = (edge_index, lane_index)
+            lanes.append((lane.getSpeed(), lane.getLength(), lane.getWidth(),
+                          get_permissions(lane.getPermissions()), lane.isAccelerationLane(),
+                          lane.getShape3D(), lane.getNeigh(), dict(lane.getParams())))
+
+        edges.append((edge.getID(), get_id(edge.getFromNode()), get_id(edge.getToNode()),
+                      edge.getPriority(), edge.getFunction(), edge.getName(), edge.getType(),
+                      edge.getRoutingType(), edge._rawShape3D, lanes, get_id(edge.getTLS()),
+                      get_id(edge.getBidi()), [e.getID() for e in edge.getCrossingEdges()],
+                      dict(edge.getParams())))
+
+    connections = []
+    for edge in net.getEdges():
+        for lane in edge.getLanes():
+            for connection in lane.getOutgoing():
+                connections.append(
+                    lane_indices[connection.getFromLane()] + lane_indices[connection.getToLane()] +
+                    (connection.getDirection(), connection.getTLSID(),
+                     connection.getTLLinkIndex(), connection.getTLLinkIndex2(),
+                     get_permissions(connection._allowed), connection.getState(),
+                     connection.getViaLaneID(), dict(connection.getParams())))
+
+    tls = []
+    for traffic_light in net.getTrafficLights():
+        links = [lane_indices[in_lane] + lane_indices[out_lane] + (link_index,)
+                 for in_lane, out_lane, link_index in traffic_light.getConnections()]
+        programs = [(program_id, program.getOffset(), program.getType(),
+                     [(phase.state, phase.duration, phase.minDur, phase.maxDur, phase.next,
+                       phase.name) for phase in program.getPhases()], dict(program.getParams()))
+                    for program_id, program in traffic_light.getPrograms().items()]
+        tls.append((traffic_light.getID(), links, programs))
+
+    routing_cache = net._routingCache
+    return {
+        'version': net.getVersion(),
+        'location': dict(net._location),
+        'edge_types': [(t.id, t.allow, t.disallow) for t in net._edgeTypes.values()],
+        'crossings_and_walking_areas': sorted(net._crossings_and_walkingAreas),
+        'macro_connectors': sorted(net._macroConnectors),
+        'permissions': sorted(permissions, key=permissions.get),
+        'nodes': nodes,
+        'edges': edges,
+        'connections': connections,
+        'tls': tls,
+        'roundabouts': [(r.getNodes(), r.getEdges()) for r in net.getRoundabouts()],
+        'routing_cache': routing_cache.cache_info().maxsize if routing_cache is not None else None
+    }
+
+
+def _set_params(obj, params):
+    for key, value in params.items():
+        obj.setParam(key, value)
+
+
+def _build_net(data):
+    """
+    Returns the net rebuilt from the given plain data (see _get_net_data).
+    """
+    # pylint: disable=protected-access
+    net = sumolib.net.Net()
+    net._version = data['version']
+    net.setLocation(**data['location'])
+    for type_id, allow, disallow in data['edge_types']:
+        net._edgeTypes[type_id] = sumolib.net.EdgeType(type_id, allow, disallow)
+    net._crossings_and_walkingAreas.update(data['crossings_and_walking_areas'])
+    net._macroConnectors.update(data['macro_connectors'])
+
+    for (node_id, node_type, coord, inc_lanes, int_lanes, shape, fringe, foes,
+         params) in data['nodes']:
+        node = net.addNode(node_id, node_type, coord, inc_lanes, int_lanes)
+        if shape is not None:
+            node.setShape(shape)
+        node._fringe = fringe
+        for index, node_foes, prohibits in foes:
+            node.setFoes(index, node_foes, prohibits)
+        _set_params(node, params)
+
+    permissions = data['permissions']
+    edges = []
+    edge_links = []  # [(edge, traffic light id, bidi edge id, crossed edge ids)]
+    for (edge_id, from_id, to_id, priority, function, name, edge_type, routing_type, shape, lanes,
+         tls_id, bidi_id, crossed_ids, params) in data['edges']:
+        edge = net.addEdge(edge_id, from_id, to_id, priority, function, name, edge_type,
+                           routing_type)
+        edge.setRawShape(shape)
+        _set_params(edge, params)
+        for (speed, length, width, allowed, acceleration, lane_shape, neigh,
+             lane_params) in lanes:
+            lane = net.addLane(edge, speed, length, width, permissions[allowed], None, acceleration)
+            lane.setShape(lane_shape)
+            lane.setNeigh(neigh)
+            _set_params(lane, lane_params)
+        edges.append(edge)
+        edge_links.append((edge, tls_id, bidi_id, crossed_ids))
+
+    for (from_edge, from_lane, to_edge, to_lane, direction, tls_id, link_index, link_index2,
+         allowed, state, via, params) in data['connections']:
+        from_lane = edges[from_edge].getLanes()[from_lane]
+        net.addConnection(edges[from_edge], edges[to_edge], from_lane,
+                          edges[to_edge].getLanes()[to_lane], direction, tls_id, link_index,
+                          link_index2, permissions[allowed], None, state, via)
+        _set_params(from_lane.getOutgoing()[-1], params)
+
+    for tls_id, links, programs in data['tls']:
+        net.getTLSSecure(tls_id)
+        for program_id, offset, program_type, phases, params in programs:
+            program = net.addTLSProgram(tls_id, program_id, offset, program_type, False)
+            for phase in phases:
+                program.addPhase(*phase)
+            _set_params(program, params)
+        for from_edge, from_lane, to_edge, to_lane, link_index in links:
+            net.addTLS(tls_id, edges[from_edge].getLanes()[from_lane],
+                       edges[to_edge].getLanes()[to_lane], link_index)
+
+    for edge, tls_id, bidi_id, crossed_ids in edge_links:
+        if tls_id is not None:
+            edge.setTLS(net.getTLS(tls_id))
+        if bidi_id is not None:
+            edge._bidi = net.getEdge(bidi_id)
+        for crossed_id in crossed_ids:
+            edge._addCrossingEdge(net.getEdge(crossed_id))
+
+    for nodes, roundabout_edges in data['roundabouts']:
+        net.addRoundabout(nodes, roundabout_edges)
+    if data['routing_cache']:
+        net.initRoutingCache(data['routing_cache'])
+    return net
+
+
+class _DataUnpickler(pickle.Unpickler):
+    """
+    Unpickles plain data only, the cache files never reference classes or functions.
+    """
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError('Unexpected object {}.{} in net cache'.format(module, name))
+
+
+# ==================================================================================================
+# -- net cache -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def _get_file_stat(net_file):
+    """
+    Returns the (path, size, modification time) of the net file, the quick check of the cached
+    contents hash of the file.
+    """
+    info = os.stat(net_file)
+    return [os.path.abspath(net_file), info.st_size, info.st_mtime_ns]
+
+
+def _get_file_digest(net_file):
+    digest = hashlib.sha1()
+    with open(net_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _get_cache_key(file_digest, options):
+    """
+    Returns the key of the cached net: hash of the net file contents and the options of the parser
+    (plus the python and sumolib versions the net data is extracted with). The modification time is
+    not part of the key, so checkouts or copies of the same net file reuse the cache.
+    """
+    digest = hashlib.sha1(file_digest.encode('utf-8'))
+    digest.update(
+        repr((NET_CACHE_VERSION, sorted(options.items()), sys.version_info[:2],
+              os.path.getmtime(sumolib.net.__file__))).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _get_cache_file(net_file, key, cache_dir):
+    return os.path.join(cache_dir, '{}.{}.pickle'.format(os.path.basename(net_file), key))
+
+
+def _get_stat_file(net_file, cache_dir):
+    return os.path.join(cache_dir, '{}.stat.json'.format(os.path.basename(net_file)))
+
+
+def _get_user_cache_dir():
+    """
+    Returns the private cache folder of the current user (created with 0700 permissions), used when
+    the folder of the net file is not writable.
+    """
+    base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base_dir, 'sumo_netcache')
+
+
+def _is_trusted(path):
+    """
+    Returns True if the given file or folder can only have been written by the current user (or
+    root), i.e., it is owned by the current user or root and it is not writable by anyone else.
+    """
+    if not hasattr(os, 'getuid'):
+        return True  # No ownership checks (e.g., windows).
+
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+
+    if stat.S_ISLNK(info.st_mode) or info.st_uid not in (os.getuid(), 0):
+        return False
+    return not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _can_read(cache_file):
+    """
+    Returns True if the cache file exists and it can only have been written by the current user.
+    Another user could otherwise plant a different net, or a pickle running arbitrary code.
+    """
+    if not os.path.exists(cache_file):
+        return False
+
+    if not (_is_trusted(cache_file) and _is_trusted(os.path.dirname(cache_file))):
+        logging.warning('Ignoring net cache %s, it may have been written by another user',
+                        cache_file)
+        return False
+    return True
+
+
+def _write(cache_file, write):
+    """
+    Writes a cache file with the given function. The file is written to a temporary file and then
+    moved into place, so concurrent readers never see a partial cache.
+    """
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    except OSError as error:
+        logging.debug('Cannot create the net cache in %s: %s', cache_dir, error)
+        return False
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_file, cache_file)
+    except (OSError, pickle.PicklingError, TypeError, ValueError, AttributeError) as error:
+        logging.warning('Cannot write the net cache %s: %s', cache_file, error)
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
+    return True
+
+
+def _load_digest(stat_file, file_stat):
+    """
+    Returns the contents hash of the net file stored in the stat file, if the net file has the same
+    path, size and modification time. Otherwise, None.
+    """
+    if not _can_read(stat_file):
+        return None
+
+    try:
+        with open(stat_file, 'r') as f:
+            info = json.load(f)
+        return info['digest'] if info['stat'] == file_stat else None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _dump_digest(stat_file, file_stat, digest):
+    data = json.dumps({'stat': file_stat, 'digest': digest}).encode('utf-8')
+    return _write(stat_file, lambda f: f.write(data))
+
+
+def _load(cache_file):
+    """
+    Returns the net rebuilt from the cache file. None if there is no cache file, it is not valid or
+    it may have been written by another user.
+    """
+    if not _can_read(cache_file):
+        return None
+
+    # The garbage collector is disabled while creating the objects of the net, it would otherwise
+    # run several times without anything to collect.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_file, 'rb') as f:
+            return _build_net(_DataUnpickler(f).load())
+
+    except FileNotFoundError:
+        return None
+    except Exception as error:  # pylint: disable=broad-except
+        logging.warning('Ignoring invalid net cache %s: %s', cache_file, error)
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _dump(net, cache_file):
+    """
+    Writes the data of the net to the cache file.
+    """
+    try:
+        data = _get_net_data(net)
+    except (AttributeError, KeyError, TypeError) as error:
+        logging.warning('Cannot write the net cache %s: %s', cache_file, error)
+        return False
+
+    if not _write(cache_file, lambda f: pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)):
+        return False
+
+    # Removes the caches of previous versions of the net file.
+    cache_dir = os.path.dirname(cache_file)
+    prefix = os.path.basename(cache_file).rsplit('.', 2)[0] + '.'
+    for filename in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, filename)
+        if filename.startswith(prefix) and filename.endswith('.pickle') and path != cache_file:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return True
+
+
+def read_net(net_file, cache_dir=None, **options):
+    """
+    Returns the sumo net of the given file, same as `sumolib.net.readNet(net_file, **options)`.
+
+    The parsed net is cached in `cache_dir` (by default, a __netcache__ folder next to the net file,
+    or the private cache folder of the user, ~/.cache/sumo_netcache, if not writable) and reused
+    while the net file and the options do not change. The net file is only hashed again when its
+    size or modification time change. Cache files that may have been written by another user are
+    ignored. If the cache can not be used, the net file is parsed.
+    """
+    if 'net' in options:
+        # The net file is read into an existing net.
+        return sumolib.net.readNet(net_file, **options)
+
+    if cache_dir is not None:
+        cache_dirs = [cache_dir]
+    else:
+        cache_dirs = [os.path.join(os.path.dirname(os.path.abspath(net_file)), '__netcache__'),
+                      _get_user_cache_dir()]
+
+    file_stat = _get_file_stat(net_file)
+    digest, digest_dir = None, None
+    for folder in cache_dirs:
+        digest = _load_digest(_get_stat_file(net_file, folder), file_stat)
+        if digest is not None:
+            digest_dir = folder
+            break
+    if digest is None:
+        digest = _get_file_digest(net_file)
+    key = _get_cache_key(digest, options)
+
+    for folder in cache_dirs:
+        cache_file = _get_cache_file(net_file, key, folder)
+        net = _load(cache_file)
+        if net is not None:
+            logging.debug('Net %s loaded from cache %s', net_file, cache_file)
+            if folder != digest_dir:
+                _dump_digest(_get_stat_file(net_file, folder), file_stat, digest)
+            return net
+
+    logging.debug('Parsing net file %s', net_file)
+    net = sumolib.net.readNet(net_file, **options)
+    for folder in cache_dirs:
+        if _dump(net, _get_cache_file(net_file, key, folder)):
+            _dump_digest(_get_stat_file(net_file, folder), file_stat, digest)
+            break
+    return net
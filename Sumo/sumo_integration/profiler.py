@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a lightweight profiler of the phases of the synchronization tick. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import csv
+import json
+import logging
+import threading
+import time
+
+import numpy as np  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- tick profiler ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+TICK_SPAN = 'tick'
+
+_STATS_FIELDS = ('phase', 'count', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+                 'actors', 'rpcs')
+
+
+class _Span(object):
+    """
+    Measures the duration and the RPCs of a phase. The actors touched by the phase are set by the
+    caller (`span.actors = n`).
+    """
+    __slots__ = ('_phase', '_profiler', '_start', '_rpcs', 'actors')
+
+    def __init__(self, profiler, phase):
+        self._profiler = profiler
+        self._phase = phase
+        self._start = 0.0
+        self._rpcs = 0
+        self.actors = 0
+
+    def __enter__(self):
+        rpc_counter = self._profiler.rpc_counter
+        self._rpcs = rpc_counter() if rpc_counter is not None else 0
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        duration = time.perf_counter() - self._start
+        rpc_counter = self._profiler.rpc_counter
+        rpcs = rpc_counter() - self._rpcs if rpc_counter is not None else 0
+        self._profiler.record(self._phase, duration, self.actors, rpcs)
+        return False
+
+
+class _NullSpan(object):
+    """
+    Span of a disabled profiler, does nothing.
+    """
+    __slots__ = ('actors', )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _PhaseStats(object):
+    """
+    Statistics of a phase: rolling window of durations and totals since the start.
+    """
+    __slots__ = ('durations', 'count', 'total', 'max', 'actors', 'rpcs')
+
+    def __init__(self, window):
+        self.durations = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.actors = 0
+        self.rpcs = 0
+
+
+class TickProfiler(object):
+    """
+    TickProfiler measures named spans (phases) of the synchronization tick:
+
+        profiler.begin_tick()
+        with profiler.span('spawn') as span:
+            ...
+            span.actors = len(spawned_actors)
+        profiler.end_tick()
+
+    For each phase, the profiler keeps the number of actors touched and the RPCs issued (given by
+    `rpc_counter`, a callable returning the number of RPCs issued so far), and the p50/p95/p99 of
+    the last `window` durations. The whole tick is reported as the 'tick' phase.
+
+    The statistics can be logged every `log_interval` ticks and written to a csv or json file (see
+    dump). A disabled profiler hands out a shared no-op span, so the instrumentation can be left in
+    place.
+
+    Spans can be recorded from several threads, as long as each phase is recorded by a single one.
+    """
+    def __init__(self, enabled=True, rpc_counter=None, window=1000, log_interval=0):
+        self.enabled = enabled
+        self.rpc_counter = rpc_counter
+        self.window = window
+        self.log_interval = log_interval
+
+        self.ticks = 0
+        self._phases = collections.OrderedDict()  # {phase: _PhaseStats}, in order of appearance.
+        self._phases_lock = threading.Lock()  # Guards the insertion of new phases.
+        self._tick_span = None
+
+    def span(self, phase):
+        """
+        Returns a context manager measuring the given phase.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, phase)
+
+    def begin_tick(self):
+        if not self.enabled:
+            return
+        self._tick_span = _Span(self, TICK_SPAN)
+        self._tick_span.__enter__()
+
+    def end_tick(self, actors=0):
+        """
+        Ends the tick span. Logs the statistics every `log_interval` ticks.
+
+            :param actors: number of synchronized actors.
+        """
+        if self._tick_span is None:
+            return
+        self._tick_span.actors = actors
+        self._tick_span.__exit__(None, None, None)
+        self._tick_span = None
+
+        self.ticks += 1
+        if self.log_interval > 0 and self.ticks % self.log_interval == 0:
+            logging.info('Tick profile (p50/p95/p99 ms over the last %d ticks): %s',
+                         min(self.ticks, self.window), self.summary())
+
+    def record(self, phase, duration, actors=0, rpcs=0):
+        """
+        Records a span of the given phase.
+
+            :param duration: duration of the span, in seconds.
+        """
+        stats = self._phases.get(phase)
+        if stats is None:
+            with self._phases_lock:
+                stats = self._phases[phase] = _PhaseStats(self.window)
+
+        stats.durations.append(duration)
+        stats.count += 1
+        stats.total += duration
+        stats.actors += actors
+        stats.rpcs += rpcs
+        if duration > stats.max:
+            stats.max = duration
+
+    def get_stats(self):
+        """
+        Returns the statistics of each phase, the durations in milliseconds. Percentiles and mean
+        are computed over the rolling window, the rest since the start.
+
+            :return: [{field: value}], the tick first.
+        """
+        with self._phases_lock:
+            phases = list(self._phases)
+        if TICK_SPAN in phases:
+            phases.remove(TICK_SPAN)
+            phases.insert(0, TICK_SPAN)
+
+        rows = []
+        for phase in phases:
+            stats = self._phases[phase]
+            durations = np.array(list(stats.durations), dtype=np.float64) * 1e3
+            p50, p95, p99 = np.percentile(durations, (50, 95, 99))
+            rows.append(
+                dict(zip(_STATS_FIELDS,
+                         (phase, stats.count, stats.total * 1e3, float(durations.mean()),
+                          float(p50), float(p95), float(p99), stats.max * 1e3, stats.actors,
+                          stats.rpcs))))
+        return rows
+
+    def summary(self):
+        """
+        Returns a single line with the p50/p95/p99 durations (ms) of each phase.
+        """
+        return ' | '.join('{} {:.2f}/{:.2f}/{:.2f}'.format(row['phase'], row['p50_ms'],
+                                                         row['p95_ms'], row['p99_ms'])
+                          for row in self.get_stats())
+
+    def dump(self, filename):
+        """
+        Writes the statistics of each phase to a json file (.json extension) or a csv file.
+        """
+        rows = self.get_stats()
+        with open(filename, 'w', newline='') as f:
+            if filename.endswith('.json'):
+                json.dump({'ticks': self.ticks, 'window': self.window, 'phases': rows}, f, indent=2)
+            else:
+                writer = csv.DictWriter(f, fieldnames=_STATS_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the random rerouting of the sumo NPC vehicles. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+import random
+
+import traci  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- sumo rerouter ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SumoRerouter(object):
+    """
+    SumoRerouter keeps the sumo NPC vehicles driving around by extending their route with a random
+    allowed outgoing edge when they reach the last edge of their route.
+
+    The route and vehicle class of each vehicle are cached when the vehicle is added, and the route
+    index is read from the vehicle subscription (see SumoSimulation.subscribe), so only the vehicles
+    that need a new route cost a TraCI call.
+    """
+    def __init__(self, sumo_simulation):
+        self.sumo = sumo_simulation
+
+        self._routes = {}  # {vehicle_id: [edge_id]}
+        self._vclasses = {}  # {vehicle_id: vclass}
+        self._departed = set()  # Vehicles inserted in the net.
+
+        # Number of TraCI calls made by the rerouter.
+        self.traci_calls = 0
+        self.reroutes = 0
+
+    def __len__(self):
+        return len(self._routes)
+
+    def add(self, vehicle_id, vclass, route):
+        """
+        Registers a vehicle added to sumo with the given vehicle class and route (list of edge ids).
+        """
+        self._routes[vehicle_id] = list(route)
+        self._vclasses[vehicle_id] = vclass
+
+    def remove(self, vehicle_id):
+        """
+        Stops rerouting the given vehicle.
+        """
+        self._routes.pop(vehicle_id, None)
+        self._vclasses.pop(vehicle_id, None)
+        self._departed.discard(vehicle_id)
+
+    def _get_route_index(self, vehicle_id, results):
+        values = results.get(vehicle_id)
+        if values is not None and traci.constants.VAR_ROUTE_INDEX in values:
+            return values[traci.constants.VAR_ROUTE_INDEX]
+
+        # The vehicle is not subscribed (e.g., not synchronized with carla).
+        self.traci_calls += 1
+        return traci.vehicle.getRouteIndex(vehicle_id)
+
+    def tick(self):
+        """
+        Extends the route of the vehicles that reached the last edge of their route. To be called
+        after ticking the sumo simulation.
+
+            :return: number of rerouted vehicles.
+        """
+        for vehicle_id in self.sumo.destroyed_actors:
+            self.remove(vehicle_id)
+        self._departed.update(self.sumo.spawned_actors & self._routes.keys())
+
+        # Received with the simulation step, reading them is not a TraCI call.
+        results = traci.vehicle.getAllSubscriptionResults()
+
+        rerouted = 0
+        for vehicle_id in self._departed:
+            route = self._routes[vehicle_id]
+            if self._get_route_index(vehicle_id, results) != len(route) - 1:
+                continue
+
+            available_edges = self.sumo.get_allowed_outgoing_edges(route[-1],
+                                                                   self._vclasses[vehicle_id])
+            if not available_edges:
+                continue
+
+            new_route = [route[-1], random.choice(available_edges)]
+            try:
+                traci.vehicle.setRoute(vehicle_id, new_route)
+            except traci.exceptions.TraCIException as error:
+                logging.debug('Reroute of %s failed: %s', vehicle_id, error)
+                continue
+            finally:
+                self.traci_calls += 1
+
+            self._routes[vehicle_id] = new_route
+            rerouted += 1
+
+        self.reroutes += rerouted
+        return rerouted
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a same-host shared memory transport for the co-simulation frames. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+# ==================================================================================================
+# -- shared memory transport -----------------------------------------------------------------------
+# ==================================================================================================
+
+# The shared memory segment is a file in /dev/shm (the temporary folder if not available) with a
+# control block followed by two slots. The writer always fills the slot that is not being read and
+# then flips the active slot, so the reader gets the latest frame without waiting for the writer.
+# Each slot is protected by a seqlock (odd sequence while the writer is filling it): the reader
+# copies the payload and retries if the sequence changed during the copy.
+#
+#   control     magic, version, slot_capacity, frame_counter, active_slot
+#   slot[0]     seq, length, payload[slot_capacity]
+#   slot[1]     seq, length, payload[slot_capacity]
+
+SHM_MAGIC = b'CSHM'
+SHM_VERSION = 1
+
+_CONTROL = struct.Struct('<4sIQQQ')
+_CONTROL_SIZE = 64
+_SLOT_HEADER = struct.Struct('<QQ')
+_SLOT_HEADER_SIZE = 64
+
+_FRAME_COUNTER_OFFSET = 16
+_ACTIVE_SLOT_OFFSET = 24
+_U64 = struct.Struct('<Q')
+
+
+def shm_path(key):
+    """
+    Returns the path of the shared memory segment used for the given key.
+    """
+    shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(shm_dir, 'cosim_{}'.format(key))
+
+
+class SharedMemoryTransport(object):
+    """
+    SharedMemoryTransport exchanges frames between processes in the same host through a memory
+    mapped, double buffered segment. Only the latest frame is kept: frames published faster than
+    they are read are lost.
+
+    The payloads returned by `receive` are copies of the shared memory (a single copy per frame), so
+    they remain valid whatever the writer publishes afterwards.
+    """
+    polling = False
+
+    _REPLACED_CHECK_INTERVAL = 1.0  # seconds
+
+    def __init__(self, key, capacity=4 * 1024 * 1024, poll_interval=0.0005):
+        self.key = key
+        self.path = shm_path(key)
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+
+        self._file = None
+        self._mmap = None
+        self._view = None
+        self._inode = None
+
+        self._writer = False
+        self._frame_counter = 0
+        self._last_frame_counter = 0
+
+    def _slot_offset(self, slot):
+        return _CONTROL_SIZE + slot * (_SLOT_HEADER_SIZE + self.capacity)
+
+    def _create(self):
+        # The segment is initialized under a temporary name and then moved into place, so readers
+        # never see a partially initialized segment.
+        path = '{}.{}'.format(self.path, os.getpid())
+        with open(path, 'w+b') as segment:
+            segment.truncate(self._slot_offset(2))
+            segment.write(_CONTROL.pack(SHM_MAGIC, SHM_VERSION, self.capacity, 0, 0))
+        os.replace(path, self.path)
+
+        self._writer = True
+        self._open()
+
+    def _open(self):
+        try:
+            self._file = open(self.path, 'r+b')
+        except FileNotFoundError:
+            return False
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._view = memoryview(self._mmap)
+        self._inode = os.fstat(self._file.fileno()).st_ino
+
+        magic, version, capacity, frame_counter, _ = _CONTROL.unpack_from(self._mmap, 0)
+        if magic != SHM_MAGIC or version != SHM_VERSION:
+            self.close()
+            raise RuntimeError('Invalid shared memory segment {}'.format(self.path))
+        self.capacity = capacity
+        self._frame_counter = frame_counter
+        return True
+
+    def _replaced(self):
+        """
+        Returns True if the writer has created a new segment (e.g., after a restart).
+        """
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return False
+
+    def _unmap(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def publish(self, payload):
+        """
+        Publishes a new frame.
+        """
+        if self._mmap is None:
+            self._create()
+
+        if len(payload) > self.capacity:
+            raise ValueError('Frame of {} bytes exceeds the shared memory capacity ({} bytes)'.format(
+                len(payload), self.capacity))
+
+        active_slot = _U64.unpack_from(self._mmap, _ACTIVE_SLOT_OFFSET)[0]
+        slot = 1 - active_slot
+        offset = self._slot_offset(slot)
+
+        seq = _SLOT_HEADER.unpack_from(self._mmap, offset)[0]
+        _SLOT_HEADER.pack_into(self._mmap, offset, seq + 1, len(payload))
+        payload_offset = offset + _SLOT_HEADER_SIZE
+        self._view[payload_offset:payload_offset + len(payload)] = payload
+        _SLOT_HEADER.pack_into(self._mmap, offset, seq + 2, len(payload))
+
+        self._frame_counter += 1
+        _U64.pack_into(self._mmap, _ACTIVE_SLOT_OFFSET, slot)
+        _U64.pack_into(self._mmap, _FRAME_COUNTER_OFFSET, self._frame_counter)
+
+    def _read_active_slot(self):
+        while True:
+            active_slot = _U64.unpack_from(self._mmap, _ACTIVE_SLOT_OFFSET)[0]
+            offset = self._slot_offset(active_slot)
+
+            seq, length = _SLOT_HEADER.unpack_from(self._mmap, offset)
+            if seq % 2 == 1:
+                continue  # The writer is filling this slot, the active slot is about to change.
+
+            # The length may be garbage if the slot was overwritten in the meantime.
+            if length > self.capacity:
+                continue
+
+            # The payload is copied before checking the sequence, the writer may refill the slot
+            # (two publishes) at any time.
+            payload_offset = offset + _SLOT_HEADER_SIZE
+            payload = bytes(self._view[payload_offset:payload_offset + length])
+            if _SLOT_HEADER.unpack_from(self._mmap, offset)[0] == seq:
+                return payload
+
+    def receive(self, timeout=None):
+        """
+        Returns the list of frames received since the last call. Only the latest frame is available,
+        so the list contains at most one frame. Waits up to `timeout` seconds (forever if None) for
+        a new frame.
+        """
+        now = time.monotonic()
+        deadline = None if timeout is None else now + timeout
+        next_check = now + self._REPLACED_CHECK_INTERVAL
+        while True:
+            if self._mmap is not None or self._open():
+                frame_counter = _U64.unpack_from(self._mmap, _FRAME_COUNTER_OFFSET)[0]
+                if frame_counter != self._last_frame_counter:
+                    self._last_frame_counter = frame_counter
+                    return [self._read_active_slot()]
+
+            now = time.monotonic()
+            if self._mmap is not None and now >= next_check:
+                next_check = now + self._REPLACED_CHECK_INTERVAL
+                if self._replaced():
+                    logging.info('Shared memory segment %s replaced, reopening', self.path)
+                    self._unmap()
+                    self._last_frame_counter = 0
+                    continue
+
+            if deadline is not None and now >= deadline:
+                return []
+            time.sleep(self.poll_interval)
+
+    def close(self):
+        """
+        Closes the transport. The writer removes the shared memory segment.
+        """
+        self._unmap()
+
+        if self._writer:
+            # Another writer may have replaced the segment in the meantime.
+            try:
+                if os.stat(self.path).st_ino == self._inode:
+                    os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._writer = False
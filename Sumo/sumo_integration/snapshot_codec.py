@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the wire format of the co-simulation vehicle snapshots. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import json
+import math
+import struct
+
+import numpy as np  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- wire format -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Binary snapshots start with SNAPSHOT_MAGIC. Any other payload is decoded as a json snapshot, which
+# is the format used by producers that have not been migrated yet:
+#
+#   {'frame_id': int, 'sim_time': float, 'vehicles': {
+#       vehicle_id: {'type_id': str, 'vclass': str, 'color': [r, g, b(, a)],
+#                    'location': {'x', 'y', 'z'}, 'rotation': {'x', 'y', 'z'},
+#                    'extent': {'x', 'y', 'z'}}, ...}}
+#
+# The envelope (frame_id, sim_time) is optional, a bare {vehicle_id: {...}} dict is also accepted.
+# The frame id increases monotonically with every frame published by the producer, and lets the
+# readers tell new frames from repeated ones.
+#
+# The binary layout (little endian) is a fixed header followed by the columns below, each of them
+# starting at an 8-byte aligned offset:
+#
+#   header        magic, version, flags, count, num_strings, ids_size, strings_size,
+#                 frame_id (uint64), sim_time (float64)
+#   locations     float64 [count x 3]   (x, y, z)
+#   rotations     float32 [count x 3]   (pitch, yaw, roll)
+#   extents       float32 [count x 3]   (x, y, z)
+#   colors        uint8   [count x 4]   (r, g, b, a)
+#   type_index    uint16  [count]       index of the type id in the string table
+#   vclass_index  uint16  [count]       index of the vehicle class in the string table
+#   ids           utf-8, '\0' separated
+#   strings       utf-8, '\0' separated (interned type ids and vehicle classes)
+
+SNAPSHOT_MAGIC = b'CSNP'
+SNAPSHOT_VERSION = 2
+
+# Version 1 snapshots have no frame id nor simulation time.
+_HEADER_V1 = struct.Struct('<4sBBHIIII')
+_HEADER = struct.Struct('<4sBBHIIIIQd')
+_NO_FRAME_ID = 0xFFFFFFFFFFFFFFFF
+_ALIGNMENT = 8
+_SEPARATOR = '\0'
+
+VehicleSnapshot = collections.namedtuple(
+    'VehicleSnapshot',
+    'ids locations rotations extents colors type_index vclass_index strings frame_id sim_time',
+    defaults=(None, None))
+
+
+class SnapshotFormatError(ValueError):
+    """
+    Raised when a payload is not a valid vehicle snapshot.
+    """
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) & ~(_ALIGNMENT - 1)
+
+
+def _join(strings):
+    return _SEPARATOR.join(strings).encode('utf-8')
+
+
+def _split(blob, count):
+    if count == 0:
+        return []
+    return bytes(blob).decode('utf-8').split(_SEPARATOR)
+
+
+# (name, dtype, components per vehicle) of the fixed-size columns.
+_COLUMNS = (
+    ('locations', np.dtype(np.float64), 3),
+    ('rotations', np.dtype(np.float32), 3),
+    ('extents', np.dtype(np.float32), 3),
+    ('colors', np.dtype(np.uint8), 4),
+    ('type_index', np.dtype(np.uint16), 1),
+    ('vclass_index', np.dtype(np.uint16), 1),
+)
+
+
+def _column_layout(count, ids_size, strings_size, header=_HEADER):
+    """
+    Returns the (name, dtype, shape, offset) of every column and the total size of the payload.
+    """
+    layout = []
+    offset = _aligned(header.size)
+    for name, dtype, components in _COLUMNS:
+        shape = (count, components) if components > 1 else (count, )
+        layout.append((name, dtype, shape, offset))
+        offset = _aligned(offset + count * components * dtype.itemsize)
+
+    for name, size in (('ids', ids_size), ('strings', strings_size)):
+        layout.append((name, np.dtype(np.uint8), (size, ), offset))
+        offset = _aligned(offset + size)
+    return layout, offset
+
+
+# ==================================================================================================
+# -- encoding --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def snapshot_from_dict(vehicle_info, frame_id=None, sim_time=None):
+    """
+    Builds a snapshot from the json representation of the vehicles (with or without envelope).
+    """
+    if 'vehicles' in vehicle_info and 'frame_id' in vehicle_info:
+        frame_id = vehicle_info['frame_id']
+        sim_time = vehicle_info.get('sim_time')
+        vehicle_info = vehicle_info['vehicles']
+
+    count = len(vehicle_info)
+    locations = np.empty((count, 3), dtype=np.float64)
+    rotations = np.empty((count, 3), dtype=np.float32)
+    extents = np.empty((count, 3), dtype=np.float32)
+    colors = np.full((count, 4), 255, dtype=np.uint8)
+    type_index = np.empty(count, dtype=np.uint16)
+    vclass_index = np.empty(count, dtype=np.uint16)
+
+    strings = {}  # {string: index}
+    for i, vehicle in enumerate(vehicle_info.values()):
+        location, rotation, extent = vehicle['location'], vehicle['rotation'], vehicle['extent']
+        locations[i] = (location['x'], location['y'], location['z'])
+        rotations[i] = (rotation['x'], rotation['y'], rotation['z'])
+        extents[i] = (extent['x'], extent['y'], extent['z'])
+
+        color = vehicle.get('color')
+        if color:
+            colors[i, :len(color)] = color
+
+        type_index[i] = strings.setdefault(vehicle['type_id'], len(strings))
+        vclass_index[i] = strings.setdefault(vehicle['vclass'], len(strings))
+
+    return VehicleSnapshot(list(vehicle_info.keys()), locations, rotations, extents, colors,
+                           type_index, vclass_index, list(strings.keys()), frame_id, sim_time)
+
+
+def snapshot_to_dict(snapshot):
+    """
+    Returns the json representation of the vehicles in the given snapshot (without envelope).
+    """
+    vehicle_info = {}
+    strings = snapshot.strings
+    for i, vehicle_id in enumerate(snapshot.ids):
+        location = snapshot.locations[i].tolist()
+        rotation = snapshot.rotations[i].tolist()
+        extent = snapshot.extents[i].tolist()
+        vehicle_info[vehicle_id] = {
+            'type_id': strings[snapshot.type_index[i]],
+            'vclass': strings[snapshot.vclass_index[i]],
+            'color': snapshot.colors[i].tolist(),
+            'location': {'x': location[0], 'y': location[1], 'z': location[2]},
+            'rotation': {'x': rotation[0], 'y': rotation[1], 'z': rotation[2]},
+            'extent': {'x': extent[0], 'y': extent[1], 'z': extent[2]},
+        }
+    return vehicle_info
+
+
+def encode_snapshot(snapshot, frame_id=None, sim_time=None):
+    """
+    Serializes the given snapshot (or its json representation) into the binary wire format. The
+    given frame id and simulation time override the ones of the snapshot.
+    """
+    if isinstance(snapshot, dict):
+        snapshot = snapshot_from_dict(snapshot)
+
+    frame_id = snapshot.frame_id if frame_id is None else frame_id
+    sim_time = snapshot.sim_time if sim_time is None else sim_time
+
+    count = len(snapshot.ids)
+    if len(snapshot.strings) > np.iinfo(np.uint16).max:
+        raise SnapshotFormatError('Too many distinct type ids and vehicle classes in snapshot')
+
+    ids = _join(snapshot.ids)
+    strings = _join(snapshot.strings)
+    layout, size = _column_layout(count, len(ids), len(strings))
+
+    payload = bytearray(size)
+    _HEADER.pack_into(payload, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, 0, count,
+                      len(snapshot.strings), len(ids), len(strings),
+                      _NO_FRAME_ID if frame_id is None else frame_id,
+                      float('nan') if sim_time is None else sim_time)
+    for name, dtype, shape, offset in layout:
+        if name == 'ids':
+            payload[offset:offset + len(ids)] = ids
+        elif name == 'strings':
+            payload[offset:offset + len(strings)] = strings
+        else:
+            column = np.ascontiguousarray(getattr(snapshot, name), dtype=dtype).reshape(shape)
+            payload[offset:offset + column.nbytes] = column.tobytes()
+    return bytes(payload)
+
+
+def encode_snapshot_json(snapshot, frame_id=None, sim_time=None):
+    """
+    Serializes the given snapshot (or its json representation) into the json fallback format. The
+    envelope is only added if the frame id is known.
+    """
+    if isinstance(snapshot, dict):
+        snapshot = snapshot_from_dict(snapshot)
+
+    frame_id = snapshot.frame_id if frame_id is None else frame_id
+    sim_time = snapshot.sim_time if sim_time is None else sim_time
+
+    vehicle_info = snapshot_to_dict(snapshot)
+    if frame_id is None:
+        return json.dumps(vehicle_info)
+    return json.dumps({'frame_id': frame_id, 'sim_time': sim_time, 'vehicles': vehicle_info})
+
+
+# ==================================================================================================
+# -- decoding --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def is_binary_snapshot(payload):
+    """
+    Returns True if the given payload uses the binary wire format.
+    """
+    if isinstance(payload, str):
+        return False
+    return bytes(payload[:len(SNAPSHOT_MAGIC)]) == SNAPSHOT_MAGIC
+
+
+def decode_snapshot(payload):
+    """
+    Deserializes a snapshot, either binary or json.
+
+    The numeric columns of binary snapshots are read-only views over the given payload (no copy).
+    """
+    if not is_binary_snapshot(payload):
+        try:
+            if isinstance(payload, memoryview):
+                payload = payload.tobytes()
+            return snapshot_from_dict(json.loads(payload))
+        except (ValueError, KeyError, TypeError) as error:
+            raise SnapshotFormatError('Invalid json snapshot: {}'.format(error))
+
+    if len(payload) < _HEADER_V1.size:
+        raise SnapshotFormatError('Truncated snapshot header')
+
+    version = payload[len(SNAPSHOT_MAGIC)]
+    if version == 1:
+        header = _HEADER_V1
+        _, _, _, _, count, num_strings, ids_size, strings_size = header.unpack_from(payload, 0)
+        frame_id, sim_time = None, None
+    elif version == SNAPSHOT_VERSION:
+        header = _HEADER
+        if len(payload) < header.size:
+            raise SnapshotFormatError('Truncated snapshot header')
+        (_, _, _, _, count, num_strings, ids_size, strings_size, frame_id,
+         sim_time) = header.unpack_from(payload, 0)
+        frame_id = None if frame_id == _NO_FRAME_ID else frame_id
+        sim_time = None if math.isnan(sim_time) else sim_time
+    else:
+        raise SnapshotFormatError('Unsupported snapshot version {}'.format(version))
+
+    layout, size = _column_layout(count, ids_size, strings_size, header)
+    if len(payload) < size:
+        raise SnapshotFormatError('Truncated snapshot ({} < {} bytes)'.format(len(payload), size))
+
+    columns = {}
+    for name, dtype, shape, offset in layout:
+        length = shape[0] * shape[1] if len(shape) > 1 else shape[0]
+        columns[name] = np.frombuffer(payload, dtype=dtype, count=length,
+                                      offset=offset).reshape(shape)
+
+    strings = _split(columns['strings'], num_strings)
+    return VehicleSnapshot(_split(columns['ids'], count), columns['locations'],
+                           columns['rotations'], columns['extents'], columns['colors'],
+                           columns['type_index'], columns['vclass_index'], strings, frame_id,
+                           sim_time)
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the delta encoding of consecutive co-simulation vehicle snapshots. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import struct
+
+import numpy as np  # pylint: disable=import-error
+
+from .snapshot_codec import (SnapshotFormatError, VehicleSnapshot, decode_snapshot,
+                             encode_snapshot, snapshot_from_dict)
+
+# ==================================================================================================
+# -- wire format -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Delta frames start with DELTA_MAGIC. Every vehicle is assigned a slot when it is spawned, and the
+# slot identifies the vehicle in later frames. Keyframes reset the state of the reader and spawn the
+# whole fleet; the rest of the frames only carry the changes since the previous frame (base_seq).
+#
+#   header            magic, version, kind, seq, base_seq, num_spawned, num_despawned,
+#                     num_updated, spawned_size
+#   spawned_slots     uint32  [num_spawned]
+#   despawned_slots   uint32  [num_despawned]
+#   updated_slots     uint32  [num_updated]
+#   location_deltas   float32 [num_updated x 3]
+#   rotation_deltas   float32 [num_updated x 3]
+#   spawned           binary snapshot (see snapshot_codec) with the spawned vehicles, it also holds
+#                     the frame id and simulation time of the frame
+#
+# Deltas are computed against the state reconstructed by the reader, so the float32 rounding does
+# not accumulate over time.
+
+DELTA_MAGIC = b'CSDF'
+DELTA_VERSION = 1
+
+KEYFRAME = 0
+DELTA = 1
+
+# Redis key set by the readers to ask the producer for a keyframe. The producer has to poll it
+# (see poll_resync_request), otherwise a reader that missed a frame waits for the next periodic
+# keyframe.
+RESYNC_REQUEST_KEY = 'cosim_terasim_vehicle_info_resync'
+
+_HEADER = struct.Struct('<4sBBHIIIIII')
+_ALIGNMENT = 8
+_SEQ_MASK = 0xFFFFFFFF
+
+
+class SnapshotResyncError(Exception):
+    """
+    Raised when a delta frame cannot be applied because the reader missed a previous frame. The
+    reader ignores the following deltas until it receives a keyframe.
+    """
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) & ~(_ALIGNMENT - 1)
+
+
+def is_delta_frame(payload):
+    """
+    Returns True if the given payload is a delta encoded frame.
+    """
+    if isinstance(payload, str):
+        return False
+    return bytes(payload[:len(DELTA_MAGIC)]) == DELTA_MAGIC
+
+
+class _FleetState(object):
+    """
+    Slot based state of the fleet shared by the encoder and the decoder.
+    """
+    def __init__(self, capacity=256):
+        self.ids = [None] * capacity
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.locations = np.zeros((capacity, 3), dtype=np.float64)
+        self.rotations = np.zeros((capacity, 3), dtype=np.float64)
+        self.extents = np.zeros((capacity, 3), dtype=np.float32)
+        self.colors = np.zeros((capacity, 4), dtype=np.uint8)
+        self.type_index = np.zeros(capacity, dtype=np.uint16)
+        self.vclass_index = np.zeros(capacity, dtype=np.uint16)
+
+        self.strings = []
+        self._string_index = {}  # {string: index}
+
+    def reset(self):
+        self.ids = [None] * len(self.ids)
+        self.alive[:] = False
+
+    def _reserve(self, capacity):
+        if capacity <= len(self.ids):
+            return
+
+        capacity = max(capacity, 2 * len(self.ids))
+        grow = capacity - len(self.ids)
+        self.ids.extend([None] * grow)
+        for name in ('alive', 'locations', 'rotations', 'extents', 'colors', 'type_index',
+                     'vclass_index'):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate(
+                [column, np.zeros((grow, ) + column.shape[1:], dtype=column.dtype)]))
+
+    def _intern(self, string):
+        index = self._string_index.get(string)
+        if index is None:
+            index = self._string_index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def spawn(self, slots, snapshot):
+        if len(slots) == 0:
+            return
+
+        self._reserve(int(slots.max()) + 1)
+        remap = np.array([self._intern(string) for string in snapshot.strings] or [0],
+                         dtype=np.uint16)
+
+        for slot, vehicle_id in zip(slots.tolist(), snapshot.ids):
+            self.ids[slot] = vehicle_id
+        self.alive[slots] = True
+        self.locations[slots] = snapshot.locations
+        self.rotations[slots] = snapshot.rotations
+        self.extents[slots] = snapshot.extents
+        self.colors[slots] = snapshot.colors
+        self.type_index[slots] = remap[snapshot.type_index]
+        self.vclass_index[slots] = remap[snapshot.vclass_index]
+
+    def despawn(self, slots):
+        for slot in slots.tolist():
+            self.ids[slot] = None
+        self.alive[slots] = False
+
+    def update(self, slots, location_deltas, rotation_deltas):
+        self.locations[slots] += location_deltas
+        self.rotations[slots] += rotation_deltas
+
+    def snapshot(self, frame_id=None, sim_time=None):
+        slots = np.flatnonzero(self.alive)
+        ids = self.ids
+        return VehicleSnapshot([ids[slot] for slot in slots.tolist()], self.locations[slots],
+                               self.rotations[slots].astype(np.float32), self.extents[slots],
+                               self.colors[slots], self.type_index[slots],
+                               self.vclass_index[slots], list(self.strings), frame_id, sim_time)
+
+
+# ==================================================================================================
+# -- encoder ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SnapshotDeltaEncoder(object):
+    """
+    SnapshotDeltaEncoder turns the snapshots of consecutive frames into delta encoded frames. A
+    keyframe is emitted every `keyframe_interval` frames and whenever a reader requests it.
+    """
+    def __init__(self, keyframe_interval=100, tolerance=1e-4):
+        self.keyframe_interval = keyframe_interval
+        self.tolerance = tolerance
+
+        self._state = _FleetState()
+        self._slots = {}  # {vehicle_id: slot}
+        self._free_slots = []
+        self._next_slot = 0
+
+        self._seq = 0
+        self._frames_since_keyframe = None
+        self._keyframe_requested = True
+
+    def request_keyframe(self):
+        """
+        Forces the next frame to be a keyframe (e.g., a reader asked for a resync).
+        """
+        self._keyframe_requested = True
+
+    def _allocate_slot(self):
+        if self._free_slots:
+            return self._free_slots.pop()
+        self._next_slot += 1
+        return self._next_slot - 1
+
+    def encode(self, snapshot, frame_id=None, sim_time=None):
+        """
+        Returns the delta encoded frame of the given snapshot (or its json representation). The
+        given frame id and simulation time override the ones of the snapshot.
+        """
+        if isinstance(snapshot, dict):
+            snapshot = snapshot_from_dict(snapshot)
+
+        frame_id = snapshot.frame_id if frame_id is None else frame_id
+        sim_time = snapshot.sim_time if sim_time is None else sim_time
+
+        keyframe = self._keyframe_requested or \
+            self._frames_since_keyframe >= self.keyframe_interval - 1
+
+        if keyframe:
+            self._state.reset()
+            self._slots = {}
+            self._free_slots = []
+            self._next_slot = 0
+            self._frames_since_keyframe = 0
+            self._keyframe_requested = False
+        else:
+            self._frames_since_keyframe += 1
+
+        # Despawned vehicles. Their slots are reused by the vehicles spawned in this same frame
+        # because the reader applies the despawns first.
+        current_ids = set(snapshot.ids)
+        despawned = [slot for vehicle_id, slot in self._slots.items()
+                     if vehicle_id not in current_ids]
+        for slot in despawned:
+            del self._slots[self._state.ids[slot]]
+            self._free_slots.append(slot)
+        despawned_slots = np.array(despawned, dtype=np.uint32)
+        self._state.despawn(despawned_slots)
+
+        # Spawned and updated vehicles.
+        spawned_rows, spawned = [], []
+        updated_rows, updated = [], []
+        for row, vehicle_id in enumerate(snapshot.ids):
+            slot = self._slots.get(vehicle_id)
+            if slot is None:
+                slot = self._slots[vehicle_id] = self._allocate_slot()
+                spawned_rows.append(row)
+                spawned.append(slot)
+            else:
+                updated_rows.append(row)
+                updated.append(slot)
+
+        spawned_snapshot = VehicleSnapshot([snapshot.ids[row] for row in spawned_rows],
+                                           snapshot.locations[spawned_rows],
+                                           snapshot.rotations[spawned_rows],
+                                           snapshot.extents[spawned_rows],
+                                           snapshot.colors[spawned_rows],
+                                           snapshot.type_index[spawned_rows],
+                                           snapshot.vclass_index[spawned_rows], snapshot.strings,
+                                           frame_id, sim_time)
+        spawned_slots = np.array(spawned, dtype=np.uint32)
+        self._state.spawn(spawned_slots, spawned_snapshot)
+
+        updated_slots = np.array(updated, dtype=np.uint32)
+        location_deltas = (snapshot.locations[updated_rows] -
+                           self._state.locations[updated_slots]).astype(np.float32)
+        rotation_deltas = (snapshot.rotations[updated_rows].astype(np.float64) -
+                           self._state.rotations[updated_slots]).astype(np.float32)
+
+        # Only vehicles that moved are sent.
+        moved = np.logical_or(np.abs(location_deltas).max(axis=1, initial=0.0) > self.tolerance,
+                              np.abs(rotation_deltas).max(axis=1, initial=0.0) > self.tolerance)
+        updated_slots = updated_slots[moved]
+        location_deltas = location_deltas[moved]
+        rotation_deltas = rotation_deltas[moved]
+        self._state.update(updated_slots, location_deltas, rotation_deltas)
+
+        base_seq = self._seq
+        self._seq = (self._seq + 1) & _SEQ_MASK
+
+        spawned_payload = encode_snapshot(spawned_snapshot)
+        sections = [spawned_slots, despawned_slots, updated_slots, location_deltas,
+                    rotation_deltas]
+
+        offset = _aligned(_HEADER.size)
+        offsets = []
+        for section in sections:
+            offsets.append(offset)
+            offset = _aligned(offset + section.nbytes)
+
+        payload = bytearray(offset + len(spawned_payload))
+        _HEADER.pack_into(payload, 0, DELTA_MAGIC, DELTA_VERSION, KEYFRAME if keyframe else DELTA,
+                          0, self._seq, base_seq, len(spawned_slots), len(despawned_slots),
+                          len(updated_slots), len(spawned_payload))
+        for section, section_offset in zip(sections, offsets):
+            payload[section_offset:section_offset + section.nbytes] = section.tobytes()
+        payload[offset:] = spawned_payload
+        return bytes(payload)
+
+
+def poll_resync_request(client, encoder, key=RESYNC_REQUEST_KEY):
+    """
+    Producer side of the resync requests: if a reader asked for a keyframe, clears the request and
+    forces the next frame of the encoder to be a keyframe. To be called before encoding each frame:
+
+        poll_resync_request(redis_client, encoder)
+        transport.publish(encoder.encode(snapshot))
+
+        :param client: redis client.
+        :param encoder: SnapshotDeltaEncoder.
+        :return: True if a keyframe was requested.
+    """
+    # Reading and clearing the request is a single atomic command, so requests set in between are
+    # not lost.
+    if client.delete(key):
+        encoder.request_keyframe()
+        return True
+    return False
+
+
+# ==================================================================================================
+# -- decoder ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SnapshotDeltaDecoder(object):
+    """
+    SnapshotDeltaDecoder reconstructs the full fleet state from delta encoded frames. Plain
+    snapshots (binary or json) are also accepted and returned as they are.
+    """
+    def __init__(self):
+        self._state = _FleetState()
+        self._seq = None
+        self._snapshot = None
+
+    @property
+    def synchronized(self):
+        """
+        Whether the reader holds a valid state (i.e., it did not miss any frame since the last
+        keyframe).
+        """
+        return self._seq is not None
+
+    def decode(self, payload):
+        """
+        Returns the full snapshot after applying the given frame.
+
+        Raises SnapshotResyncError if a previous frame was missed.
+        """
+        if not is_delta_frame(payload):
+            return decode_snapshot(payload)
+
+        if len(payload) < _HEADER.size:
+            raise SnapshotFormatError('Truncated delta frame header')
+
+        (_, version, kind, _, seq, base_seq, num_spawned, num_despawned, num_updated,
+         spawned_size) = _HEADER.unpack_from(payload, 0)
+        if version != DELTA_VERSION:
+            raise SnapshotFormatError('Unsupported delta frame version {}'.format(version))
+
+        # The same frame read twice (e.g., polling faster than the producer).
+        if seq == self._seq and self._snapshot is not None:
+            return self._snapshot
+
+        if kind == KEYFRAME:
+            self._state.reset()
+        elif self._seq is None or base_seq != self._seq:
+            expected, self._seq = self._seq, None
+            raise SnapshotResyncError('Missed delta frame (expected base {}, got {})'.format(
+                expected, base_seq))
+
+        sections = [(np.uint32, num_spawned, 1), (np.uint32, num_despawned, 1),
+                    (np.uint32, num_updated, 1), (np.float32, num_updated, 3),
+                    (np.float32, num_updated, 3)]
+        columns = []
+        offset = _aligned(_HEADER.size)
+        for dtype, count, components in sections:
+            column = np.frombuffer(payload, dtype=dtype, count=count * components, offset=offset)
+            columns.append(column.reshape((count, 3)) if components == 3 else column)
+            offset = _aligned(offset + column.nbytes)
+        spawned_slots, despawned_slots, updated_slots, location_deltas, rotation_deltas = columns
+
+        spawned = decode_snapshot(memoryview(payload)[offset:offset + spawned_size])
+
+        self._state.despawn(despawned_slots)
+        self._state.spawn(spawned_slots, spawned)
+        self._state.update(updated_slots, location_deltas, rotation_deltas)
+
+        self._seq = seq
+        self._snapshot = self._state.snapshot(spawned.frame_id, spawned.sim_time)
+        return self._snapshot
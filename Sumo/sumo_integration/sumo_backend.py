@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+This module selects the library used to communicate with sumo:
+
+    * traci: sumo runs as a server and every call goes through a TCP socket. Required for sumo-gui,
+      connecting to a running sumo server and multiple TraCI clients.
+    * libsumo: sumo runs in this process and calls have no serialization cost.
+
+Both libraries share the traci api. The backend is selected through the LIBSUMO_AS_TRACI environment
+variable, so it has to be selected before traci is imported (i.e., before importing the sumo
+integration modules).
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import os
+import sys
+
+# ==================================================================================================
+# -- sumo backend ----------------------------------------------------------------------------------
+# ==================================================================================================
+
+SUMO_BACKENDS = ('traci', 'libsumo')
+
+
+def parse_sumo_backend(argv=None, default='traci'):
+    """
+    Returns the value of the --sumo-backend argument. The command line is parsed ahead of the
+    script argument parser, as the backend has to be selected before importing traci.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--sumo-backend', choices=SUMO_BACKENDS, default=default)
+    args, _ = parser.parse_known_args(argv)
+    return args.sumo_backend
+
+
+def select_sumo_backend(backend):
+    """
+    Selects the library imported as traci.
+    """
+    if backend not in SUMO_BACKENDS:
+        raise ValueError('Unknown sumo backend {} (available: {})'.format(
+            backend, ', '.join(SUMO_BACKENDS)))
+
+    traci = sys.modules.get('traci')
+    if traci is not None:
+        if traci.isLibsumo() != (backend == 'libsumo'):
+            raise RuntimeError('The sumo backend has to be selected before importing traci')
+        return
+
+    if backend == 'libsumo':
+        os.environ['LIBSUMO_AS_TRACI'] = 'quiet'
+    else:
+        os.environ.pop('LIBSUMO_AS_TRACI', None)
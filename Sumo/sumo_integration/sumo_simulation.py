@@ -17,10 +17,13 @@ import logging
 import os
 
 import carla  # pylint: disable=import-error
+import numpy as np  # pylint: disable=import-error
 import sumolib  # pylint: disable=import-error
 import traci  # pylint: disable=import-error
 
 from .constants import INVALID_ACTOR_ID
+from .net_cache import read_net
+from .sumo_backend import SUMO_BACKENDS
 
 import lxml.etree as ET  # pylint: disable=import-error
 
@@ -102,6 +105,20 @@ class SumoActorClass(enum.Enum):
 SumoActor = collections.namedtuple('SumoActor', 'type_id vclass transform signals extent color')
 SumoActorWithSpeed = collections.namedtuple('SumoActorWithSpeed', 'type_id vclass transform signals extent color speed')
 
+# State of all the subscribed sumo actors as a struct of arrays (row i belongs to ids[i]):
+#
+#   ids         list of actor ids
+#   type_ids    list of vtypes
+#   vclasses    list of vehicle classes (str, see SumoActorClass)
+#   colors      uint8   [N x 4]   (r, g, b, a)
+#   locations   float64 [N x 3]   (x, y, z)
+#   rotations   float64 [N x 3]   (slope, angle, 0.0), same convention as SumoActor.transform
+#   extents     float64 [N x 3]   (length / 2, width / 2, height / 2)
+#   speeds      float64 [N]
+#   signals     int32   [N]
+SumoFleetState = collections.namedtuple(
+    'SumoFleetState', 'ids type_ids vclasses colors locations rotations extents speeds signals')
+
 # ==================================================================================================
 # -- sumo traffic lights ---------------------------------------------------------------------------
 # ==================================================================================================
@@ -165,20 +182,42 @@ class SumoTLManager(object):
         self._current_program = {}  # {tlid: program_id}
         self._current_phase = {}  # {tlid: index_phase}
 
-        for tlid in traci.trafficlight.getIDList():
+        # Landmarks index, built once for all the programs. The signals of a landmark are resolved
+        # with the current program of each traffic light.
+        self._landmark2tls = collections.defaultdict(list)  # {landmark_id: [tlid]}
+        self._tl2landmarks = collections.defaultdict(set)  # {tlid: {landmark_id}}
+
+        # Number of TraCI calls made by the manager. Reading subscription results is not a call,
+        # they are received with the simulation step.
+        self.traci_calls = 0
+
+        # The traffic lights are static, so the id list is only retrieved once.
+        self._tlids = traci.trafficlight.getIDList()
+        # Subscription, program logics, program and phase of each traffic light.
+        self.traci_calls += 1 + 4 * len(self._tlids)
+        for tlid in self._tlids:
             self.subscribe(tlid)
 
             self._tls[tlid] = {}
             for tllogic in traci.trafficlight.getAllProgramLogics(tlid):
                 states = [phase.state for phase in tllogic.getPhases()]
-                parameters = tllogic.getParameters()
+                parameters = tllogic.subParameter  # getParameters() is not available in libsumo
                 tl = SumoTLLogic(tlid, states, parameters)
                 self._tls[tlid][tllogic.programID] = tl
+                self._tl2landmarks[tlid].update(tl.get_all_landmarks())
+
+            for landmark_id in self._tl2landmarks[tlid]:
+                self._landmark2tls[landmark_id].append(tlid)
 
             # Get current status of the traffic lights.
             self._current_program[tlid] = traci.trafficlight.getProgram(tlid)
             self._current_phase[tlid] = traci.trafficlight.getPhase(tlid)
 
+        # Landmark states of the last tick, used to report only the landmarks that change.
+        self._landmark_states = {}  # {landmark_id: state}
+        self._changed_tls = set(self._tls)  # tlids whose program or phase changed.
+        self.changed_states = {}  # {landmark_id: state}, landmarks changed in the last tick.
+
         self._off = False
 
     @staticmethod
@@ -212,12 +251,10 @@ class SumoTLManager(object):
 
     def get_all_landmarks(self):
         """
-        Returns all the landmarks associated with a traffic light in the simulation.
+        Returns all the landmarks associated with a traffic light in the simulation (for any of its
+        programs).
         """
-        landmarks = set()
-        for tlid, program_id in self._current_program.items():
-            landmarks.update(self._tls[tlid][program_id].get_all_landmarks())
-        return landmarks
+        return set(self._landmark2tls)
 
     def get_all_associated_signals(self, landmark_id):
         """
@@ -225,7 +262,8 @@ class SumoTLManager(object):
             :returns list: [(tlid, link_index), (tlid, link_index), ...]
         """
         signals = set()
-        for tlid, program_id in self._current_program.items():
+        for tlid in self._landmark2tls.get(landmark_id, []):
+            program_id = self._current_program[tlid]
             signals.update(self._tls[tlid][program_id].get_associated_signals(landmark_id))
         return signals
 
@@ -234,12 +272,13 @@ class SumoTLManager(object):
         Returns the traffic light state of the signals associated with the given landmark.
         """
         states = set()
-        for tlid, link_index in self.get_all_associated_signals(landmark_id):
+        for tlid in self._landmark2tls.get(landmark_id, []):
             current_program = self._current_program[tlid]
             current_phase = self._current_phase[tlid]
 
             tl = self._tls[tlid][current_program]
-            states.update(tl.states[current_phase][link_index])
+            for _, link_index in tl.get_associated_signals(landmark_id):
+                states.add(tl.states[current_phase][link_index])
 
         if len(states) == 1:
             return states.pop()
@@ -256,6 +295,7 @@ class SumoTLManager(object):
         """
         for tlid, link_index in self.get_all_associated_signals(landmark_id):
             traci.trafficlight.setLinkState(tlid, link_index, state)
+            self.traci_calls += 1
         return True
 
     def switch_off(self):
@@ -264,6 +304,7 @@ class SumoTLManager(object):
         """
         for tlid, link_index in self.get_all_signals():
             traci.trafficlight.setLinkState(tlid, link_index, SumoSignalState.OFF)
+            self.traci_calls += 1
         self._off = True
 
     def tick(self):
@@ -271,20 +312,57 @@ class SumoTLManager(object):
         Tick to traffic light manager
         """
         if self._off is False:
-            for tl_id in traci.trafficlight.getIDList():
-                results = traci.trafficlight.getSubscriptionResults(tl_id)
+            # The state of all the traffic lights was received with the simulation step.
+            all_results = traci.trafficlight.getAllSubscriptionResults()
+            for tl_id in self._tlids:
+                results = all_results.get(tl_id)
+                if not results:
+                    continue
+
                 current_program = results[traci.constants.TL_CURRENT_PROGRAM]
                 current_phase = results[traci.constants.TL_CURRENT_PHASE]
 
                 if current_program != 'online':
+                    if current_program != self._current_program[tl_id] or \
+                       current_phase != self._current_phase[tl_id]:
+                        self._changed_tls.add(tl_id)
                     self._current_program[tl_id] = current_program
                     self._current_phase[tl_id] = current_phase
 
+            self._update_changed_states()
+
+    def _update_changed_states(self):
+        """
+        Recomputes the state of the landmarks of the traffic lights whose program or phase changed,
+        and keeps the ones with a new state in `changed_states`.
+        """
+        self.changed_states = {}
+        landmarks = set()
+        for tlid in self._changed_tls:
+            landmarks.update(self._tl2landmarks[tlid])
+        self._changed_tls.clear()
+
+        for landmark_id in landmarks:
+            state = self.get_state(landmark_id)
+            if state is not None and state != self._landmark_states.get(landmark_id):
+                self._landmark_states[landmark_id] = state
+                self.changed_states[landmark_id] = state
+
 
 # ==================================================================================================
 # -- sumo simulation -------------------------------------------------------------------------------
 # ==================================================================================================
 
+def _get_color(value):
+    """
+    Returns the subscribed color as a (r, g, b, a) tuple. libsumo returns it as a TraCIResult object
+    (e.g., 'TraCIColor(255,255,0,255)') instead of a tuple.
+    """
+    if isinstance(value, tuple):
+        return value
+    return tuple(int(c) for c in value.getString().partition('(')[2].rstrip(')').split(','))
+
+
 def _get_sumo_net(cfg_file):
     """
     Returns sumo net.
@@ -302,20 +380,47 @@ def _get_sumo_net(cfg_file):
     net_file = os.path.join(os.path.dirname(cfg_file), tag.get('value'))
     logging.debug('Reading net file: %s', net_file)
 
-    sumo_net = sumolib.net.readNet(net_file)
-    return sumo_net 
+    sumo_net = read_net(net_file)
+    return sumo_net
 
 class SumoSimulation(object):
     """
     SumoSimulation is responsible for the management of the sumo simulation.
     """
-    def __init__(self, cfg_file, step_length, host=None, port=None, sumo_gui=False, client_order=1):
+    def __init__(self, cfg_file, step_length, host=None, port=None, sumo_gui=False, client_order=1,
+                 backend='traci'):
+        # The backend is selected when importing traci (see sumo_backend).
+        if backend not in SUMO_BACKENDS:
+            raise ValueError('Unknown sumo backend {}'.format(backend))
+        if traci.isLibsumo() != (backend == 'libsumo'):
+            raise RuntimeError(
+                'Sumo backend {} requested but traci was imported as {}. Use select_sumo_backend '
+                'before importing traci.'.format(backend,
+                                                  'libsumo' if traci.isLibsumo() else 'traci'))
+        self.backend = backend
+
+        if backend == 'libsumo':
+            if host is not None and port is not None:
+                raise RuntimeError('The libsumo backend can not connect to a sumo server')
+            if sumo_gui is True:
+                logging.warning('sumo-gui is not available with the libsumo backend')
+                sumo_gui = False
+
         if sumo_gui is True:
             sumo_binary = sumolib.checkBinary('sumo-gui')
         else:
             sumo_binary = sumolib.checkBinary('sumo')
 
-        if host is None or port is None:
+        if backend == 'libsumo':
+            logging.info('Starting sumo in this process (libsumo)...')
+            traci.start([sumo_binary,
+                '--configuration-file', cfg_file,
+                '--step-length', str(step_length),
+                '--lateral-resolution', '0.25',
+                '--collision.check-junctions'
+            ])
+
+        elif host is None or port is None:
             logging.info('Starting new sumo server...')
             if sumo_gui is True:
                 logging.info('Remember to press the play button to start the simulation')
@@ -331,11 +436,17 @@ class SumoSimulation(object):
             logging.info('Connection to sumo server. Host: %s Port: %s', host, port)
             traci.init(host=host, port=port)
 
-        traci.setOrder(client_order)
+        # Only one client with libsumo.
+        if backend == 'traci':
+            traci.setOrder(client_order)
 
         # Retrieving net from configuration file.
         self.net = _get_sumo_net(cfg_file)
 
+        # Edges allowed for each vehicle class, built the first time each vehicle class is used.
+        self._allowed_edges = {}  # {vclass: (edge_id, ...)}
+        self._allowed_outgoing_edges = {}  # {(edge_id, vclass): (edge_id, ...)}
+
         # To keep track of the vehicle classes for which a route has been generated in sumo.
         self._routes = set()
 
@@ -349,12 +460,18 @@ class SumoSimulation(object):
         # Traffic light manager.
         self.traffic_light_manager = SumoTLManager()
 
+        # Number of TraCI requests made after the setup (ticking, spawning, destroying, subscribing
+        # and synchronizing vehicles and traffic lights). The calls of the traffic light manager are
+        # added when ticking. Reading subscription results is not a request.
+        self.traci_calls = 0
+        # Calls of the traffic light manager already added (the setup ones are not counted).
+        self._tl_calls = self.traffic_light_manager.traci_calls
+
     @property
     def traffic_light_ids(self):
         return self.traffic_light_manager.get_all_landmarks()
 
-    @staticmethod
-    def subscribe(actor_id):
+    def subscribe(self, actor_id):
         """
         Subscribe the given actor to the following variables:
 
@@ -367,19 +484,22 @@ class SumoSimulation(object):
             * Speed.
             * Lateral speed.
             * Signals.
+            * Route index (see SumoRerouter).
         """
+        self.traci_calls += 1
         traci.vehicle.subscribe(actor_id, [
             traci.constants.VAR_TYPE, traci.constants.VAR_VEHICLECLASS, traci.constants.VAR_COLOR,
             traci.constants.VAR_LENGTH, traci.constants.VAR_WIDTH, traci.constants.VAR_HEIGHT,
             traci.constants.VAR_POSITION3D, traci.constants.VAR_ANGLE, traci.constants.VAR_SLOPE,
-            traci.constants.VAR_SPEED, traci.constants.VAR_SPEED_LAT, traci.constants.VAR_SIGNALS
+            traci.constants.VAR_SPEED, traci.constants.VAR_SPEED_LAT, traci.constants.VAR_SIGNALS,
+            traci.constants.VAR_ROUTE_INDEX
         ])
 
-    @staticmethod
-    def unsubscribe(actor_id):
+    def unsubscribe(self, actor_id):
         """
         Unsubscribe the given actor from receiving updated information each step.
         """
+        self.traci_calls += 1
         traci.vehicle.unsubscribe(actor_id)
 
     def get_net_offset(self):
@@ -399,7 +519,7 @@ class SumoSimulation(object):
 
         type_id = results[traci.constants.VAR_TYPE]
         vclass = SumoActorClass(results[traci.constants.VAR_VEHICLECLASS])
-        color = results[traci.constants.VAR_COLOR]
+        color = _get_color(results[traci.constants.VAR_COLOR])
 
         length = results[traci.constants.VAR_LENGTH]
         width = results[traci.constants.VAR_WIDTH]
@@ -424,7 +544,7 @@ class SumoSimulation(object):
 
         type_id = results[traci.constants.VAR_TYPE]
         vclass = SumoActorClass(results[traci.constants.VAR_VEHICLECLASS])
-        color = results[traci.constants.VAR_COLOR]
+        color = _get_color(results[traci.constants.VAR_COLOR])
 
         length = results[traci.constants.VAR_LENGTH]
         width = results[traci.constants.VAR_WIDTH]
@@ -442,6 +562,74 @@ class SumoSimulation(object):
 
         return SumoActorWithSpeed(type_id, vclass, transform, signals, extent, color, speed)
 
+    @staticmethod
+    def get_fleet_state():
+        """
+        Accessor for the state of all the subscribed sumo actors at once (see SumoFleetState). The
+        subscription results are read with a single call and no carla object is created.
+        """
+        results = traci.vehicle.getAllSubscriptionResults()
+
+        var_type = traci.constants.VAR_TYPE
+        var_vclass = traci.constants.VAR_VEHICLECLASS
+        var_color = traci.constants.VAR_COLOR
+        var_position = traci.constants.VAR_POSITION3D
+        var_slope = traci.constants.VAR_SLOPE
+        var_angle = traci.constants.VAR_ANGLE
+        var_length = traci.constants.VAR_LENGTH
+        var_width = traci.constants.VAR_WIDTH
+        var_height = traci.constants.VAR_HEIGHT
+        var_speed = traci.constants.VAR_SPEED
+        var_signals = traci.constants.VAR_SIGNALS
+
+        ids, type_ids, vclasses, colors, rows = [], [], [], [], []
+        for actor_id, values in results.items():
+            # Vehicles subscribed to other variables (e.g., by other clients) are ignored.
+            if var_position not in values:
+                continue
+
+            x, y, z = values[var_position]
+            ids.append(actor_id)
+            type_ids.append(values[var_type])
+            vclasses.append(values[var_vclass])
+            colors.append(_get_color(values[var_color]))
+            rows.append((x, y, z, values[var_slope], values[var_angle], values[var_length],
+                         values[var_width], values[var_height], values[var_speed],
+                         values[var_signals]))
+
+        count = len(ids)
+        table = np.array(rows, dtype=np.float64).reshape(count, 10)
+
+        rotations = np.zeros((count, 3), dtype=np.float64)
+        rotations[:, 0:2] = table[:, 3:5]
+
+        return SumoFleetState(ids, type_ids, vclasses,
+                              np.array(colors, dtype=np.uint8).reshape(count, 4),
+                              np.ascontiguousarray(table[:, 0:3]), rotations,
+                              table[:, 5:8] / 2.0, np.ascontiguousarray(table[:, 8]),
+                              table[:, 9].astype(np.int32))
+
+    def get_allowed_edges(self, vclass):
+        """
+        Returns the ids of the edges that allow the given vehicle class.
+        """
+        allowed_edges = self._allowed_edges.get(vclass)
+        if allowed_edges is None:
+            allowed_edges = tuple(e.getID() for e in self.net.getEdges() if e.allows(vclass))
+            self._allowed_edges[vclass] = allowed_edges
+        return allowed_edges
+
+    def get_allowed_outgoing_edges(self, edge_id, vclass):
+        """
+        Returns the ids of the edges reachable from the given edge with the given vehicle class.
+        """
+        key = (edge_id, vclass)
+        allowed_edges = self._allowed_outgoing_edges.get(key)
+        if allowed_edges is None:
+            edge = self.net.getEdge(edge_id)
+            allowed_edges = tuple(e.getID() for e in edge.getAllowedOutgoing(vclass))
+            self._allowed_outgoing_edges[key] = allowed_edges
+        return allowed_edges
 
     def spawn_actor(self, type_id, color=None):
         """
@@ -453,12 +641,14 @@ class SumoSimulation(object):
         """
         actor_id = 'carla' + str(self._sequential_id)
         try:
+            self.traci_calls += 1
             vclass = traci.vehicletype.getVehicleClass(type_id)
             if vclass not in self._routes:
                 logging.debug('Creating route for %s vehicle class', vclass)
-                allowed_edges = [e for e in self.net.getEdges() if e.allows(vclass)]
+                allowed_edges = self.get_allowed_edges(vclass)
                 if allowed_edges:
-                    traci.route.add("carla_route_{}".format(vclass), [allowed_edges[0].getID()])
+                    self.traci_calls += 1
+                    traci.route.add("carla_route_{}".format(vclass), [allowed_edges[0]])
                     self._routes.add(vclass)
                 else:
                     logging.error(
@@ -466,6 +656,7 @@ class SumoSimulation(object):
                         type_id)
                     return INVALID_ACTOR_ID
 
+            self.traci_calls += 1
             traci.vehicle.add(actor_id, 'carla_route_{}'.format(vclass), typeID=type_id)
         except traci.exceptions.TraCIException as error:
             logging.error('Spawn sumo actor failed: %s', error)
@@ -473,17 +664,18 @@ class SumoSimulation(object):
 
         if color is not None:
             color = color.split(',')
+            self.traci_calls += 1
             traci.vehicle.setColor(actor_id, color)
 
         self._sequential_id += 1
 
         return actor_id
 
-    @staticmethod
-    def destroy_actor(actor_id):
+    def destroy_actor(self, actor_id):
         """
         Destroys the given actor.
         """
+        self.traci_calls += 1
         traci.vehicle.remove(actor_id)
 
     def get_traffic_light_state(self, landmark_id):
@@ -494,6 +686,15 @@ class SumoSimulation(object):
         """
         return self.traffic_light_manager.get_state(landmark_id)
 
+    def get_changed_traffic_light_states(self):
+        """
+        Returns the traffic light state of the landmarks that changed in the last tick (all the
+        landmarks in the first tick).
+
+            :return: {landmark_id: state}
+        """
+        return self.traffic_light_manager.changed_states
+
     def switch_off_traffic_lights(self):
         """
         Switch off all traffic lights.
@@ -512,8 +713,10 @@ class SumoSimulation(object):
         loc_x, loc_y = transform.location.x, transform.location.y
         yaw = transform.rotation.yaw
 
+        self.traci_calls += 1
         traci.vehicle.moveToXY(vehicle_id, "", 0, loc_x, loc_y, angle=yaw, keepRoute=2)
         if signals is not None:
+            self.traci_calls += 1
             traci.vehicle.setSignals(vehicle_id, signals)
         return True
 
@@ -538,6 +741,12 @@ class SumoSimulation(object):
         self.spawned_actors = set(traci.simulation.getDepartedIDList())
         self.destroyed_actors = set(traci.simulation.getArrivedIDList())
 
+        # Traffic light calls since the last step (i.e., updates of the synchronized signals).
+        tl_calls = self.traffic_light_manager.traci_calls - self._tl_calls
+        self._tl_calls = self.traffic_light_manager.traci_calls
+        self.traci_calls += 3 + tl_calls
+        logging.debug('TraCI calls in this step: %d (traffic lights: %d)', 3 + tl_calls, tl_calls)
+
     @staticmethod
     def close():
         """
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the transports used to exchange frames between co-simulation processes. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+import time
+
+from .shm_transport import SharedMemoryTransport
+
+# ==================================================================================================
+# -- redis transports ------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class RedisGetTransport(object):
+    """
+    RedisGetTransport exchanges frames through a plain redis key (SET/GET). The reader always gets
+    the latest value of the key, whether it is new or not.
+    """
+    polling = True
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+
+    def publish(self, payload):
+        """
+        Publishes a new frame.
+        """
+        self.client.set(self.key, payload)
+
+    def receive(self, timeout=None):  # pylint: disable=unused-argument
+        """
+        Returns the list of received frames (oldest first). In this transport, the list contains the
+        current value of the key, or nothing if the key does not exist.
+        """
+        payload = self.client.get(self.key)
+        if payload is None:
+            return []
+        return [payload]
+
+    def close(self):
+        """
+        Closes the transport.
+        """
+
+
+class RedisStreamTransport(object):
+    """
+    RedisStreamTransport exchanges frames through a redis stream. The producer appends frames with
+    XADD (trimming the stream to approximately `maxlen` entries) and the reader blocks on XREAD
+    until new frames arrive, so every frame is received exactly once.
+    """
+    polling = False
+
+    _PAYLOAD_FIELD = b'payload'
+
+    def __init__(self, client, key, maxlen=100):
+        self.client = client
+        self.key = key
+        self.maxlen = maxlen
+
+        # Only the frames published after the reader starts are received.
+        self._last_id = None
+
+    def publish(self, payload):
+        """
+        Publishes a new frame.
+        """
+        self.client.xadd(self.key, {self._PAYLOAD_FIELD: payload},
+                         maxlen=self.maxlen,
+                         approximate=True)
+
+    def receive(self, timeout=None):
+        """
+        Returns the list of frames received since the last call (oldest first). Blocks up to
+        `timeout` seconds (forever if None) waiting for the first one.
+        """
+        if self._last_id is None:
+            entries = self.client.xrevrange(self.key, count=1)
+            self._last_id = entries[0][0] if entries else b'0-0'
+
+        block = 0 if timeout is None else max(1, int(timeout * 1000))
+        response = self.client.xread({self.key: self._last_id}, block=block)
+        if not response:
+            return []
+
+        _, entries = response[0]
+        self._last_id = entries[-1][0]
+        return [fields[self._PAYLOAD_FIELD] for _, fields in entries]
+
+    def close(self):
+        """
+        Closes the transport.
+        """
+
+
+class RedisPubSubTransport(object):
+    """
+    RedisPubSubTransport exchanges frames through a redis pub/sub channel. Frames published while
+    the reader is not subscribed are lost.
+    """
+    polling = False
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+
+        self._pubsub = None
+
+    def _subscribe(self):
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.key)
+
+    def publish(self, payload):
+        """
+        Publishes a new frame.
+        """
+        self.client.publish(self.key, payload)
+
+    def receive(self, timeout=None):
+        """
+        Returns the list of frames received since the last call (oldest first). Blocks up to
+        `timeout` seconds (forever if None) waiting for the first one.
+        """
+        if self._pubsub is None:
+            self._subscribe()
+
+        payloads = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not payloads:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            message = self._pubsub.get_message(timeout=remaining if remaining is not None else 1.0)
+            if message is not None and message['type'] == 'message':
+                payloads.append(message['data'])
+
+        # Drains the frames already buffered.
+        message = self._pubsub.get_message()
+        while message is not None:
+            if message['type'] == 'message':
+                payloads.append(message['data'])
+            message = self._pubsub.get_message()
+        return payloads
+
+    def close(self):
+        """
+        Closes the transport.
+        """
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+
+TRANSPORTS = {
+    'get': RedisGetTransport,
+    'stream': RedisStreamTransport,
+    'pubsub': RedisPubSubTransport,
+    'shm': SharedMemoryTransport,
+}
+
+# Transports that do not go through redis (the client is not used).
+LOCAL_TRANSPORTS = ('shm', )
+
+
+def create_transport(kind, client, key, **kwargs):
+    """
+    Returns a transport of the given kind ('get', 'stream', 'pubsub' or 'shm') for the given key.
+    Redis is the only option across hosts, 'shm' requires both processes in the same host.
+    """
+    if kind not in TRANSPORTS:
+        raise ValueError('Unknown transport {}'.format(kind))
+
+    logging.debug('Using %s transport for %s', kind, key)
+    if kind in LOCAL_TRANSPORTS:
+        return TRANSPORTS[kind](key, **kwargs)
+    return TRANSPORTS[kind](client, key, **kwargs)
+
+
+# ==================================================================================================
+# -- frame tracking --------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class FrameTracker(object):
+    """
+    FrameTracker keeps count of the frames received by a reader based on their frame ids, to tell
+    new frames from repeated (duplicated) or late (stale) ones and to detect dropped frames.
+
+    The counters are:
+
+        * received: frames received.
+        * new: frames newer than the previous ones (or without frame id).
+        * applied: new frames actually applied by the reader (the rest were superseded by a newer
+          frame received at the same time).
+        * duplicated: frames with the same id as the last new frame.
+        * stale: frames older than the last new frame.
+        * dropped: frames never received (gaps in the frame ids).
+        * unstamped: frames without frame id (legacy producers).
+    """
+    def __init__(self, restart_window=100):
+        # A frame id that goes back more than `restart_window` frames means the producer restarted.
+        self.restart_window = restart_window
+
+        self.last_frame_id = None
+        self.last_sim_time = None
+
+        self.received = 0
+        self.new = 0
+        self.applied = 0
+        self.duplicated = 0
+        self.stale = 0
+        self.dropped = 0
+        self.unstamped = 0
+
+        # Simulation time between consecutive new frames.
+        self._sim_steps = 0
+        self._sim_step_sum = 0.0
+        self.max_sim_step = 0.0
+
+    def update(self, frame_id, sim_time=None):
+        """
+        Registers a received frame.
+
+            :return: True if the frame is new. Otherwise (duplicated or stale), False.
+        """
+        self.received += 1
+        if frame_id is None:
+            self.unstamped += 1
+            self.new += 1
+            return True
+
+        last_frame_id = self.last_frame_id
+        if last_frame_id is not None:
+            if frame_id == last_frame_id:
+                self.duplicated += 1
+                return False
+
+            if frame_id < last_frame_id:
+                if last_frame_id - frame_id <= self.restart_window:
+                    self.stale += 1
+                    return False
+                logging.info('Frame id went back from %s to %s, assuming producer restart',
+                             last_frame_id, frame_id)
+            else:
+                self.dropped += frame_id - last_frame_id - 1
+
+                if sim_time is not None and self.last_sim_time is not None:
+                    sim_step = sim_time - self.last_sim_time
+                    self._sim_steps += 1
+                    self._sim_step_sum += sim_step
+                    self.max_sim_step = max(self.max_sim_step, sim_step)
+
+        self.last_frame_id = frame_id
+        self.last_sim_time = sim_time
+        self.new += 1
+        return True
+
+    @property
+    def superseded(self):
+        return self.new - self.applied
+
+    @property
+    def mean_sim_step(self):
+        if self._sim_steps == 0:
+            return None
+        return self._sim_step_sum / self._sim_steps
+
+    def counters(self):
+        """
+        Returns the current value of the counters.
+        """
+        return {
+            'received': self.received,
+            'new': self.new,
+            'applied': self.applied,
+            'superseded': self.superseded,
+            'duplicated': self.duplicated,
+            'stale': self.stale,
+            'dropped': self.dropped,
+            'unstamped': self.unstamped,
+            'last_frame_id': self.last_frame_id,
+            'last_sim_time': self.last_sim_time,
+            'mean_sim_step': self.mean_sim_step,
+            'max_sim_step': self.max_sim_step,
+        }
+
+    def __str__(self):
+        return ', '.join('{}: {}'.format(name, value) for name, value in self.counters().items())
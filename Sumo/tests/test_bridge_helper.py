@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Tests of the sumo <-> carla bridge helper. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import numpy as np
+import pytest
+
+carla = pytest.importorskip('carla')
+pytest.importorskip('traci')
+pytest.importorskip('lxml')  # Imported by sumo_integration.sumo_simulation.
+
+from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+from sumo_integration.sumo_simulation import SumoVehSignal  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- fixtures --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+@pytest.fixture(params=range(20))
+def actors(request, monkeypatch):
+    """
+    Returns random (locations, rotations, extents) of a fleet, N x 3 arrays, and a random net
+    offset. Includes the corner cases of the angles (0, +-90, +-180, 360). The values are float32,
+    as in the carla transforms.
+    """
+    rng = np.random.default_rng(request.param)
+    monkeypatch.setattr(BridgeHelper, 'offset', tuple(rng.uniform(-500.0, 500.0, 2)))
+
+    size = 50
+    locations = rng.uniform(-1e4, 1e4, (size, 3))
+    rotations = rng.uniform(-360.0, 360.0, (size, 3))
+    rotations[:10, 1] = [0.0, 90.0, -90.0, 180.0, -180.0, 360.0, 270.0, 45.0, -45.0, 1e-9]
+    extents = rng.uniform(0.0, 10.0, (size, 3))
+    extents[0] = 0.0
+    return _float32(locations), _float32(rotations), _float32(extents)
+
+
+def _float32(array):
+    return np.asarray(array, dtype=np.float32).astype(np.float64)
+
+
+def _transform(location, rotation):
+    return carla.Transform(carla.Location(*location), carla.Rotation(*rotation))
+
+
+def _assert_float32_close(actual, expected):
+    # The scalar results are stored in float32 carla transforms: a few float32 ulps apart at most.
+    np.testing.assert_allclose(_float32(actual), expected, rtol=1e-6, atol=1e-4)
+
+
+def _as_arrays(transforms):
+    locations = [(t.location.x, t.location.y, t.location.z) for t in transforms]
+    rotations = [(t.rotation.pitch, t.rotation.yaw, t.rotation.roll) for t in transforms]
+    return np.array(locations), np.array(rotations)
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_carla_transforms_match_scalar(actors):
+    locations, rotations, extents = actors
+    expected = _as_arrays([
+        BridgeHelper.get_carla_transform(_transform(l, r), carla.Vector3D(*e))
+        for l, r, e in zip(locations.tolist(), rotations.tolist(), extents.tolist())
+    ])
+
+    out_locations, out_rotations = BridgeHelper.get_carla_transforms(locations, rotations, extents)
+    assert out_locations.dtype == np.float64 and out_locations.shape == locations.shape
+    _assert_float32_close(out_locations, expected[0])
+    _assert_float32_close(out_rotations, expected[1])
+
+
+def test_sumo_transforms_match_scalar(actors):
+    locations, rotations, extents = actors
+    expected = _as_arrays([
+        BridgeHelper.get_sumo_transform(_transform(l, r), carla.Vector3D(*e))
+        for l, r, e in zip(locations.tolist(), rotations.tolist(), extents.tolist())
+    ])
+
+    out_locations, out_rotations = BridgeHelper.get_sumo_transforms(locations, rotations, extents)
+    assert out_locations.dtype == np.float64 and out_locations.shape == locations.shape
+    _assert_float32_close(out_locations, expected[0])
+    _assert_float32_close(out_rotations, expected[1])
+
+
+def test_transforms_do_not_modify_inputs(actors):
+    locations, rotations, extents = actors
+    inputs = (locations.copy(), rotations.copy(), extents.copy())
+    BridgeHelper.get_carla_transforms(locations, rotations, extents)
+    BridgeHelper.get_sumo_transforms(locations, rotations, extents)
+    for array, copy in zip((locations, rotations, extents), inputs):
+        np.testing.assert_array_equal(array, copy)
+
+
+def test_empty_fleet():
+    for get_transforms in (BridgeHelper.get_carla_transforms, BridgeHelper.get_sumo_transforms):
+        locations, rotations = get_transforms([], [], [])
+        assert locations.shape == (0, 3) and rotations.shape == (0, 3)
+
+
+# ==================================================================================================
+# -- lights ----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Current light states the conversions start from: none, all and random ones.
+_CURRENT_LIGHTS = [0, (1 << 32) - 1] + np.random.default_rng(0).integers(0, 1 << 32, 6).tolist()
+
+
+@pytest.mark.parametrize('current_carla_lights', _CURRENT_LIGHTS)
+def test_carla_lights_table_matches_bit_by_bit(current_carla_lights):
+    # Every sumo signals state (11 bits), plus the emergency signals the conversion ignores.
+    for sumo_lights in range(1 << 14):
+        # pylint: disable=protected-access
+        expected = BridgeHelper._compute_carla_lights_state(current_carla_lights, sumo_lights)
+        assert BridgeHelper.get_carla_lights_state(current_carla_lights, sumo_lights) == expected
+
+
+@pytest.mark.parametrize('current_sumo_lights', _CURRENT_LIGHTS)
+def test_sumo_lights_table_matches_bit_by_bit(current_sumo_lights):
+    # Every carla light state (8 bits), plus the interior and special lights the conversion ignores.
+    for carla_lights in range(1 << 11):
+        # pylint: disable=protected-access
+        expected = BridgeHelper._compute_sumo_lights_state(current_sumo_lights, carla_lights)
+        assert BridgeHelper.get_sumo_lights_state(current_sumo_lights, carla_lights) == expected
+
+
+def test_sumo_emergency_blinker_is_stable():
+    both_blinkers = carla.VehicleLightState.LeftBlinker | carla.VehicleLightState.RightBlinker
+    sumo_lights = 0
+    for _ in range(3):
+        sumo_lights = BridgeHelper.get_sumo_lights_state(sumo_lights, both_blinkers)
+        assert sumo_lights & SumoVehSignal.BLINKER_EMERGENCY
+
+    sumo_lights = BridgeHelper.get_sumo_lights_state(sumo_lights,
+                                                     carla.VehicleLightState.LeftBlinker)
+    assert not sumo_lights & SumoVehSignal.BLINKER_EMERGENCY
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Tests of the carla actors management, against a fake carla world. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+
+import pytest
+
+pytest.importorskip('carla')
+
+from sumo_integration import carla_simulation  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- fake carla world ------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class _Actor(object):
+    def __init__(self, actor_id, type_id):
+        self.id = actor_id
+        self.type_id = type_id
+
+
+class _ActorList(list):
+    def filter(self, pattern):
+        prefix = pattern.rstrip('*')
+        return _ActorList(actor for actor in self if actor.type_id.startswith(prefix))
+
+
+class _Attribute(object):
+    def __init__(self, recommended_values):
+        self.recommended_values = recommended_values
+
+
+class _Blueprint(object):
+    def __init__(self, blueprint_id, attributes):
+        self.id = blueprint_id
+        self.attributes = dict(attributes)
+
+    def has_attribute(self, name):
+        return name in self.attributes
+
+    def get_attribute(self, name):
+        return _Attribute(['0,0,0', '255,255,255'] if name == 'color' else ['0'])
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+
+class _BlueprintLibrary(list):
+    def find(self, blueprint_id):
+        # As in carla, the blueprint found is a copy.
+        blueprint = next(blueprint for blueprint in self if blueprint.id == blueprint_id)
+        return _Blueprint(blueprint.id, blueprint.attributes)
+
+
+class _SpawnActor(object):
+    def __init__(self, blueprint, transform):
+        self.blueprint = blueprint
+        self.transform = transform
+
+    def then(self, _):
+        return self
+
+
+class _Command(object):
+    SpawnActor = _SpawnActor
+    FutureActor = None
+
+    @staticmethod
+    def SetSimulatePhysics(*_):  # pylint: disable=invalid-name
+        return None
+
+
+_Response = collections.namedtuple('_Response', ['actor_id', 'error'])
+
+
+class _Snapshot(object):
+    def __init__(self, actor_ids):
+        self._actor_ids = set(actor_ids)
+
+    def __len__(self):
+        return len(self._actor_ids)
+
+    def has_actor(self, actor_id):
+        return actor_id in self._actor_ids
+
+
+class _Map(object):
+    def get_all_landmarks_of_type(self, _):
+        return []
+
+
+class _World(object):
+    def __init__(self):
+        self.actors = {}  # {actor_id: type_id}
+        self.attributes = {}  # {actor_id: {name: value}}, blueprint attributes when spawned.
+        self.listings = 0
+        self.blueprint_library = _BlueprintLibrary([
+            _Blueprint('vehicle.audi.a2', {'color': '0,0,0', 'role_name': ''}),
+        ])
+
+    def spawn(self, actor_id, type_id):
+        self.actors[actor_id] = type_id
+
+    def get_blueprint_library(self):
+        return self.blueprint_library
+
+    def get_map(self):
+        return _Map()
+
+    def get_actors(self):
+        self.listings += 1
+        return _ActorList(_Actor(i, type_id) for i, type_id in self.actors.items())
+
+    def get_snapshot(self):
+        return _Snapshot(self.actors)
+
+    def tick(self):
+        pass
+
+
+class _Client(object):
+    world = None
+
+    def __init__(self, host, port):
+        pass
+
+    def set_timeout(self, timeout):
+        pass
+
+    def get_world(self):
+        return self.world
+
+    def apply_batch_sync(self, batch, _):
+        # The blueprints are sent when the batch is applied, as in carla.
+        responses = []
+        for command in batch:
+            actor_id = max(self.world.actors) + 1
+            self.world.spawn(actor_id, command.blueprint.id)
+            self.world.attributes[actor_id] = dict(command.blueprint.attributes)
+            responses.append(_Response(actor_id, ''))
+        return responses
+
+
+@pytest.fixture
+def world(monkeypatch):
+    fake_world = _World()
+    fake_world.spawn(1, 'spectator')
+    fake_world.spawn(2, 'traffic.traffic_light')
+    fake_world.spawn(3, 'vehicle.audi.a2')
+    monkeypatch.setattr(_Client, 'world', fake_world)
+    monkeypatch.setattr(carla_simulation.carla, 'Client', _Client, raising=False)
+    monkeypatch.setattr(carla_simulation.carla, 'command', _Command, raising=False)
+    return fake_world
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_reconcile_counts_only_vehicles(world):
+    simulation = carla_simulation.CarlaSimulation('localhost', 2000, 0.05, reconcile_interval=100)
+    simulation.tick()
+    assert simulation.spawned_actors == {3}
+    assert world.listings == 1
+
+    # A new sensor is listed once, then known not to be a vehicle.
+    world.spawn(4, 'sensor.camera.rgb')
+    simulation.tick()
+    simulation.tick()
+    assert simulation.spawned_actors == set()
+    assert world.listings == 2
+
+    # Actors that are not vehicles leaving the world do not trigger a sweep.
+    del world.actors[4]
+    simulation.tick()
+    assert world.listings == 2
+
+    # A vehicle spawned by another client does.
+    world.spawn(5, 'vehicle.tesla.model3')
+    simulation.tick()
+    assert simulation.spawned_actors == {5}
+    assert world.listings == 3
+
+    # And a vehicle destroyed by another client.
+    del world.actors[3]
+    simulation.tick()
+    assert simulation.destroyed_actors == {3}
+    assert world.listings == 4
+
+
+def test_spawns_of_the_same_blueprint_are_independent(world, monkeypatch):
+    pytest.importorskip('traci')
+    pytest.importorskip('lxml')
+    from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=import-outside-toplevel
+
+    simulation = carla_simulation.CarlaSimulation('localhost', 2000, 0.05)
+    monkeypatch.setattr(BridgeHelper, 'blueprint_library', simulation.blueprint_library)
+
+    # Two vehicles of the same type spawned in the same frame, with their own color.
+    sumo_actor = collections.namedtuple('SumoActor', ['type_id', 'color', 'vclass'])
+    transform = carla_simulation.carla.Transform(carla_simulation.carla.Location(0.0, 0.0, 0.0))
+    for key, color in (('red', (255, 0, 0)), ('blue', (0, 0, 255))):
+        blueprint = BridgeHelper.get_carla_blueprint(sumo_actor('vehicle.audi.a2', color, None),
+                                                     sync_color=True)
+        simulation.request_spawn(key, blueprint, transform)
+    spawned = simulation.apply_actor_requests()
+
+    assert world.attributes[spawned['red']]['color'] == '255,0,0'
+    assert world.attributes[spawned['blue']]['color'] == '0,0,255'
+    assert world.attributes[spawned['red']]['role_name'] == 'sumo_driver'
+    assert simulation.blueprint_library[0].attributes['color'] == '0,0,0'
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Tests of the interest management, against brute-force distance filters. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import numpy as np
+import pytest
+
+from sumo_integration.interest_manager import GridIndex, InterestManager
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def _brute_force(positions, center, radius):
+    deltas = np.asarray(positions, dtype=np.float64)[:, :2] - (center[0], center[1])
+    return set(np.flatnonzero(np.einsum('ij,ij->i', deltas, deltas) <= radius * radius).tolist())
+
+
+def _query(index, center, radius):
+    indices, distances = index.query(center, radius)
+    assert len(indices) == len(set(indices.tolist()))
+    return set(indices.tolist()), distances
+
+
+# ==================================================================================================
+# -- grid index ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('cell_size', [1.0, 7.5, 50.0, 1000.0])
+def test_grid_query_matches_brute_force(seed, cell_size):
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(-300.0, 300.0, (500, 3))
+    index = GridIndex(cell_size)
+    index.build(positions)
+
+    for center in rng.uniform(-350.0, 350.0, (20, 2)).tolist():
+        for radius in (0.0, 1.0, cell_size, 60.0):
+            indices, distances = _query(index, center, radius)
+            assert indices == _brute_force(positions, center, radius)
+
+            # The squared distances are returned in the order of the indices.
+            expected = np.sum((positions[sorted(indices), :2] - center)**2, axis=1)
+            assert sorted(distances.tolist()) == pytest.approx(sorted(expected.tolist()))
+
+
+def test_grid_query_on_cell_borders():
+    # Positions on the borders of the cells, negative coordinates included.
+    cell_size = 10.0
+    coordinates = [-20.0, -10.0, -1e-9, 0.0, 10.0, 20.0]
+    positions = np.array([(x, y) for x in coordinates for y in coordinates])
+    index = GridIndex(cell_size)
+    index.build(positions)
+
+    for center in [(0.0, 0.0), (-10.0, -10.0), (10.0, -20.0), (-5.0, 5.0)]:
+        for radius in (0.0, 5.0, 10.0, 10.0 + 1e-9, 20.0):
+            indices, _ = _query(index, center, radius)
+            assert indices == _brute_force(positions, center, radius)
+
+
+def test_grid_query_with_radius_zero():
+    index = GridIndex(5.0)
+    index.build(np.array([(-5.0, -5.0), (-5.0, -5.0 + 1e-6), (3.0, 4.0)]))
+    assert _query(index, (-5.0, -5.0), 0.0)[0] == {0}
+    assert _query(index, (3.0, 4.0), 0.0)[0] == {2}
+    assert _query(index, (0.0, 0.0), 0.0)[0] == set()
+
+
+def test_grid_query_without_positions():
+    index = GridIndex(10.0)
+    indices, distances = index.query((0.0, 0.0), 100.0)
+    assert len(indices) == 0 and len(distances) == 0
+
+    index.build(np.empty((0, 3)))
+    indices, distances = index.query((0.0, 0.0), 100.0)
+    assert len(indices) == 0 and len(distances) == 0
+
+
+# ==================================================================================================
+# -- interest manager ------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_invalid_area_of_interest():
+    with pytest.raises(ValueError):
+        InterestManager(0.0)
+    with pytest.raises(ValueError):
+        InterestManager(10.0, hysteresis=-1.0)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_interest_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    manager = InterestManager(50.0, hysteresis=0.0)
+    actor_ids = ['veh_{}'.format(i) for i in range(300)]
+    locations = rng.uniform(-200.0, 200.0, (300, 3))
+    centers = [(-20.0, 30.0), (120.0, -150.0)]
+
+    expected = _brute_force(locations, centers[0], 50.0) | \
+        _brute_force(locations, centers[1], 50.0)
+    interest = manager.update(actor_ids, locations, centers)
+    assert interest == {actor_ids[i] for i in expected}
+    assert manager.saved == len(actor_ids) - len(interest)
+
+
+def test_all_vehicles_without_interest_points():
+    manager = InterestManager(10.0)
+    actor_ids = ['a', 'b']
+    assert manager.update(actor_ids, np.array([(0.0, 0.0), (1e4, 1e4)]), []) == {'a', 'b'}
+
+
+def test_empty_fleet():
+    manager = InterestManager(10.0)
+    assert manager.update([], np.empty((0, 3)), [(0.0, 0.0)]) == set()
+    assert manager.saved == 0
+
+
+def test_hysteresis():
+    manager = InterestManager(10.0, hysteresis=5.0)
+    center = [(0.0, 0.0)]
+
+    def update(distance):
+        return manager.update(['veh'], np.array([(distance, 0.0)]), center)
+
+    # Entering the hysteresis band from outside does not spawn the vehicle.
+    assert update(20.0) == set()
+    assert update(12.0) == set()
+    assert manager.entered == 0
+
+    # Within the radius it enters, and within the band it stays.
+    assert update(9.0) == {'veh'}
+    assert update(12.0) == {'veh'}
+    assert update(14.9) == {'veh'}
+    assert update(11.0) == {'veh'}
+    assert (manager.entered, manager.left) == (1, 0)
+
+    # Beyond radius + hysteresis it leaves, and back in the band it is not spawned again.
+    assert update(15.1) == set()
+    assert update(12.0) == set()
+    assert (manager.entered, manager.left) == (1, 1)
+
+
+def test_vehicles_gone_are_neither_entered_nor_left():
+    manager = InterestManager(10.0)
+    manager.update(['a', 'b'], np.array([(0.0, 0.0), (1.0, 0.0)]), [(0.0, 0.0)])
+    manager.update(['a'], np.array([(0.0, 0.0)]), [(0.0, 0.0)])
+    assert (manager.entered, manager.left) == (2, 0)
+    assert manager.interest == {'a'}
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Tests of the cache of the parsed sumo nets. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import os
+import pickle
+import shutil
+import stat
+
+import pytest
+
+pytest.importorskip('sumolib')
+
+from sumo_integration import net_cache  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- fixtures --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+_NET = """<net version="1.9" junctionCornerDetail="5" limitTurnSpeed="5.50">
+    <location netOffset="0.00,0.00" convBoundary="0.00,0.00,100.00,0.00"
+              origBoundary="0.00,0.00,100.00,0.00" projParameter="!"/>
+    <edge id="e0" from="a" to="b" priority="1">
+        <lane id="e0_0" index="0" speed="13.89" length="100.00" shape="0.00,-1.60 100.00,-1.60"/>
+    </edge>
+    <junction id="a" type="dead_end" x="0.00" y="0.00" incLanes="" intLanes=""
+              shape="0.00,0.00 0.00,-3.20"/>
+    <junction id="b" type="dead_end" x="100.00" y="0.00" incLanes="e0_0" intLanes=""
+              shape="100.00,-3.20 100.00,0.00"/>
+</net>
+"""
+
+
+@pytest.fixture
+def net_file(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'user_cache'))
+    path = tmp_path / 'net' / 'test.net.xml'
+    path.parent.mkdir()
+    path.write_text(_NET)
+    return str(path)
+
+
+@pytest.fixture
+def town_file(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'user_cache'))
+    path = tmp_path / 'net' / 'Town01.net.xml'
+    path.parent.mkdir()
+    shutil.copy(os.path.join(os.path.dirname(__file__), '..', 'examples', 'net', 'Town01.net.xml'),
+                str(path))
+    return str(path)
+
+
+def _describe(net):
+    """
+    Returns what the callers read from the net: location, nodes, edges, lanes, connections and
+    traffic lights.
+    """
+    description = [net.getVersion(), net.getLocationOffset(), net.getBoundary()]
+    for node in net.getNodes():
+        description.append((node.getID(), node.getType(), node.getCoord3D(), node.getShape(),
+                            [edge.getID() for edge in node.getIncoming()]))
+    for edge in net.getEdges():
+        description.append((edge.getID(), edge.getFromNode().getID(), edge.getToNode().getID(),
+                            edge.getPriority(), edge.getType(), edge.getShape(True),
+                            edge.getLength(), edge.getTLS() and edge.getTLS().getID()))
+        for lane in edge.getLanes():
+            description.append((lane.getID(), lane.getSpeed(), lane.getWidth(), lane.getShape(),
+                                sorted(lane.getPermissions())))
+            for connection in lane.getOutgoing():
+                description.append((connection.getToLane().getID(), connection.getDirection(),
+                                     connection.getTLSID(), connection.getTLLinkIndex(),
+                                     connection.getState(), connection.getViaLaneID()))
+    for tls in net.getTrafficLights():
+        description.append((tls.getID(), [(in_lane.getID(), out_lane.getID(), link)
+                                          for in_lane, out_lane, link in tls.getConnections()]))
+        for program_id, program in tls.getPrograms().items():
+            description.append((program_id, program.getType(), program.getOffset(),
+                                [repr(phase) for phase in program.getPhases()]))
+    return description
+
+
+def _cache_files(folder):
+    if not os.path.isdir(folder):
+        return []
+    return [name for name in os.listdir(folder) if name.endswith('.pickle')]
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_cached_net_is_reused(net_file, monkeypatch):
+    net = net_cache.read_net(net_file)
+    cache_dir = os.path.join(os.path.dirname(net_file), '__netcache__')
+    assert len(_cache_files(cache_dir)) == 1
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) & 0o077 == 0
+
+    # The second read does not parse the net file.
+    monkeypatch.setattr(net_cache.sumolib.net, 'readNet', None)
+    cached_net = net_cache.read_net(net_file)
+    assert [edge.getID() for edge in cached_net.getEdges()] == \
+        [edge.getID() for edge in net.getEdges()]
+    assert cached_net.getEdge('e0').getLength() == pytest.approx(100.0)
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='no file ownership')
+def test_cache_writable_by_others_is_ignored(net_file):
+    net_cache.read_net(net_file)
+    cache_dir = os.path.join(os.path.dirname(net_file), '__netcache__')
+    cache_file = os.path.join(cache_dir, _cache_files(cache_dir)[0])
+
+    # A cache that could have been planted by another user is never unpickled.
+    with open(cache_file, 'wb') as f:
+        f.write(b'not a pickle')
+    os.chmod(cache_file, 0o666)
+    assert net_cache._load(cache_file) is None  # pylint: disable=protected-access
+
+    os.chmod(cache_file, 0o600)
+    os.chmod(cache_dir, 0o777)
+    assert net_cache._load(cache_file) is None  # pylint: disable=protected-access
+
+    # The net is parsed instead.
+    assert net_cache.read_net(net_file).getEdge('e0') is not None
+
+
+def test_unwritable_net_folder_uses_user_cache(net_file, tmp_path, monkeypatch):
+    net_dir = os.path.dirname(net_file)
+    dump = net_cache._dump  # pylint: disable=protected-access
+
+    # The folder of the net file is not writable.
+    def _dump(net, cache_file):
+        if cache_file.startswith(net_dir):
+            return False
+        return dump(net, cache_file)
+
+    monkeypatch.setattr(net_cache, '_dump', _dump)
+    net_cache.read_net(net_file)
+
+    user_cache_dir = str(tmp_path / 'user_cache' / 'sumo_netcache')
+    assert len(_cache_files(user_cache_dir)) == 1
+    assert stat.S_IMODE(os.stat(user_cache_dir).st_mode) == 0o700
+    assert not os.path.exists(os.path.join(net_dir, '__netcache__'))
+
+
+@pytest.mark.parametrize('options', [{}, {'withPrograms': True}, {'withInternal': True}])
+def test_cached_net_matches_parsed_net(town_file, monkeypatch, options):
+    net = net_cache.read_net(town_file, **options)
+
+    monkeypatch.setattr(net_cache.sumolib.net, 'readNet', None)
+    cached_net = net_cache.read_net(town_file, **options)
+    assert cached_net is not net
+    assert _describe(cached_net) == _describe(net)
+
+    # The allowed edges of the sumo simulation.
+    def allowed_edges(sumo_net, vclass):
+        return [(edge.getID(), edge.allows(vclass),
+                 [e.getID() for e in edge.getAllowedOutgoing(vclass)])
+                for edge in sumo_net.getEdges()]
+
+    for vclass in ('passenger', 'pedestrian'):
+        assert allowed_edges(cached_net, vclass) == allowed_edges(net, vclass)
+    if options.get('withPrograms'):
+        assert all(tls.getPrograms() for tls in cached_net.getTrafficLights())
+
+
+def test_unchanged_net_file_is_not_hashed(net_file, monkeypatch):
+    net_cache.read_net(net_file)
+    digest = net_cache._get_file_digest  # pylint: disable=protected-access
+
+    # Same path, size and modification time: the hash of the contents is reused.
+    def _get_file_digest(_):
+        raise AssertionError('net file hashed')
+
+    monkeypatch.setattr(net_cache, '_get_file_digest', _get_file_digest)
+    assert net_cache.read_net(net_file).getEdge('e0') is not None
+
+    # The net file changes.
+    with open(net_file, 'a') as f:
+        f.write('\n')
+    hashed = []
+    monkeypatch.setattr(net_cache, '_get_file_digest',
+                        lambda path: hashed.append(path) or digest(path))
+    assert net_cache.read_net(net_file).getEdge('e0') is not None
+    assert hashed == [net_file]
+
+
+def test_cache_with_objects_is_ignored(net_file):
+    net_cache.read_net(net_file)
+    cache_dir = os.path.join(os.path.dirname(net_file), '__netcache__')
+    cache_file = os.path.join(cache_dir, _cache_files(cache_dir)[0])
+
+    # The cache files only contain plain data, anything else is never unpickled.
+    with open(cache_file, 'wb') as f:
+        pickle.dump(os.stat_result((0,) * 10), f)
+    assert net_cache._load(cache_file) is None  # pylint: disable=protected-access
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+The sumo and vissim integrations are standalone scripts, so the modules they share are copied in
+both packages. These tests fail as soon as the copies drift apart.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import filecmp
+import os
+
+import pytest
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+_ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+
+# Modules copied in both integrations, a change in one of them has to be copied to the other.
+SHARED_MODULES = [
+    'actor_cache.py',
+    'scheduler.py',
+]
+
+
+@pytest.mark.parametrize('module', SHARED_MODULES)
+def test_shared_module_copies_are_identical(module):
+    sumo_module = os.path.join(_ROOT, 'Sumo', 'sumo_integration', module)
+    vissim_module = os.path.join(_ROOT, 'PTV-Vissim', 'vissim_integration', module)
+    assert filecmp.cmp(sumo_module, vissim_module, shallow=False), \
+        '{} differs between sumo_integration and vissim_integration'.format(module)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Tests of the resync of delta encoded frames. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import pytest
+
+from sumo_integration.snapshot_delta import (RESYNC_REQUEST_KEY, SnapshotDeltaDecoder,
+                                             SnapshotDeltaEncoder, SnapshotResyncError,
+                                             poll_resync_request)
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def _vehicles(frame_id, count=5):
+    return {
+        'veh{}'.format(i): {
+            'location': {'x': i + 0.5 * frame_id, 'y': 2.0 * i, 'z': 0.0},
+            'rotation': {'x': 0.0, 'y': 0.0, 'z': 90.0},
+            'extent': {'x': 2.0, 'y': 1.0, 'z': 0.8},
+            'type_id': 'vehicle.audi.a2',
+            'vclass': 'passenger',
+        }
+        for i in range(count)
+    }
+
+
+def test_resync_request_forces_keyframe():
+    fakeredis = pytest.importorskip('fakeredis')
+    client = fakeredis.FakeRedis()
+
+    encoder = SnapshotDeltaEncoder(keyframe_interval=1000)
+    decoder = SnapshotDeltaDecoder()
+
+    assert not poll_resync_request(client, encoder)
+    decoder.decode(encoder.encode(_vehicles(0), frame_id=0))
+    assert decoder.synchronized
+
+    # The reader misses a frame and asks for a keyframe.
+    encoder.encode(_vehicles(1), frame_id=1)
+    with pytest.raises(SnapshotResyncError):
+        decoder.decode(encoder.encode(_vehicles(2), frame_id=2))
+    client.set(RESYNC_REQUEST_KEY, 1)
+
+    # The producer clears the request and the next frame resynchronizes the reader.
+    assert poll_resync_request(client, encoder)
+    assert client.get(RESYNC_REQUEST_KEY) is None
+    snapshot = decoder.decode(encoder.encode(_vehicles(3), frame_id=3))
+    assert decoder.synchronized
+    assert snapshot.frame_id == 3
+    assert snapshot.locations[1, 0] == pytest.approx(1.0 + 0.5 * 3)
+
+    # Without new requests, the producer keeps sending deltas.
+    assert not poll_resync_request(client, encoder)
+    assert decoder.decode(encoder.encode(_vehicles(4), frame_id=4)).frame_id == 4
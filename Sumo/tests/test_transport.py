@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Conformance tests of the frame transports: every transport runs the same cases. The redis
+transports run against fakeredis.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import asyncio
+import os
+import threading
+import uuid
+
+import pytest
+
+from sumo_integration.async_transport import close_async_client
+from sumo_integration.shm_transport import SharedMemoryTransport
+from sumo_integration.transport import TRANSPORTS, create_transport
+
+# ==================================================================================================
+# -- fixtures --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+@pytest.fixture(params=sorted(TRANSPORTS))
+def transports(request):
+    """
+    Returns a (writer, reader) pair of the given transport kind, sharing the same key.
+    """
+    key = 'test_transport_{}'.format(uuid.uuid4().hex)
+    if request.param == 'shm':
+        writer_client = reader_client = None
+    else:
+        fakeredis = pytest.importorskip('fakeredis')
+        server = fakeredis.FakeServer()
+        writer_client = fakeredis.FakeRedis(server=server)
+        reader_client = fakeredis.FakeRedis(server=server)
+
+    writer = create_transport(request.param, writer_client, key)
+    reader = create_transport(request.param, reader_client, key)
+
+    # Subscribes the reader (pubsub) and skips the frames published before (stream).
+    reader.receive(timeout=0.01)
+
+    yield writer, reader
+
+    reader.close()
+    writer.close()
+
+
+# ==================================================================================================
+# -- conformance cases -----------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_receive_without_frames(transports):
+    _, reader = transports
+    assert reader.receive(timeout=0.01) == []
+
+
+def test_receive_latest_frame(transports):
+    writer, reader = transports
+    for i in range(3):
+        writer.publish('frame {}'.format(i).encode())
+
+    payloads = reader.receive(timeout=1.0)
+    assert payloads
+    assert bytes(payloads[-1]) == b'frame 2'
+
+
+def test_received_frame_survives_overwrite(transports):
+    writer, reader = transports
+    writer.publish(b'A' * 64)
+    payload = reader.receive(timeout=1.0)[-1]
+
+    # The shared memory transport double buffers, two publishes overwrite the slot of the frame.
+    writer.publish(b'B' * 64)
+    writer.publish(b'C' * 64)
+    assert bytes(payload) == b'A' * 64
+    assert bytes(reader.receive(timeout=1.0)[-1]) == b'C' * 64
+
+
+def test_frames_are_not_torn(transports):
+    writer, reader = transports
+    frames = 500
+    done = threading.Event()
+
+    def publish():
+        for i in range(1, frames + 1):
+            writer.publish(bytes([i % 256]) * (100 + i % 50))
+        done.set()
+
+    thread = threading.Thread(target=publish)
+    thread.start()
+    try:
+        received = 0
+        while not done.is_set() or received == 0:
+            for payload in reader.receive(timeout=0.05):
+                payload = bytes(payload)
+                i = payload[0]
+                assert payload == bytes([i]) * len(payload)
+                received += 1
+    finally:
+        thread.join()
+
+    assert received > 0
+
+
+# ==================================================================================================
+# -- shared memory ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class _InterleavedView(object):
+    """
+    Wraps the memoryview of a reader so the writer publishes right before the first payload read.
+    """
+    def __init__(self, view, on_read):
+        self._view = view
+        self._on_read = on_read
+
+    def __getitem__(self, key):
+        if self._on_read is not None:
+            on_read, self._on_read = self._on_read, None
+            on_read()
+        return self._view[key]
+
+    def __getattr__(self, name):
+        return getattr(self._view, name)
+
+
+def test_shm_torn_read_is_retried():
+    key = 'test_transport_{}'.format(uuid.uuid4().hex)
+    writer = SharedMemoryTransport(key)
+    reader = SharedMemoryTransport(key)
+    try:
+        writer.publish(b'A' * 64)
+        assert reader.receive(timeout=1.0) == [b'A' * 64]
+        writer.publish(b'B' * 48)
+
+        # The slot being read is refilled with a shorter frame in the middle of the read.
+        def overwrite():
+            writer.publish(b'C' * 32)
+            writer.publish(b'D' * 16)
+
+        reader._view = _InterleavedView(reader._view, overwrite)  # pylint: disable=protected-access
+        assert reader.receive(timeout=1.0) == [b'D' * 16]
+    finally:
+        reader.close()
+        writer.close()
+
+    assert not os.path.exists(writer.path)
+
+
+# ==================================================================================================
+# -- asyncio ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class _OldAsyncClient(object):
+    """
+    redis.asyncio client of redis-py < 5.0.1, without aclose().
+    """
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_close_async_client_without_aclose():
+    client = _OldAsyncClient()
+    asyncio.run(close_async_client(client))
+    assert client.closed
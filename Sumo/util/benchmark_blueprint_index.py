@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to benchmark the blueprint resolution of an episode start (e.g., 300 vehicles spawned at
+once) with library scans vs the BridgeHelper blueprint index.
+
+Requires a running carla server.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import glob
+import os
+import random
+import sys
+import timeit
+
+# ==================================================================================================
+# -- find carla module -----------------------------------------------------------------------------
+# ==================================================================================================
+
+try:
+    sys.path.append(
+        glob.glob('../../../PythonAPI/carla/dist/carla-*%d.%d-%s.egg' %
+                  (sys.version_info.major, sys.version_info.minor,
+                   'win-amd64' if os.name == 'nt' else 'linux-x86_64'))[0])
+except IndexError:
+    pass
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import carla  # pylint: disable=import-error, wrong-import-position
+
+from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def resolve_with_scans(type_id, vclass):
+    """
+    Previous resolution: list of ids and filter for known blueprints, library scan by vclass for
+    the rest.
+    """
+    blueprint_library = BridgeHelper.blueprint_library
+    if type_id in [bp.id for bp in blueprint_library]:
+        return blueprint_library.filter(type_id)[0]
+
+    blueprints = []
+    for blueprint in blueprint_library:
+        if blueprint.id in BridgeHelper._VTYPES and \
+           BridgeHelper._VTYPES[blueprint.id]['vClass'] == vclass:
+            blueprints.append(blueprint)
+    return random.choice(blueprints) if blueprints else None
+
+
+def resolve_with_index(type_id, vclass):
+    """
+    Current resolution: lookups in the blueprint index and a copy of the blueprint found.
+    """
+    _, blueprint_ids, blueprint_ids_by_vclass = BridgeHelper._get_blueprint_index()  # pylint: disable=protected-access
+    if type_id in blueprint_ids:
+        return BridgeHelper.blueprint_library.find(type_id)
+
+    candidates = blueprint_ids_by_vclass.get(vclass)
+    return BridgeHelper.blueprint_library.find(random.choice(candidates)) if candidates else None
+
+
+def main(args):
+    client = carla.Client(args.host, args.port)
+    client.set_timeout(10.0)
+    BridgeHelper.blueprint_library = client.get_world().get_blueprint_library()
+
+    # Half of the vehicles use a carla blueprint as vtype, the other half a sumo vtype resolved by
+    # vehicle class.
+    vtypes = list(BridgeHelper._VTYPES.items())  # pylint: disable=protected-access
+    episode = []
+    for i in range(args.vehicles):
+        type_id, specs = random.choice(vtypes)
+        episode.append((type_id if i % 2 == 0 else 'DEFAULT_VEHTYPE', specs['vClass']))
+
+    print('{:>10} {:>14} {:>14} {:>8}'.format('vehicles', 'scans [ms]', 'index [ms]', 'speedup'))
+    scans_time = min(
+        timeit.repeat(lambda: [resolve_with_scans(*vtype) for vtype in episode],
+                      number=1,
+                      repeat=args.repeat))
+    # Only the first measurement includes building the index.
+    BridgeHelper._blueprint_index = None  # pylint: disable=protected-access
+    index_time = min(
+        timeit.repeat(lambda: [resolve_with_index(*vtype) for vtype in episode],
+                      number=1,
+                      repeat=args.repeat))
+    print('{:>10} {:>14.2f} {:>14.2f} {:>7.1f}x'.format(len(episode), scans_time * 1e3,
+                                                        index_time * 1e3, scans_time / index_time))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--host',
+                           metavar='H',
+                           default='127.0.0.1',
+                           help='IP of the carla host server (default: 127.0.0.1)')
+    argparser.add_argument('--port',
+                           metavar='P',
+                           default=2000,
+                           type=int,
+                           help='TCP port to listen to (default: 2000)')
+    argparser.add_argument('--vehicles',
+                           default=300,
+                           type=int,
+                           help='vehicles spawned at the episode start (default: 300)')
+    argparser.add_argument('--repeat',
+                           default=5,
+                           type=int,
+                           help='number of measurements, the best one is reported (default: 5)')
+    arguments = argparser.parse_args()
+
+    main(arguments)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to benchmark the requests sent to the carla server per tick when synchronizing vehicles one
+by one (set_transform per vehicle) vs in a single batch (CarlaSimulation.synchronize_vehicle).
+
+Requires a running carla server.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+# ==================================================================================================
+# -- find carla module -----------------------------------------------------------------------------
+# ==================================================================================================
+
+try:
+    sys.path.append(
+        glob.glob('../../../PythonAPI/carla/dist/carla-*%d.%d-%s.egg' %
+                  (sys.version_info.major, sys.version_info.minor,
+                   'win-amd64' if os.name == 'nt' else 'linux-x86_64'))[0])
+except IndexError:
+    pass
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import carla  # pylint: disable=import-error, wrong-import-position
+
+from sumo_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
+from sumo_integration.constants import INVALID_ACTOR_ID  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def synchronize_one_by_one(carla_simulation, vehicles):
+    """
+    Previous synchronization: get_actor and set_transform per vehicle.
+    """
+    for actor_id, transform in vehicles.items():
+        vehicle = carla_simulation.get_actor(actor_id)
+        if vehicle is not None:
+            vehicle.set_transform(transform)
+            carla_simulation.rpc_count += 1
+
+
+def synchronize_batch(carla_simulation, vehicles):
+    """
+    Batched synchronization: the updates are sent in a single batch when ticking.
+    """
+    for actor_id, transform in vehicles.items():
+        carla_simulation.synchronize_vehicle(actor_id, transform)
+
+
+def run(carla_simulation, vehicles, synchronize, ticks):
+    """
+    Moves the vehicles forward for the given number of ticks.
+
+        :return: (requests per tick, seconds per tick)
+    """
+    rpc_count = carla_simulation.rpc_count
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for transform in vehicles.values():
+            transform.location.x += 0.1
+        synchronize(carla_simulation, vehicles)
+        carla_simulation.tick()
+    elapsed = time.perf_counter() - start
+    return (carla_simulation.rpc_count - rpc_count) / ticks, elapsed / ticks
+
+
+def main(args):
+    carla_simulation = CarlaSimulation(args.host, args.port, args.step_length)
+
+    settings = carla_simulation.world.get_settings()
+    original_settings = carla_simulation.world.get_settings()
+    settings.synchronous_mode = True
+    settings.fixed_delta_seconds = args.step_length
+    carla_simulation.world.apply_settings(settings)
+
+    blueprints = carla_simulation.blueprint_library.filter('vehicle.*')
+    spawn_points = carla_simulation.world.get_map().get_spawn_points()
+
+    vehicles = {}  # {actor_id: transform}
+    try:
+        for i in range(args.vehicles):
+            # Vehicles are spawned in the air (physics disabled), so they do not collide.
+            transform = random.choice(spawn_points)
+            transform = carla.Transform(transform.location + carla.Location(0, 0, 5.0 * i),
+                                        transform.rotation)
+            actor_id = carla_simulation.spawn_actor(random.choice(blueprints), transform)
+            if actor_id != INVALID_ACTOR_ID:
+                vehicles[actor_id] = transform
+        carla_simulation.tick()
+
+        print('{:>12} {:>10} {:>16} {:>14}'.format('mode', 'vehicles', 'requests/tick',
+                                                   'ms/tick'))
+        for mode, synchronize in (('one by one', synchronize_one_by_one),
+                                  ('batch', synchronize_batch)):
+            requests, seconds = run(carla_simulation, vehicles, synchronize, args.ticks)
+            print('{:>12} {:>10} {:>16.1f} {:>14.2f}'.format(mode, len(vehicles), requests,
+                                                             seconds * 1e3))
+
+    finally:
+        for actor_id in vehicles:
+            carla_simulation.destroy_actor(actor_id)
+        carla_simulation.world.apply_settings(original_settings)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--host',
+                           metavar='H',
+                           default='127.0.0.1',
+                           help='IP of the carla host server (default: 127.0.0.1)')
+    argparser.add_argument('--port',
+                           metavar='P',
+                           default=2000,
+                           type=int,
+                           help='TCP port to listen to (default: 2000)')
+    argparser.add_argument('--step-length',
+                           default=0.05,
+                           type=float,
+                           help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--vehicles',
+                           default=300,
+                           type=int,
+                           help='number of vehicles to synchronize (default: 300)')
+    argparser.add_argument('--ticks',
+                           default=200,
+                           type=int,
+                           help='ticks per measurement (default: 200)')
+    arguments = argparser.parse_args()
+
+    main(arguments)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to benchmark the decoding time of the co-simulation vehicle snapshots (json vs binary vs
+delta encoded frames).
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from sumo_integration.snapshot_codec import decode_snapshot, encode_snapshot  # pylint: disable=wrong-import-position
+from sumo_integration.snapshot_delta import SnapshotDeltaDecoder, SnapshotDeltaEncoder  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+TYPE_IDS = ['vehicle.audi.a2', 'vehicle.audi.tt', 'vehicle.tesla.model3', 'vehicle.carlamotors.carlacola']
+VCLASSES = ['passenger', 'truck', 'motorcycle']
+
+
+def random_vehicle_info(count):
+    """
+    Returns a json representation of a fleet with the given number of vehicles.
+    """
+    vehicle_info = {}
+    for i in range(count):
+        vehicle_info['veh_{}'.format(i)] = {
+            'type_id': random.choice(TYPE_IDS),
+            'vclass': random.choice(VCLASSES),
+            'color': [random.randint(0, 255) for _ in range(3)],
+            'location': {'x': random.uniform(-500, 500), 'y': random.uniform(-500, 500), 'z': 0.0},
+            'rotation': {'x': 0.0, 'y': random.uniform(0, 360), 'z': 0.0},
+            'extent': {'x': 2.5, 'y': 1.0, 'z': 0.8},
+        }
+    return vehicle_info
+
+
+def decode_json(payload):
+    """
+    Reference decoding: json.loads and a walk over the per vehicle dicts.
+    """
+    fleet = []
+    for vehicle in json.loads(payload).values():
+        fleet.append(((vehicle['location']['x'], vehicle['location']['y'], vehicle['location']['z']),
+                      (vehicle['rotation']['x'], vehicle['rotation']['y'], vehicle['rotation']['z']),
+                      (vehicle['extent']['x'], vehicle['extent']['y'], vehicle['extent']['z'])))
+    return fleet
+
+
+def decode_binary(payload):
+    """
+    Binary decoding, including the conversion of the columns to python lists.
+    """
+    snapshot = decode_snapshot(payload)
+    return list(zip(snapshot.locations.tolist(), snapshot.rotations.tolist(),
+                    snapshot.extents.tolist()))
+
+
+def simulate_frames(count, frames, moving_ratio=0.5, churn_ratio=0.005):
+    """
+    Returns the json representation of the fleet in consecutive frames. A part of the fleet is
+    stopped (e.g., waiting at a traffic light) and a few vehicles enter and leave every frame.
+    """
+    vehicle_info = random_vehicle_info(count)
+    next_id = count
+    result = []
+    for _ in range(frames):
+        for vehicle_id in random.sample(list(vehicle_info), int(count * churn_ratio)):
+            del vehicle_info[vehicle_id]
+            vehicle_info['veh_{}'.format(next_id)] = random_vehicle_info(1)['veh_0']
+            next_id += 1
+
+        for vehicle in vehicle_info.values():
+            if random.random() < moving_ratio:
+                vehicle['location']['x'] += random.uniform(0.0, 1.0)
+                vehicle['location']['y'] += random.uniform(0.0, 1.0)
+                vehicle['rotation']['y'] += random.uniform(-1.0, 1.0)
+
+        result.append(json.loads(json.dumps(vehicle_info)))
+    return result
+
+
+def benchmark_delta(args):
+    """
+    Compares full binary snapshots with delta encoded frames over a sequence of frames.
+    """
+    print('{:>8} {:>12} {:>12} {:>14} {:>14} {:>8}'.format('vehicles', 'full [B]', 'delta [B]',
+                                                          'full [us]', 'delta [us]', 'speedup'))
+    for count in args.vehicles:
+        frames = simulate_frames(count, args.frames)
+        encoder = SnapshotDeltaEncoder(keyframe_interval=args.keyframe_interval)
+        full_payloads = [encode_snapshot(frame) for frame in frames]
+        delta_payloads = [encoder.encode(frame) for frame in frames]
+
+        start = time.perf_counter()
+        for payload in full_payloads:
+            decode_binary(payload)
+        full_time = (time.perf_counter() - start) / len(frames)
+
+        decoder = SnapshotDeltaDecoder()
+        start = time.perf_counter()
+        for payload in delta_payloads:
+            decoder.decode(payload)
+        delta_time = (time.perf_counter() - start) / len(frames)
+
+        full_size = sum(len(payload) for payload in full_payloads) / len(frames)
+        delta_size = sum(len(payload) for payload in delta_payloads) / len(frames)
+        print('{:>8} {:>12.0f} {:>12.0f} {:>14.1f} {:>14.1f} {:>7.1f}x'.format(
+            count, full_size, delta_size, full_time * 1e6, delta_time * 1e6,
+            full_time / delta_time))
+
+
+def main(args):
+    print('{:>8} {:>12} {:>12} {:>14} {:>14} {:>8}'.format('vehicles', 'json [B]', 'binary [B]',
+                                                          'json [us]', 'binary [us]', 'speedup'))
+    for count in args.vehicles:
+        vehicle_info = random_vehicle_info(count)
+        json_payload = json.dumps(vehicle_info).encode('utf-8')
+        binary_payload = encode_snapshot(vehicle_info)
+
+        json_time = min(timeit.repeat(lambda: decode_json(json_payload), number=args.number,
+                                      repeat=args.repeat)) / args.number
+        binary_time = min(timeit.repeat(lambda: decode_binary(binary_payload), number=args.number,
+                                        repeat=args.repeat)) / args.number
+
+        print('{:>8} {:>12} {:>12} {:>14.1f} {:>14.1f} {:>7.1f}x'.format(
+            count, len(json_payload), len(binary_payload), json_time * 1e6, binary_time * 1e6,
+            json_time / binary_time))
+
+    if args.frames > 0:
+        print()
+        benchmark_delta(args)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--vehicles',
+                           metavar='N',
+                           nargs='+',
+                           default=[10, 100, 300, 1000, 3000],
+                           type=int,
+                           help='fleet sizes to benchmark (default: 10 100 300 1000 3000)')
+    argparser.add_argument('--number',
+                           default=50,
+                           type=int,
+                           help='decodings per measurement (default: 50)')
+    argparser.add_argument('--repeat',
+                           default=5,
+                           type=int,
+                           help='number of measurements, the best one is reported (default: 5)')
+    argparser.add_argument('--frames',
+                           default=200,
+                           type=int,
+                           help='consecutive frames of the delta encoding benchmark, 0 to skip it '
+                           '(default: 200)')
+    argparser.add_argument('--keyframe-interval',
+                           default=100,
+                           type=int,
+                           help='frames between delta encoding keyframes (default: 100)')
+    arguments = argparser.parse_args()
+
+    main(arguments)
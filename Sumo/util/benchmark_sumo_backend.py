@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to benchmark the sumo steps per second of the traci (socket) and libsumo (in process)
+backends for several fleet sizes. Each step ticks sumo and reads the state of the subscribed fleet,
+as the synchronization does.
+
+The backend is selected when importing traci, so each backend is run in its own process.
+
+Requires sumo, libsumo and the carla python api.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+# ==================================================================================================
+# -- find carla module -----------------------------------------------------------------------------
+# ==================================================================================================
+
+try:
+    sys.path.append(
+        glob.glob('../../../PythonAPI/carla/dist/carla-*%d.%d-%s.egg' %
+                  (sys.version_info.major, sys.version_info.minor,
+                   'win-amd64' if os.name == 'nt' else 'linux-x86_64'))[0])
+except IndexError:
+    pass
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from sumo_integration.sumo_backend import SUMO_BACKENDS, select_sumo_backend  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def run_backend(args):
+    """
+    Measures the steps per second of the given backend. Runs in its own process.
+
+        :return: [(vehicles, steps per second)]
+    """
+    select_sumo_backend(args.worker)
+
+    import traci  # pylint: disable=import-error, import-outside-toplevel
+    from benchmark_sumo_fleet_state import add_vehicles  # pylint: disable=import-outside-toplevel
+    from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=import-outside-toplevel
+
+    sumo_simulation = SumoSimulation(args.sumo_cfg_file, args.step_length, backend=args.worker)
+
+    results = []
+    try:
+        count = 0
+        for target in sorted(args.vehicles):
+            add_vehicles(sumo_simulation, target - count, count)
+            count = target
+            for _ in range(args.warmup_steps):
+                sumo_simulation.tick()
+
+            # Vehicles can only be subscribed once inserted in the net.
+            for actor_id in traci.vehicle.getIDList():
+                sumo_simulation.subscribe(actor_id)
+            sumo_simulation.tick()
+
+            start = time.perf_counter()
+            for _ in range(args.steps):
+                sumo_simulation.tick()
+                fleet = SumoSimulation.get_fleet_state()
+            elapsed = time.perf_counter() - start
+
+            results.append((len(fleet.ids), args.steps / elapsed))
+    finally:
+        sumo_simulation.close()
+
+    return results
+
+
+def main(args):
+    results = {}
+    for backend in SUMO_BACKENDS:
+        command = [
+            sys.executable, os.path.realpath(__file__), '--worker', backend,
+            '--sumo_cfg_file', args.sumo_cfg_file,
+            '--step-length', str(args.step_length),
+            '--warmup-steps', str(args.warmup_steps),
+            '--steps', str(args.steps),
+            '--vehicles'
+        ] + [str(vehicles) for vehicles in args.vehicles]
+
+        process = subprocess.run(command, stdout=subprocess.PIPE, check=False)
+        if process.returncode != 0:
+            print('{} backend failed (exit code {})'.format(backend, process.returncode))
+            return
+        results[backend] = json.loads(process.stdout.decode('utf-8').splitlines()[-1])
+
+    print('{:>8} {:>18} {:>18} {:>8}'.format('vehicles', 'traci [steps/s]', 'libsumo [steps/s]',
+                                             'speedup'))
+    for (vehicles, traci_rate), (_, libsumo_rate) in zip(results['traci'], results['libsumo']):
+        print('{:>8} {:>18.1f} {:>18.1f} {:>7.1f}x'.format(vehicles, traci_rate, libsumo_rate,
+                                                          libsumo_rate / traci_rate))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--sumo_cfg_file',
+                           default='../map/sumo_map/mcity.sumocfg',
+                           type=str,
+                           help='sumo configuration file (default: ../map/sumo_map/mcity.sumocfg)')
+    argparser.add_argument('--step-length',
+                           default=0.05,
+                           type=float,
+                           help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--vehicles',
+                           metavar='N',
+                           nargs='+',
+                           default=[10, 100, 300, 1000],
+                           type=int,
+                           help='fleet sizes to benchmark (default: 10 100 300 1000)')
+    argparser.add_argument('--warmup-steps',
+                           default=20,
+                           type=int,
+                           help='sumo steps to insert the vehicles before measuring (default: 20)')
+    argparser.add_argument('--steps',
+                           default=200,
+                           type=int,
+                           help='steps per measurement (default: 200)')
+    argparser.add_argument('--worker', choices=SUMO_BACKENDS, help=argparse.SUPPRESS)
+    arguments = argparser.parse_args()
+
+    if arguments.worker is not None:
+        print(json.dumps(run_backend(arguments)))
+    else:
+        main(arguments)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to benchmark the per tick cost of reading the state of the sumo fleet one actor at a time
+(SumoSimulation.get_actor) vs all at once (SumoSimulation.get_fleet_state).
+
+Requires sumo and the carla python api.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import glob
+import os
+import random
+import sys
+import timeit
+
+# ==================================================================================================
+# -- find carla module -----------------------------------------------------------------------------
+# ==================================================================================================
+
+try:
+    sys.path.append(
+        glob.glob('../../../PythonAPI/carla/dist/carla-*%d.%d-%s.egg' %
+                  (sys.version_info.major, sys.version_info.minor,
+                   'win-amd64' if os.name == 'nt' else 'linux-x86_64'))[0])
+except IndexError:
+    pass
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import traci  # pylint: disable=import-error, wrong-import-position
+
+from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def add_vehicles(sumo_simulation, count, first_id):
+    """
+    Adds stopped vehicles at random positions of the net.
+    """
+    edges = sumo_simulation.get_allowed_edges('passenger')
+    for i in range(first_id, first_id + count):
+        actor_id = 'bench_{}'.format(i)
+        traci.route.add('bench_route_{}'.format(i), [random.choice(edges)])
+        traci.vehicle.add(actor_id, 'bench_route_{}'.format(i), departPos='random',
+                          departLane='random')
+        traci.vehicle.setSpeed(actor_id, 0.0)
+
+
+def get_actors(actor_ids):
+    """
+    Previous access: one subscription lookup and a SumoActor per vehicle.
+    """
+    return [SumoSimulation.get_actor(actor_id) for actor_id in actor_ids]
+
+
+def main(args):
+    sumo_simulation = SumoSimulation(args.sumo_cfg_file, args.step_length)
+
+    try:
+        print('{:>8} {:>14} {:>14} {:>8}'.format('vehicles', 'per actor [us]', 'fleet [us]',
+                                                 'speedup'))
+        count = 0
+        for target in sorted(args.vehicles):
+            add_vehicles(sumo_simulation, target - count, count)
+            count = target
+            for _ in range(args.warmup_steps):
+                sumo_simulation.tick()
+
+            # Vehicles can only be subscribed once inserted in the net.
+            for actor_id in traci.vehicle.getIDList():
+                sumo_simulation.subscribe(actor_id)
+            sumo_simulation.tick()
+
+            actor_ids = list(traci.vehicle.getAllSubscriptionResults().keys())
+            actor_time = min(timeit.repeat(lambda: get_actors(actor_ids), number=args.number,
+                                           repeat=args.repeat)) / args.number
+            fleet_time = min(timeit.repeat(SumoSimulation.get_fleet_state, number=args.number,
+                                           repeat=args.repeat)) / args.number
+
+            print('{:>8} {:>14.1f} {:>14.1f} {:>7.1f}x'.format(len(actor_ids), actor_time * 1e6,
+                                                               fleet_time * 1e6,
+                                                               actor_time / fleet_time))
+    finally:
+        sumo_simulation.close()
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--sumo_cfg_file',
+                           default='../map/sumo_map/mcity.sumocfg',
+                           type=str,
+                           help='sumo configuration file (default: ../map/sumo_map/mcity.sumocfg)')
+    argparser.add_argument('--step-length',
+                           default=0.05,
+                           type=float,
+                           help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--vehicles',
+                           metavar='N',
+                           nargs='+',
+                           default=[10, 100, 300, 1000],
+                           type=int,
+                           help='fleet sizes to benchmark (default: 10 100 300 1000)')
+    argparser.add_argument('--warmup-steps',
+                           default=20,
+                           type=int,
+                           help='sumo steps to insert the vehicles before measuring (default: 20)')
+    argparser.add_argument('--number',
+                           default=20,
+                           type=int,
+                           help='reads per measurement (default: 20)')
+    argparser.add_argument('--repeat',
+                           default=5,
+                           type=int,
+                           help='number of measurements, the best one is reported (default: 5)')
+    arguments = argparser.parse_args()
+
+    main(arguments)